@@ -0,0 +1,163 @@
+# In app/config.py
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_weights(name: str, default: str) -> Dict[int, float]:
+    """Comma-separated weights, one per priority rank from critical to low."""
+    values = (os.environ.get(name) or default).split(",")
+    return {rank: float(value) for rank, value in enumerate(values)}
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """Connection pool settings for one kind of process (API or worker)."""
+    size: int
+    max_overflow: int
+    pre_ping: bool
+    recycle_seconds: int
+    timeout_seconds: int
+
+    @classmethod
+    def from_env(cls, prefix: str, size: int, max_overflow: int) -> "PoolSettings":
+        """Reads e.g. API_DB_POOL_SIZE, API_DB_MAX_OVERFLOW, ... falling back to the given defaults."""
+        return cls(
+            size=_env_int(f"{prefix}_POOL_SIZE", size),
+            max_overflow=_env_int(f"{prefix}_MAX_OVERFLOW", max_overflow),
+            pre_ping=_env_bool(f"{prefix}_POOL_PRE_PING", True),
+            recycle_seconds=_env_int(f"{prefix}_POOL_RECYCLE_SECONDS", 1800),
+            timeout_seconds=_env_int(f"{prefix}_POOL_TIMEOUT_SECONDS", 30),
+        )
+
+
+@dataclass(frozen=True)
+class RetentionSettings:
+    """How long finished jobs are kept, and how the sweeper deletes the expired ones."""
+    enabled: bool
+    # Days a job is kept after it finished with each status; 0 keeps it forever
+    success_days: int
+    failed_days: int
+    cancelled_days: int
+    batch_size: int
+    interval_seconds: int
+
+    @classmethod
+    def from_env(cls) -> "RetentionSettings":
+        return cls(
+            enabled=_env_bool("RETENTION_ENABLED", True),
+            success_days=_env_int("RETENTION_SUCCESS_DAYS", 7),
+            failed_days=_env_int("RETENTION_FAILED_DAYS", 30),
+            cancelled_days=_env_int("RETENTION_CANCELLED_DAYS", 7),
+            batch_size=_env_int("RETENTION_BATCH_SIZE", 1000),
+            interval_seconds=_env_int("RETENTION_INTERVAL_SECONDS", 300),
+        )
+
+    def ttl_days(self) -> Dict[str, int]:
+        """The retention of each terminal status, keyed by status value, without the ones kept forever."""
+        days = {"success": self.success_days, "failed": self.failed_days, "cancelled": self.cancelled_days}
+        return {status: value for status, value in days.items() if value > 0}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Runtime configuration, read from environment variables once at import."""
+    database_url: str
+    migration_database_url: str
+    db_echo: bool
+    statement_timeout_ms: int
+    api_pool: PoolSettings
+    worker_pool: PoolSettings
+    retention: RetentionSettings
+    idempotency_key_ttl_seconds: int
+    idempotency_cache_size: int
+    idempotency_cache_ttl_seconds: int
+    worker_cpu_units: int
+    worker_memory_mb: int
+    cluster_cpu_units: int
+    cluster_memory_mb: int
+    scheduling_policy: str
+    scheduling_window: int
+    job_handler_modules: Tuple[str, ...]
+    lease_seconds: int
+    heartbeat_interval_seconds: int
+    reaper_interval_seconds: int
+    scheduler_interval_seconds: int
+    job_limits: Dict[str, Dict[str, Any]]
+    limits_tenant_key: str
+    limits_reconcile_seconds: float
+    fair_share_weights: Dict[int, float]
+    fair_share_by_type: bool
+    fair_share_aging_seconds: int
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            database_url=os.environ.get("DATABASE_URL", "postgresql+asyncpg://user:password@db/task_queue"),
+            migration_database_url=os.environ.get("MIGRATION_DATABASE_URL", "postgresql://user:password@db/task_queue"),
+            # Statement logging is synchronous and costly, so it is opt-in
+            db_echo=_env_bool("DB_ECHO", False),
+            statement_timeout_ms=_env_int("DB_STATEMENT_TIMEOUT_MS", 30000),
+            # The API serves many short requests concurrently; the worker
+            # holds one session per in-flight job plus the claim loop.
+            api_pool=PoolSettings.from_env("API_DB", size=10, max_overflow=20),
+            worker_pool=PoolSettings.from_env("WORKER_DB", size=10, max_overflow=10),
+            retention=RetentionSettings.from_env(),
+            # An idempotency key only deduplicates submissions within this window
+            idempotency_key_ttl_seconds=_env_int("IDEMPOTENCY_KEY_TTL_SECONDS", 86400),
+            # The API's in-process cache of recently used keys
+            idempotency_cache_size=_env_int("IDEMPOTENCY_CACHE_SIZE", 10000),
+            idempotency_cache_ttl_seconds=_env_int("IDEMPOTENCY_CACHE_TTL_SECONDS", 300),
+            # The capacity of the node each worker runs on
+            worker_cpu_units=_env_int("WORKER_CPU_UNITS", 8),
+            worker_memory_mb=_env_int("WORKER_MEMORY_MB", 4096),
+            # Optional capacity shared by every worker; 0 means no cluster-wide limit
+            cluster_cpu_units=_env_int("CLUSTER_CPU_UNITS", 0),
+            cluster_memory_mb=_env_int("CLUSTER_MEMORY_MB", 0),
+            # How a worker picks among the ready jobs (see app/services/scheduling.py)
+            scheduling_policy=os.environ.get("SCHEDULING_POLICY", "best_fit"),
+            # How many ready jobs the policy chooses from on each claim
+            scheduling_window=_env_int("SCHEDULING_WINDOW", 200),
+            # Comma-separated modules that register job handlers, imported by the worker
+            job_handler_modules=tuple(
+                name.strip() for name in os.environ.get("JOB_HANDLER_MODULES", "").split(",") if name.strip()
+            ),
+            # A running job's lease is renewed every heartbeat interval; a job
+            # whose worker stops renewing it is reaped once the lease expires
+            lease_seconds=_env_int("LEASE_SECONDS", 60),
+            heartbeat_interval_seconds=_env_int("HEARTBEAT_INTERVAL_SECONDS", 15),
+            reaper_interval_seconds=_env_int("REAPER_INTERVAL_SECONDS", 30),
+            # The longest the scheduler sleeps between checks for due recurring jobs
+            scheduler_interval_seconds=_env_int("SCHEDULER_INTERVAL_SECONDS", 30),
+            # Concurrency caps and rate limits per job type and tenant, as JSON
+            # (see app/services/limits.py), e.g.
+            # {"type:data_export": {"concurrency": 20, "rate_per_second": 5}}
+            job_limits=json.loads(os.environ.get("JOB_LIMITS") or "{}"),
+            # The payload field that names a job's tenant
+            limits_tenant_key=os.environ.get("LIMITS_TENANT_KEY", "tenant_id"),
+            # How often a worker re-reads what the other workers are running
+            limits_reconcile_seconds=float(os.environ.get("LIMITS_RECONCILE_SECONDS") or 2),
+            # The fair_share policy's weight per priority rank, critical (0) to low (3)
+            fair_share_weights=_env_weights("FAIR_SHARE_WEIGHTS", "8,4,2,1"),
+            # Also share each priority fairly between job types
+            fair_share_by_type=_env_bool("FAIR_SHARE_BY_TYPE", False),
+            # A waiting job moves up one priority per this many seconds; 0 disables aging
+            fair_share_aging_seconds=_env_int("FAIR_SHARE_AGING_SECONDS", 600),
+        )
+
+
+settings = Settings.from_env()
@@ -1,29 +1,72 @@
-from sqlalchemy import create_engine
+from typing import Any, Dict
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker
+from .config import PoolSettings, settings
 
 # The database URL tells SQLAlchemy how to connect to our Postgres database.
-# postgresql://user:password@db/task_queue
-# 'db' is the service name from our docker-compose.yml file.
-SQLALCHEMY_DATABASE_URL = "postgresql://user:password@db/task_queue"
+# postgresql+asyncpg://user:password@db/task_queue
+# 'db' is the service name from our docker-compose.yml file, and asyncpg is
+# the driver, so queries never block the event loop. Override it with the
+# DATABASE_URL environment variable.
+SQLALCHEMY_DATABASE_URL = settings.database_url
 
-# The engine is the entry point to the database.
-engine = create_engine(SQLALCHEMY_DATABASE_URL, echo=True)
+
+def create_db_engine(pool: PoolSettings, url: str = SQLALCHEMY_DATABASE_URL) -> AsyncEngine:
+    """Builds an async engine with its own connection pool tuned by `pool`."""
+    options: Dict[str, Any] = {"echo": settings.db_echo}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=pool.size,
+            max_overflow=pool.max_overflow,
+            pool_pre_ping=pool.pre_ping,
+            pool_recycle=pool.recycle_seconds,
+            pool_timeout=pool.timeout_seconds,
+        )
+    if url.startswith("postgresql+asyncpg") and settings.statement_timeout_ms:
+        options["connect_args"] = {
+            "server_settings": {"statement_timeout": str(settings.statement_timeout_ms)}
+        }
+    return create_async_engine(url, **options)
+
+
+# The engine is the entry point to the database. The API and the worker
+# each get their own pool; only the one a process uses ever connects.
+engine = create_db_engine(settings.api_pool)
+worker_engine = create_db_engine(settings.worker_pool)
 
 # Each instance of the SessionLocal class will be a new database session.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay loaded after a commit: async sessions can't lazily reload
+# expired attributes, and the worker reads jobs after claiming them.
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+WorkerSessionLocal = async_sessionmaker(bind=worker_engine, autoflush=False, expire_on_commit=False)
 
 # This is a factory function that will be used to create our ORM models.
 Base = declarative_base()
 
 # Dependency to get a DB session
-def get_db():
+async def get_db():
     """
     A dependency for FastAPI routes to get a database session.
     It ensures the database connection is always closed after the request.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+
+def pool_metrics(db_engine: AsyncEngine, pool_settings: PoolSettings) -> Dict[str, Any]:
+    """Reports how busy an engine's connection pool is."""
+    pool = db_engine.pool
+    if not hasattr(pool, "checkedout"):
+        # SQLite and other non-queue pools have nothing to report
+        return {"pool": type(pool).__name__}
+    checked_out = pool.checkedout()
+    capacity = pool_settings.size + max(pool_settings.max_overflow, 0)
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "capacity": capacity,
+        "utilization": round(checked_out / capacity, 3) if capacity else 0.0,
+    }
@@ -1,5 +1,20 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from .routes import jobs
+from .routes import jobs, metrics, schedules
+from .services.connection_manager import manager
+from .services.event_bus import event_bus
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Subscribes the WebSocket fan-out to job events from every process for the life of the app."""
+    event_bus.subscribe(manager.publish_job_events)
+    await event_bus.start()
+    try:
+        yield
+    finally:
+        await event_bus.stop()
+        event_bus.unsubscribe(manager.publish_job_events)
 
 
 # Create an instance of the FastAPI class
@@ -7,10 +22,13 @@ app = FastAPI(
     title="Niraj's Smart Task Queue",
     description="A production-ready task queue system using FastAPI that handles job scheduling, prioritization, and execution.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Include the jobs router in your main application
 app.include_router(jobs.router)
+app.include_router(metrics.router)
+app.include_router(schedules.router)
 
 @app.get("/")
 def read_root():
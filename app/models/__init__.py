@@ -1 +1,3 @@
-from .job import Job, JobDependency, JobStatus, PriorityLevel, JobLog
\ No newline at end of file
+from .job import Job, JobDependency, JobStatus, PriorityLevel, JobLog, PRIORITY_RANKS, DependencyFailurePolicy
+from .resource_pool import ResourcePool, CLUSTER_POOL
+from .job_schedule import JobSchedule
@@ -10,9 +10,11 @@ from sqlalchemy import (
     JSON,
     Enum as SAEnum,
     ForeignKey,
-    Text
+    Index,
+    Text,
+    text
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from ..database import Base
 
 class JobStatus(str, enum.Enum):
@@ -29,22 +31,90 @@ class PriorityLevel(str, enum.Enum):
     NORMAL = "normal"
     LOW = "low"
 
+class DependencyFailurePolicy(str, enum.Enum):
+    # Cancel the job as soon as one of its dependencies fails or is cancelled
+    FAIL_FAST = "fail_fast"
+    # Keep the job BLOCKED, e.g. until the failed dependency is re-run by hand
+    WAIT = "wait"
+
+# Numeric scheduling order of each priority: lower ranks are served first.
+# The Postgres enum's ordinal can't be relied on for this, so the rank is
+# stored in its own column that the dequeue index is built on.
+PRIORITY_RANKS = {
+    PriorityLevel.CRITICAL: 0,
+    PriorityLevel.HIGH: 1,
+    PriorityLevel.NORMAL: 2,
+    PriorityLevel.LOW: 3,
+}
+
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # Partial index serving the hot dequeue query: only pending rows are
+        # indexed, so finished jobs never slow down the scan.
+        Index(
+            "ix_jobs_dequeue",
+            "status", "priority_rank", "run_at", "created_at",
+            postgresql_where=text("status = 'PENDING'"),
+            sqlite_where=text("status = 'PENDING'"),
+        ),
+        # Keyset pagination of the job listing, newest first, with id as the
+        # tie-breaker. They also serve plain lookups by status or type.
+        Index("ix_jobs_created_at_id", "created_at", "id"),
+        Index("ix_jobs_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_jobs_type_created_at_id", "type", "created_at", "id"),
+        # Finds the finished jobs whose retention has run out
+        Index("ix_jobs_status_completed_at", "status", "completed_at"),
+        # Sums the resources held by each worker's running jobs
+        Index(
+            "ix_jobs_running_worker",
+            "worker_id", "lease_expires_at",
+            postgresql_where=text("status = 'RUNNING'"),
+            sqlite_where=text("status = 'RUNNING'"),
+        ),
+        # Finds the jobs started since a limiter's last reconciliation
+        Index("ix_jobs_started_at", "started_at"),
+        # Finds the idempotency keys whose deduplication window has passed
+        Index(
+            "ix_jobs_idempotency_key_created_at",
+            "created_at",
+            postgresql_where=text("idempotency_key IS NOT NULL"),
+            sqlite_where=text("idempotency_key IS NOT NULL"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(String, unique=True, index=True, nullable=False)
     idempotency_key = Column(String, unique=True, index=True, nullable=True)
-    type = Column(String, nullable=False, index=True)
+    type = Column(String, nullable=False)
     priority = Column(SAEnum(PriorityLevel), default=PriorityLevel.NORMAL, nullable=False)
-    status = Column(SAEnum(JobStatus), default=JobStatus.PENDING, nullable=False, index=True)
+    priority_rank = Column(Integer, default=PRIORITY_RANKS[PriorityLevel.NORMAL], nullable=False, server_default='2')
+    status = Column(SAEnum(JobStatus), default=JobStatus.PENDING, nullable=False)
     payload = Column(JSON, nullable=True)
     resource_requirements = Column(JSON, nullable=True)
     retry_config = Column(JSON, nullable=True)
     timeout_seconds = Column(Integer, nullable=True)
     last_error = Column(Text, nullable=True)
     current_attempt = Column(Integer, default=0, nullable=False, server_default='0')
-    run_at = Column(DateTime, nullable=True, index=True)
+    # Dependencies that have not reached SUCCESS yet. Jobs with unmet
+    # dependencies wait as BLOCKED and become PENDING when this hits zero.
+    unmet_deps = Column(Integer, default=0, nullable=False, server_default='0')
+    on_dependency_failure = Column(
+        SAEnum(DependencyFailurePolicy),
+        default=DependencyFailurePolicy.FAIL_FAST,
+        nullable=False,
+        server_default=DependencyFailurePolicy.FAIL_FAST.name,
+    )
+    # When the job becomes due. Set to the creation time for new jobs and
+    # pushed into the future by retry backoff.
+    run_at = Column(DateTime, nullable=True, index=True, default=datetime.datetime.utcnow)
+    # --- LEASE OWNERSHIP FOR MULTI-WORKER CLAIMING ---
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    # Resources held from the worker's (and the cluster's) pool while the
+    # job is RUNNING under an unexpired lease
+    allocated_cpu = Column(Integer, default=0, nullable=False, server_default='0')
+    allocated_memory_mb = Column(Integer, default=0, nullable=False, server_default='0')
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
@@ -67,6 +137,12 @@ class Job(Base):
     # --- NEW RELATIONSHIP TO LOGS ---
     logs = relationship("JobLog", back_populates="job", cascade="all, delete-orphan")
 
+    @validates("priority")
+    def _sync_priority_rank(self, key, priority):
+        """Keeps the numeric rank in step with the priority enum."""
+        self.priority_rank = PRIORITY_RANKS[PriorityLevel(priority)]
+        return priority
+
 
 class JobDependency(Base):
     __tablename__ = 'job_dependencies'
@@ -77,6 +153,10 @@ class JobDependency(Base):
 # --- NEW TABLE MODEL FOR LOGS ---
 class JobLog(Base):
     __tablename__ = 'job_logs'
+    __table_args__ = (
+        # A job's log in order, for paging and following it
+        Index("ix_job_logs_job_id_timestamp", "job_id", "timestamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     job_id = Column(Integer, ForeignKey('jobs.id'), nullable=False)
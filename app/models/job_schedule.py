@@ -0,0 +1,35 @@
+# In app/models/job_schedule.py
+
+import datetime
+from sqlalchemy import JSON, Boolean, Column, DateTime, Index, Integer, String, text
+from ..database import Base
+
+
+class JobSchedule(Base):
+    """
+    A recurring job: a job template submitted every time its cron
+    expression fires.
+
+    `next_fire_at` is the next fire time still to be materialized; the
+    worker's scheduler finds due schedules through ix_job_schedules_due.
+    """
+    __tablename__ = "job_schedules"
+    __table_args__ = (
+        Index(
+            "ix_job_schedules_due",
+            "next_fire_at",
+            postgresql_where=text("enabled"),
+            sqlite_where=text("enabled"),
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    cron = Column(String, nullable=False)
+    # The JobCreate fields of every job the schedule submits
+    job_template = Column(JSON, nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True, server_default=text("true"))
+    next_fire_at = Column(DateTime, nullable=False)
+    last_fired_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
@@ -0,0 +1,26 @@
+# In app/models/resource_pool.py
+
+import datetime
+from sqlalchemy import Column, DateTime, Integer, String
+from ..database import Base
+
+# Name of the optional pool every worker in the cluster allocates from
+CLUSTER_POOL = "cluster"
+
+
+class ResourcePool(Base):
+    """
+    The CPU and memory capacity of one worker node (named by its worker id)
+    or of the whole cluster.
+
+    Only the capacity is stored. What is in use is the sum of the
+    allocations of the RUNNING jobs whose lease has not expired, so the
+    resources of a crashed worker's jobs free themselves when their leases
+    run out.
+    """
+    __tablename__ = "resource_pools"
+
+    name = Column(String, primary_key=True)
+    total_cpu = Column(Integer, nullable=False)
+    total_memory_mb = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, nullable=False)
@@ -1,94 +1,276 @@
 # In app/routes/jobs.py
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+import asyncio
+import datetime
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from .. import models, schemas
 from ..services import job_service # Import the new service
 from ..database import get_db
 from typing import List, Optional
-import asyncio
-from ..services.connection_manager import manager
+from ..services.connection_manager import Subscription, manager
+from ..services.notifier import notify_job_change
+from ..services.idempotency import idempotency_cache
+from ..services.event_bus import EventBus, get_event_bus, job_event, status_event
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
+# How often a followed log stream checks for new lines
+LOG_FOLLOW_POLL_SECONDS = 1
+
 @router.post("/", response_model=schemas.JobResponse, status_code=201)
-async def submit_job(job_in: schemas.JobCreate, db: Session = Depends(get_db)): #<-- Changed to async
+async def submit_job(
+    job_in: schemas.JobCreate,
+    db: AsyncSession = Depends(get_db),
+    events: EventBus = Depends(get_event_bus),
+):
     """Submit a new job to the queue."""
-    new_job = job_service.create_job(db=db, job_in=job_in)
-    # Broadcast the update to all connected clients
-    await manager.broadcast(f"Job {new_job.job_id} created with status: {new_job.status.value}")
+    if job_in.idempotency_key:
+        # A retried submission is answered with one read instead of an insert;
+        # the job is read rather than cached so its status is current
+        cached_job_id = idempotency_cache.get(job_in.idempotency_key)
+        if cached_job_id is not None:
+            cached_job = await job_service.get_job(db=db, job_id=cached_job_id)
+            if cached_job is not None:
+                return cached_job
+
+    new_job = await job_service.create_job(db=db, job_in=job_in)
+    if job_in.idempotency_key:
+        idempotency_cache.put(job_in.idempotency_key, new_job.job_id, new_job.created_at)
+    # Announce the new job to every WebSocket subscriber
+    events.publish(job_event(new_job))
     return new_job
 
+@router.post("/batch", response_model=List[schemas.JobBatchResult], status_code=201)
+async def submit_jobs_batch(
+    items: List[schemas.JobBatchItem],
+    db: AsyncSession = Depends(get_db),
+    events: EventBus = Depends(get_event_bus),
+):
+    """
+    Submit many jobs in one request and one transaction.
+
+    An item's depends_on may list existing job ids or the `ref` of an earlier
+    item in the batch. Results are returned in the same order as the items.
+    """
+    if len(items) > job_service.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"A batch may contain at most {job_service.MAX_BATCH_SIZE} jobs."
+        )
+    results = await job_service.create_jobs_bulk(db=db, items=items)
+    # The bus delivers the whole batch in one tick, and only to the
+    # subscribers whose filters match each job
+    for result in results:
+        if result.created:
+            events.publish(status_event(result.job_id, result.status, job_type=result.type))
+    return results
+
+@router.get("/export")
+async def export_jobs(
+    db: AsyncSession = Depends(get_db),
+    status: Optional[models.JobStatus] = None,
+    job_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Export every matching job as newline-delimited JSON, newest first.
+
+    Rows are streamed from a server-side cursor in chunks and written out as
+    they arrive, so the export never holds the whole result set in memory.
+    """
+    try:
+        query = job_service.list_jobs_query(status=status, job_type=job_type, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def ndjson_lines():
+        result = await db.stream(query.execution_options(yield_per=1000))
+        async for row in result.mappings():
+            yield schemas.JobResponse.model_validate(row).model_dump_json() + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
 @router.get("/{job_id}", response_model=schemas.JobResponse)
-def get_job_details(job_id: str, db: Session = Depends(get_db)):
+async def get_job_details(job_id: str, db: AsyncSession = Depends(get_db)):
     """Get the status and details of a specific job."""
-    db_job = job_service.get_job(db=db, job_id=job_id)
+    db_job = await job_service.get_job(db=db, job_id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     return db_job
 
 @router.get("/", response_model=List[schemas.JobResponse])
-def list_jobs(
-    db: Session = Depends(get_db),
+async def list_jobs(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     status: Optional[models.JobStatus] = None,
     job_type: Optional[str] = None,
-    limit: int = 100
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
 ):
     """
-    List jobs with optional filtering by status and/or job type.
-    """
-    query = db.query(models.Job)
-
-    if status:
-        query = query.filter(models.Job.status == status)
+    List jobs, newest first, with optional filtering by status and/or job type.
 
-    if job_type:
-        query = query.filter(models.Job.type == job_type)
-
-    return query.order_by(models.Job.created_at.desc()).limit(limit).all()
+    When more jobs follow, the X-Next-Cursor response header holds the
+    cursor to pass to get the next page.
+    """
+    try:
+        rows, next_cursor = await job_service.list_jobs(
+            db, status=status, job_type=job_type, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
 
 @router.patch("/{job_id}/cancel", response_model=schemas.JobResponse)
-async def cancel_job(job_id: str, db: Session = Depends(get_db)): #<-- Changed to async
+async def cancel_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    events: EventBus = Depends(get_event_bus),
+):
     """
-    Cancel a job if it is in a pending state.
+    Cancel a job if it is pending or blocked on its dependencies.
     """
-    db_job = job_service.get_job(db=db, job_id=job_id)
+    db_job = await job_service.get_job(db=db, job_id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
 
-    if db_job.status != models.JobStatus.PENDING:
+    if db_job.status not in (models.JobStatus.PENDING, models.JobStatus.BLOCKED):
         raise HTTPException(
             status_code=400,
             detail=f"Cannot cancel job with status '{db_job.status.value}'."
         )
 
     db_job.status = models.JobStatus.CANCELLED
-    db.commit()
-    db.refresh(db_job)
-    
-    # Broadcast the update to all connected clients
-    await manager.broadcast(f"Job {db_job.job_id} status changed to: {db_job.status.value}")
+    db_job.completed_at = datetime.datetime.utcnow()
+    cancelled_dependents = await job_service.propagate_failure(db, db_job)
+    await notify_job_change(db, db_job)
+    await db.commit()
+    await db.refresh(db_job)
+
+    # Announce the cancellation, and every dependent it cancelled, to subscribers
+    events.publish(job_event(db_job))
+    for dependent_id, dependent_type in cancelled_dependents:
+        events.publish(status_event(dependent_id, models.JobStatus.CANCELLED, job_type=dependent_type))
     return db_job
 
 @router.websocket("/stream")
-async def stream_job_updates(websocket: WebSocket):
-    await manager.connect(websocket)
+async def stream_job_updates(
+    websocket: WebSocket,
+    job_id: Optional[List[str]] = Query(None),
+    type: Optional[List[str]] = Query(None),
+    status: Optional[List[models.JobStatus]] = Query(None),
+):
+    """
+    Streams job status events as JSON, e.g.
+    {"job_id": "...", "type": "data_export", "status": "running", ...}.
+
+    The optional job_id, type and status query parameters (each repeatable)
+    select which events are sent. A client can change its filters at any time
+    by sending {"action": "subscribe", "job_ids": [...], "types": [...], "statuses": [...]}.
+    """
+    subscription = Subscription(
+        job_ids=job_id or [], types=type or [], statuses=[value.value for value in status or []]
+    )
+    await manager.connect(websocket, subscription)
     print("WebSocket client connected to stream.")
     try:
         while True:
-            # This loop keeps the connection alive.
-            # The client will receive broadcasts sent from other parts of the app.
-            await asyncio.sleep(60)
+            # Reading keeps the connection alive, notices disconnects right
+            # away and receives filter changes. Events are sent by the
+            # connection's own sender task.
+            message = await websocket.receive_text()
+            try:
+                manager.subscribe(websocket, Subscription.from_message(json.loads(message)))
+            except ValueError as e:
+                manager.send_to(websocket, json.dumps({"error": str(e)}))
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
         print("WebSocket client disconnected from stream.")
+    finally:
+        manager.disconnect(websocket)
         
 @router.get("/{job_id}/logs", response_model=List[schemas.JobLogResponse])
-def get_job_logs(job_id: str, db: Session = Depends(get_db)):
+async def get_job_logs(
+    job_id: str,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    since: Optional[datetime.datetime] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    cursor: Optional[str] = None,
+):
+    """
+    Get the execution logs for a specific job, oldest first.
+
+    `since` skips lines written before a time. When more lines follow, the
+    X-Next-Cursor response header holds the cursor of the next page.
+    """
+    db_job = await job_service.get_job(db=db, job_id=job_id)
+    if db_job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    try:
+        rows, next_cursor = await job_service.list_job_logs(
+            db, db_job.id, since=since, limit=limit, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/{job_id}/logs/stream")
+async def stream_job_logs(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    since: Optional[datetime.datetime] = None,
+    cursor: Optional[str] = None,
+    follow: bool = False,
+    last_event_id: Optional[str] = Header(None),
+):
     """
-    Get the execution logs for a specific job.
+    Stream a job's log as Server-Sent Events, one event per line.
+
+    Without `follow` the stream ends after the last line written so far.
+    With `follow` it keeps tailing the log until the job has finished. Each
+    event's id is a cursor, so a reconnecting EventSource resumes where it
+    left off through the Last-Event-ID header.
     """
-    db_job = job_service.get_job(db=db, job_id=job_id)
+    db_job = await job_service.get_job(db=db, job_id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    cursor = last_event_id or cursor
+    try:
+        if cursor:
+            job_service.decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def log_events():
+        position = cursor
+        while True:
+            # Read the status before the log: once it is final, the lines
+            # read after it are all the job will ever write.
+            status = (await db.execute(
+                select(models.Job.status).where(models.Job.id == db_job.id)
+            )).scalar_one()
+            finished = status in job_service.FINISHED_STATUSES
+
+            query = job_service.job_logs_query(db_job.id, since=since, cursor=position)
+            result = await db.stream(query.execution_options(yield_per=500))
+            async for row in result.mappings():
+                position = job_service.encode_cursor(row["timestamp"], row["id"])
+                line = schemas.JobLogResponse.model_validate(row).model_dump_json()
+                yield f"id: {position}\ndata: {line}\n\n"
+
+            if finished or not follow:
+                yield f"event: end\ndata: {json.dumps({'status': status.value})}\n\n"
+                return
+            # End the read transaction so the pooled connection is returned while waiting
+            await db.rollback()
+            await asyncio.sleep(LOG_FOLLOW_POLL_SECONDS)
 
-    return db_job.logs
\ No newline at end of file
+    return StreamingResponse(log_events(), media_type="text/event-stream")
@@ -0,0 +1,13 @@
+# In app/routes/metrics.py
+from fastapi import APIRouter
+from ..config import settings
+from ..database import engine, pool_metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """
+    Report the utilization of the API's database connection pool.
+    """
+    return pool_metrics(engine, settings.api_pool)
@@ -0,0 +1,46 @@
+# In app/routes/schedules.py
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+from .. import schemas
+from ..database import get_db
+from ..services import schedule_service
+
+router = APIRouter(prefix="/schedules", tags=["Schedules"])
+
+
+async def _get_or_404(db: AsyncSession, name: str):
+    schedule = await schedule_service.get_schedule(db, name)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    return schedule
+
+@router.post("/", response_model=schemas.JobScheduleResponse, status_code=201)
+async def create_schedule(schedule_in: schemas.JobScheduleCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Create a recurring job. Its job is submitted every time the cron
+    expression fires, in UTC, by whichever worker gets to it first.
+    """
+    return await schedule_service.create_schedule(db, schedule_in)
+
+@router.get("/", response_model=List[schemas.JobScheduleResponse])
+async def list_schedules(db: AsyncSession = Depends(get_db)):
+    """List every schedule by name."""
+    return await schedule_service.list_schedules(db)
+
+@router.get("/{name}", response_model=schemas.JobScheduleResponse)
+async def get_schedule(name: str, db: AsyncSession = Depends(get_db)):
+    return await _get_or_404(db, name)
+
+@router.patch("/{name}", response_model=schemas.JobScheduleResponse)
+async def update_schedule(name: str, update: schemas.JobScheduleUpdate, db: AsyncSession = Depends(get_db)):
+    """Change a schedule's expression or job, or pause and resume it with `enabled`."""
+    schedule = await _get_or_404(db, name)
+    return await schedule_service.update_schedule(db, schedule, update)
+
+@router.delete("/{name}", status_code=204)
+async def delete_schedule(name: str, db: AsyncSession = Depends(get_db)):
+    """Delete a schedule. The jobs it already submitted are kept."""
+    schedule = await _get_or_404(db, name)
+    await schedule_service.delete_schedule(db, schedule)
+    return Response(status_code=204)
@@ -2,8 +2,9 @@
 
 import datetime
 from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
-from .models.job import JobStatus, PriorityLevel
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from .models.job import JobStatus, PriorityLevel, DependencyFailurePolicy
+from .services.cron import CronExpression
 
 # Pydantic model for the request body when creating a new job
 class JobCreate(BaseModel):
@@ -15,6 +16,25 @@ class JobCreate(BaseModel):
     depends_on: Optional[List[str]] = Field(None, example=["job_abc123"])
     retry_config: Optional[Dict[str, Any]] = Field(None, example={"max_attempts": 3, "backoff_multiplier": 2})
     timeout_seconds: Optional[int] = Field(None, example=3600)
+    on_dependency_failure: DependencyFailurePolicy = Field(default=DependencyFailurePolicy.FAIL_FAST, example="fail_fast")
+    # When the job becomes due; at most one of the two may be given
+    run_at: Optional[datetime.datetime] = Field(None, example="2026-01-01T09:00:00Z")
+    delay_seconds: Optional[float] = Field(None, ge=0, example=600)
+
+    @model_validator(mode="after")
+    def _one_due_time(self):
+        if self.run_at is not None and self.delay_seconds is not None:
+            raise ValueError("Give either run_at or delay_seconds, not both")
+        if self.run_at is not None and self.run_at.tzinfo is not None:
+            # Stored as naive UTC, like every other timestamp
+            self.run_at = self.run_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return self
+
+    def due_at(self, now: datetime.datetime) -> datetime.datetime:
+        """When the job becomes due if it is created at `now`."""
+        if self.delay_seconds is not None:
+            return now + datetime.timedelta(seconds=self.delay_seconds)
+        return self.run_at or now
 
 
 # Pydantic model for the data sent back by the API
@@ -24,13 +44,76 @@ class JobResponse(BaseModel):
     status: JobStatus
     created_at: datetime.datetime
     priority: PriorityLevel
+    run_at: Optional[datetime.datetime] = None
 
     # This is the new way to set ORM mode in Pydantic V2
     model_config = ConfigDict(from_attributes=True)
+
+# --- BULK SUBMISSION ---
+class JobBatchItem(JobCreate):
+    # A name other items in the same batch can list in their depends_on
+    ref: Optional[str] = Field(None, example="extract")
+
+
+class JobBatchResult(JobResponse):
+    index: int
+    ref: Optional[str] = None
+    # False when an existing job was returned for the item's idempotency key
+    created: bool
         
 class JobLogResponse(BaseModel):
     timestamp: datetime.datetime
     message: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+# --- RECURRING JOBS ---
+# Fields a schedule sets itself on every job it submits
+SCHEDULE_MANAGED_FIELDS = ("idempotency_key", "run_at", "delay_seconds", "depends_on")
+
+
+def _check_schedule(cron: Optional[str], job: Optional[JobCreate]):
+    if cron is not None:
+        # Raises ValueError, i.e. a 422, for an expression that never fires
+        CronExpression.parse(cron).next_after(datetime.datetime.utcnow())
+    if job is not None:
+        managed = [field for field in SCHEDULE_MANAGED_FIELDS if getattr(job, field) is not None]
+        if managed:
+            raise ValueError(f"A schedule's job sets its own {', '.join(managed)}")
+
+
+class JobScheduleCreate(BaseModel):
+    name: str = Field(..., example="nightly_export")
+    cron: str = Field(..., example="0 2 * * *")
+    # The job submitted every time the schedule fires
+    job: JobCreate
+    enabled: bool = True
+
+    @model_validator(mode="after")
+    def _valid_schedule(self):
+        _check_schedule(self.cron, self.job)
+        return self
+
+
+class JobScheduleUpdate(BaseModel):
+    cron: Optional[str] = Field(None, example="*/15 * * * *")
+    job: Optional[JobCreate] = None
+    enabled: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def _valid_schedule(self):
+        _check_schedule(self.cron, self.job)
+        return self
+
+
+class JobScheduleResponse(BaseModel):
+    name: str
+    cron: str
+    job: Dict[str, Any] = Field(validation_alias="job_template")
+    enabled: bool
+    next_fire_at: datetime.datetime
+    last_fired_at: Optional[datetime.datetime] = None
+    created_at: datetime.datetime
+
+    model_config = ConfigDict(from_attributes=True)
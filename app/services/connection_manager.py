@@ -1,26 +1,223 @@
 # In app/services/connection_manager.py
 
-from typing import List
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
 from fastapi import WebSocket
+from .. import models
+
+
+class Subscription:
+    """
+    The job events a client wants: any of the given job ids, job types and
+    statuses. A filter left empty matches every value.
+    """
+
+    FIELDS = (("job_ids", "job_id"), ("types", "type"), ("statuses", "status"))
+
+    def __init__(self, job_ids: Iterable[str] = (), types: Iterable[str] = (), statuses: Iterable[str] = ()):
+        self.job_ids: FrozenSet[str] = frozenset(job_ids)
+        self.types: FrozenSet[str] = frozenset(types)
+        self.statuses: FrozenSet[str] = frozenset(statuses)
+        for status in self.statuses:
+            models.JobStatus(status)  # raises ValueError for an unknown status
+
+    @classmethod
+    def from_message(cls, data: Any) -> "Subscription":
+        """Parses a client's subscribe message, e.g. {"action": "subscribe", "types": ["data_export"]}."""
+        if not isinstance(data, dict) or data.get("action") != "subscribe":
+            raise ValueError("expected a message like {\"action\": \"subscribe\", \"types\": [...]}")
+        filters = {}
+        for name, _ in cls.FIELDS:
+            values = data.get(name) or []
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                raise ValueError(f"'{name}' must be a list of strings")
+            filters[name] = values
+        return cls(**filters)
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return (
+            (not self.job_ids or event.get("job_id") in self.job_ids)
+            and (not self.types or event.get("type") in self.types)
+            and (not self.statuses or event.get("status") in self.statuses)
+        )
+
+    def index_keys(self) -> List[Tuple[str, str]]:
+        """
+        The keys this subscription is indexed under: the values of its most
+        selective filter. No keys means it receives every event.
+        """
+        for name, field in self.FIELDS:
+            values = getattr(self, name)
+            if values:
+                return [(field, value) for value in values]
+        return []
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        return {name: sorted(getattr(self, name)) for name, _ in self.FIELDS}
+
+
+class ClientConnection:
+    """
+    One WebSocket subscriber with its own bounded outbound queue.
+
+    Messages are queued without waiting and sent by a dedicated task, so a
+    slow client only ever delays itself. When the queue is full the oldest
+    message is dropped; a message published with the same key as one still
+    queued replaces it in place (e.g. only the latest status of a job).
+    """
+
+    def __init__(self, websocket: WebSocket, manager: "ConnectionManager"):
+        self.websocket = websocket
+        self.manager = manager
+        self.subscription = Subscription()
+        self.dropped = 0
+        self._queue: "OrderedDict[Hashable, str]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._sender: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._sender = asyncio.create_task(self._drain())
+
+    def stop(self):
+        if self._sender is not None and self._sender is not asyncio.current_task():
+            self._sender.cancel()
+        self._sender = None
+
+    def offer(self, message: str, key: Optional[Hashable] = None):
+        """Queues a message for this client without waiting."""
+        if key is None:
+            # Unkeyed messages are never coalesced
+            key = object()
+        elif key in self._queue:
+            # Coalesce: the newer message replaces the queued one
+            self._queue[key] = message
+            return
+
+        if len(self._queue) >= self.manager.max_queue_size:
+            self._queue.popitem(last=False)
+            self.dropped += 1
+        self._queue[key] = message
+        self._ready.set()
+
+    async def _drain(self):
+        while True:
+            await self._ready.wait()
+            while self._queue:
+                _, message = self._queue.popitem(last=False)
+                try:
+                    await asyncio.wait_for(
+                        self.websocket.send_text(message), timeout=self.manager.send_timeout
+                    )
+                except Exception as e:
+                    print(f"WEBSOCKET: Dropping client after failed send: {e!r}")
+                    self.manager.disconnect(self.websocket)
+                    # 1013 (try again later) for a client too slow to keep up
+                    await self._close(1013 if isinstance(e, asyncio.TimeoutError) else 1011)
+                    return
+            self._ready.clear()
+
+    async def _close(self, code: int):
+        """Closes a dropped client's socket, so it notices and reconnects."""
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), timeout=self.manager.send_timeout)
+        except Exception as e:
+            print(f"WEBSOCKET: Closing a dropped client failed: {e!r}")
+
 
 class ConnectionManager:
-    def __init__(self):
-        # A list to hold all active WebSocket connections
-        self.active_connections: List[WebSocket] = []
+    """
+    Tracks the WebSocket subscribers and routes job events to them.
+
+    Subscribers are indexed by the values of their most selective filter
+    (job id, then type, then status), so delivering an event only looks at
+    the clients indexed under its job id, type or status plus the clients
+    that want everything, instead of testing every connection.
+    """
+
+    def __init__(self, max_queue_size: int = 100, send_timeout: float = 5):
+        # Every active WebSocket connection with its outbound queue
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.max_queue_size = max_queue_size
+        self.send_timeout = send_timeout
+        # Filter key, e.g. ("type", "data_export"), to the clients indexed under it
+        self._index: Dict[Tuple[str, str], Set[ClientConnection]] = {}
+        # Clients without any filter
+        self._unfiltered: Set[ClientConnection] = set()
 
-    async def connect(self, websocket: WebSocket):
-        """Accepts a new connection and adds it to the list."""
+    async def connect(self, websocket: WebSocket, subscription: Optional[Subscription] = None):
+        """Accepts a new connection and starts its sender task."""
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self)
+        self.active_connections[websocket] = client
+        self._add_to_index(client, subscription or Subscription())
+        client.start()
 
     def disconnect(self, websocket: WebSocket):
-        """Removes a connection from the list."""
-        self.active_connections.remove(websocket)
+        """Removes a connection and stops its sender task. Safe to call twice."""
+        client = self.active_connections.pop(websocket, None)
+        if client is not None:
+            self._remove_from_index(client)
+            client.stop()
+
+    def subscribe(self, websocket: WebSocket, subscription: Subscription):
+        """Replaces a connected client's filters."""
+        client = self.active_connections.get(websocket)
+        if client is None:
+            return
+        self._remove_from_index(client)
+        self._add_to_index(client, subscription)
+        client.offer(json.dumps({"subscribed": subscription.to_dict()}))
+
+    def send_to(self, websocket: WebSocket, message: str):
+        """Queues a message for a single client."""
+        client = self.active_connections.get(websocket)
+        if client is not None:
+            client.offer(message)
+
+    def _add_to_index(self, client: ClientConnection, subscription: Subscription):
+        client.subscription = subscription
+        keys = subscription.index_keys()
+        if not keys:
+            self._unfiltered.add(client)
+        for key in keys:
+            self._index.setdefault(key, set()).add(client)
+
+    def _remove_from_index(self, client: ClientConnection):
+        self._unfiltered.discard(client)
+        for key in client.subscription.index_keys():
+            subscribers = self._index.get(key)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self._index[key]
+
+    def publish(self, message: str, key: Optional[Hashable] = None):
+        """Queues a message for every connected client without waiting on any of them."""
+        for client in list(self.active_connections.values()):
+            client.offer(message, key)
+
+    async def broadcast(self, message: str, key: Optional[Hashable] = None):
+        """Sends a message to all connected clients, see `publish`."""
+        self.publish(message, key)
+
+    def subscribers_for(self, event: Dict[str, Any]) -> Set[ClientConnection]:
+        """The clients whose filters match an event."""
+        candidates = set(self._unfiltered)
+        for field in ("job_id", "type", "status"):
+            candidates.update(self._index.get((field, event.get(field)), ()))
+        return {client for client in candidates if client.subscription.matches(event)}
 
-    async def broadcast(self, message: str):
-        """Sends a message to all connected clients."""
-        for connection in self.active_connections:
-            await connection.send_text(message)
+    def publish_job_events(self, events: List[Dict[str, Any]]):
+        """Sends each job event from the event bus, as JSON, to the clients subscribed to it."""
+        for event in events:
+            subscribers = self.subscribers_for(event)
+            if not subscribers:
+                continue
+            message = json.dumps(event)
+            for client in subscribers:
+                client.offer(message, key=event["job_id"])
 
 # Create a single, global instance of the manager that our entire app can use
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
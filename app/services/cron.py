@@ -0,0 +1,113 @@
+# In app/services/cron.py
+
+import datetime
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+MONTH_NAMES = {name: number for number, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+DAY_NAMES = {name: number for number, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# No schedule fires less often than this; a later fire means the expression never matches
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(field: str, low: int, high: int, names: Optional[Dict[str, int]] = None) -> FrozenSet[int]:
+    values = set()
+    for part in field.lower().split(","):
+        expression, _, step_text = part.partition("/")
+        step = int(step_text) if step_text else 1
+        if step < 1:
+            raise ValueError(f"Invalid step in '{part}'")
+        if expression == "*":
+            start, end = low, high
+        else:
+            start_text, dash, end_text = expression.partition("-")
+            start = _parse_value(start_text, names)
+            # "5/15" means from 5 to the end of the range
+            end = _parse_value(end_text, names) if dash else (high if step_text else start)
+        if not low <= start <= end <= high:
+            raise ValueError(f"'{part}' is outside {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+def _parse_value(text: str, names: Optional[Dict[str, int]]) -> int:
+    if names and text in names:
+        return names[text]
+    if not text.isdigit():
+        raise ValueError(f"Invalid value '{text}'")
+    return int(text)
+
+
+@dataclass(frozen=True)
+class CronExpression:
+    """
+    A standard five-field cron expression: minute, hour, day of month,
+    month and day of week, in UTC.
+
+    Fields accept `*`, numbers, ranges (`1-5`), lists (`1,15`), steps
+    (`*/10`, `0-30/5`) and month and day names (`jan`, `mon`). Sunday is
+    0 or 7. As in cron, when both day of month and day of week are
+    restricted, a day matching either one fires. The `@hourly`, `@daily`,
+    `@weekly`, `@monthly` and `@yearly` macros are accepted too.
+    """
+    minutes: FrozenSet[int]
+    hours: FrozenSet[int]
+    days: FrozenSet[int]
+    months: FrozenSet[int]
+    weekdays: FrozenSet[int]
+    any_day: bool
+    any_weekday: bool
+
+    @classmethod
+    def parse(cls, expression: str) -> "CronExpression":
+        text = MACROS.get(expression.strip().lower(), expression)
+        fields = text.split()
+        if len(fields) != 5:
+            raise ValueError(f"A cron expression has 5 fields, got {len(fields)}: '{expression}'")
+        minute, hour, day, month, weekday = fields
+        weekdays = _parse_field(weekday, 0, 7, DAY_NAMES)
+        return cls(
+            minutes=_parse_field(minute, 0, 59),
+            hours=_parse_field(hour, 0, 23),
+            days=_parse_field(day, 1, 31),
+            months=_parse_field(month, 1, 12, MONTH_NAMES),
+            weekdays=frozenset(value % 7 for value in weekdays),
+            any_day=day == "*",
+            any_weekday=weekday == "*",
+        )
+
+    def _day_matches(self, day: datetime.date) -> bool:
+        in_month = day.day in self.days
+        # isoweekday() is 1 (Monday) to 7 (Sunday); cron counts from Sunday = 0
+        in_week = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_month and in_week
+        return in_month or in_week
+
+    def next_after(self, after: datetime.datetime) -> datetime.datetime:
+        """The first fire time strictly after `after`, a naive UTC datetime."""
+        moment = after.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        day = moment.date()
+        for _ in range(MAX_SEARCH_DAYS):
+            if day.month in self.months and self._day_matches(day):
+                start = moment.time() if day == moment.date() else datetime.time()
+                for hour in sorted(h for h in self.hours if h >= start.hour):
+                    first_minute = start.minute if hour == start.hour else 0
+                    minute = min((m for m in self.minutes if m >= first_minute), default=None)
+                    if minute is not None:
+                        return datetime.datetime.combine(day, datetime.time(hour, minute))
+            day += datetime.timedelta(days=1)
+        raise ValueError("The cron expression never fires")
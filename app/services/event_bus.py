@@ -0,0 +1,173 @@
+# In app/services/event_bus.py
+
+import abc
+import asyncio
+import datetime
+import json
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .. import models
+from ..database import engine
+from .notifier import JobsListener
+
+# Postgres channel carrying batches of job status events
+EVENTS_CHANNEL = "job_events"
+
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+JobEvent = Dict[str, Any]
+
+
+def job_event(job: models.Job) -> JobEvent:
+    """The structured status event published for a job."""
+    return {
+        "job_id": job.job_id,
+        "type": job.type,
+        "status": job.status.value,
+        "attempt": job.current_attempt,
+        "error": job.last_error if job.status == models.JobStatus.FAILED else None,
+        "at": datetime.datetime.utcnow().isoformat(),
+    }
+
+
+def status_event(job_id: str, status: models.JobStatus, job_type: Optional[str] = None) -> JobEvent:
+    """A minimal event for jobs changed in bulk, where the full row is not loaded."""
+    return {"job_id": job_id, "type": job_type, "status": status.value, "at": datetime.datetime.utcnow().isoformat()}
+
+
+class EventBus(abc.ABC):
+    """
+    Carries job status events from whoever changes a job to whoever shows it.
+
+    Published events are buffered and delivered in batches, at most one per
+    tick, so a burst of status changes costs one delivery instead of one per
+    event. Subscribers receive each batch as a list.
+    """
+
+    def __init__(self, tick: float = 0.05):
+        self.tick = tick
+        self._buffer: List[JobEvent] = []
+        self._subscribers: List[Callable[[List[JobEvent]], None]] = []
+        self._flusher: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[List[JobEvent]], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[List[JobEvent]], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def publish(self, event: JobEvent):
+        """Queues an event; it is delivered with the rest of this tick's batch."""
+        self._buffer.append(event)
+        if self._flusher is None or self._flusher.done() or self._flusher.get_loop() is not asyncio.get_running_loop():
+            self._flusher = asyncio.create_task(self._flush_after_tick())
+
+    async def _flush_after_tick(self):
+        await asyncio.sleep(self.tick)
+        await self.flush()
+
+    async def flush(self):
+        """Delivers everything buffered so far."""
+        events, self._buffer = self._buffer, []
+        if not events:
+            return
+        try:
+            await self._deliver(events)
+        except Exception as e:
+            print(f"EVENT_BUS: Failed to deliver {len(events)} event(s): {e!r}")
+
+    def _dispatch(self, events: List[JobEvent]):
+        for callback in list(self._subscribers):
+            callback(events)
+
+    @abc.abstractmethod
+    async def _deliver(self, events: List[JobEvent]):
+        """Sends one batch of events on to the subscribers."""
+
+    async def start(self):
+        """Starts receiving events for the subscribers, if the backend needs to."""
+
+    async def stop(self):
+        if self._flusher is not None and not self._flusher.done():
+            self._flusher.cancel()
+        await self.flush()
+
+
+class InMemoryEventBus(EventBus):
+    """Delivers events to subscribers in the same process. Used with SQLite and in tests."""
+
+    async def _deliver(self, events: List[JobEvent]):
+        self._dispatch(events)
+
+
+class PostgresEventBus(EventBus):
+    """
+    Delivers events between processes with Postgres NOTIFY.
+
+    Each tick's batch is sent as JSON arrays, split to stay under the NOTIFY
+    payload limit, in a single statement. Processes with subscribers LISTEN
+    on the channel and hand every received batch to them.
+    """
+
+    def __init__(self, db_engine: AsyncEngine, tick: float = 0.05):
+        super().__init__(tick)
+        self.db_engine = db_engine
+        self._listener: Optional[JobsListener] = None
+
+    async def _deliver(self, events: List[JobEvent]):
+        async with self.db_engine.begin() as connection:
+            await connection.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": EVENTS_CHANNEL, "payloads": _chunk_payloads(events)},
+            )
+
+    def _on_payload(self, payload: str):
+        self._dispatch(json.loads(payload))
+
+    async def start(self):
+        if self._subscribers and self._listener is None:
+            self._listener = JobsListener(self.db_engine, self._on_payload, channel=EVENTS_CHANNEL)
+            await self._listener.start()
+
+    async def stop(self):
+        await super().stop()
+        if self._listener is not None:
+            await self._listener.stop()
+            self._listener = None
+
+
+def _chunk_payloads(events: List[JobEvent]) -> List[str]:
+    """Packs events into as few JSON arrays as the NOTIFY size limit allows."""
+    payloads, chunk, size = [], [], 2
+    for event in events:
+        encoded = json.dumps(event)
+        if chunk and size + len(encoded) + 1 > MAX_NOTIFY_PAYLOAD_BYTES:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    if chunk:
+        payloads.append("[" + ",".join(chunk) + "]")
+    return payloads
+
+
+# Shared by every component of a process that runs without Postgres
+local_event_bus = InMemoryEventBus()
+
+
+def create_event_bus(db_engine: AsyncEngine) -> EventBus:
+    """Picks the backend matching the database the process talks to."""
+    if db_engine.dialect.name == "postgresql":
+        return PostgresEventBus(db_engine)
+    return local_event_bus
+
+
+# The API's event bus
+event_bus = create_event_bus(engine)
+
+# Dependency to get the event bus
+def get_event_bus() -> EventBus:
+    return event_bus
@@ -0,0 +1,58 @@
+# In app/services/idempotency.py
+
+import datetime
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from ..config import settings
+
+
+class IdempotencyCache:
+    """
+    An in-process LRU cache of recently used idempotency keys and the id of
+    the job each one created.
+
+    A client retrying a submission is answered with a lookup of that job by
+    its id instead of another insert. Only the id is cached, so the answer
+    shows the job as it is now. Entries expire after `ttl_seconds`, and
+    never outlive the key's own deduplication window. The least recently
+    used entry is evicted once `max_size` keys are cached.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float, key_ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.key_ttl_seconds = key_ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, job_id = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return job_id
+
+    def put(self, key: str, job_id: str, created_at: datetime.datetime):
+        key_age = (datetime.datetime.utcnow() - created_at).total_seconds()
+        ttl = min(self.ttl_seconds, self.key_ttl_seconds - key_age)
+        if self.max_size <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, job_id)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+# The API's cache, shared by every request in the process
+idempotency_cache = IdempotencyCache(
+    max_size=settings.idempotency_cache_size,
+    ttl_seconds=settings.idempotency_cache_ttl_seconds,
+    key_ttl_seconds=settings.idempotency_key_ttl_seconds,
+)
@@ -1,57 +1,743 @@
 # In app/services/job_service.py
 
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy import and_, case, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, List, Set, Tuple
 from .. import models, schemas
+from ..config import settings
+from .limits import JobLimiter
+from .resource_manager import pool_budget
+from .scheduling import DEFAULT_RUNTIME_SECONDS, Candidate, Running, SchedulingPolicy, get_policy
+from .notifier import notify_job_changes, notify_status_changes
+import base64
+import datetime
+import random
 import uuid
 from fastapi import HTTPException
 
-def create_job(db: Session, job_in: schemas.JobCreate) -> models.Job:
-    """Creates a new job in the database, handling idempotency."""
+def _lock_dependencies(db: AsyncSession, stmt):
+    """
+    Share-locks the dependency rows a new job is counted against on Postgres.
 
-    # --- NEW IDEMPOTENCY CHECK ---
-    if job_in.idempotency_key:
-        existing_job = db.query(models.Job).filter(
-            models.Job.idempotency_key == job_in.idempotency_key
-        ).first()
-        if existing_job:
-            print(f"SERVICE: Idempotency key '{job_in.idempotency_key}' already used. Returning existing job {existing_job.job_id}.")
-            return existing_job
-    # -----------------------------
+    A dependency finishing concurrently then waits for our commit, so its
+    release_dependents UPDATE sees the new edge and no decrement is lost.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return stmt.with_for_update(read=True)
+    return stmt
+
+def _insert_jobs(db: AsyncSession):
+    """
+    INSERT INTO jobs ... ON CONFLICT (idempotency_key) DO NOTHING.
 
-    job_data = job_in.model_dump()
-    depends_on_ids = job_data.pop("depends_on", None)
+    A row whose key is already taken is skipped instead of failing the
+    transaction, so concurrent retries of a submission never surface an
+    IntegrityError. Rows without a key never conflict.
+    """
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(models.Job).on_conflict_do_nothing(index_elements=[models.Job.idempotency_key])
 
-    db_job = models.Job(
+# Statuses of a dependency that will never succeed
+UNSUCCESSFUL_STATUSES = (models.JobStatus.FAILED, models.JobStatus.CANCELLED)
+
+def new_job_row(
+    job_in: schemas.JobCreate,
+    now: datetime.datetime,
+    unmet_deps: int = 0,
+    exclude: Set[str] = frozenset(),
+    failed_dependency: Optional[str] = None,
+) -> dict:
+    """
+    The jobs row of a submission created at `now`, waiting on `unmet_deps`
+    dependencies. `failed_dependency` names one that already ended FAILED or
+    CANCELLED: propagate_failure has run for it, so the job's
+    on_dependency_failure is applied here. A fail_fast job is created
+    CANCELLED; a waiting one stays BLOCKED until it is cancelled by hand.
+    """
+    row = job_in.model_dump(exclude={"depends_on", "delay_seconds", *exclude})
+    row.update(
         job_id=f"job_{uuid.uuid4().hex[:12]}",
-        **job_data
+        status=models.JobStatus.BLOCKED if unmet_deps else models.JobStatus.PENDING,
+        unmet_deps=unmet_deps,
+        priority_rank=models.PRIORITY_RANKS[job_in.priority],
+        created_at=now,
+        run_at=job_in.due_at(now),
+        # Every row of a multi-row INSERT needs the same columns
+        completed_at=None,
+        last_error=None,
     )
+    if failed_dependency is not None and job_in.on_dependency_failure == models.DependencyFailurePolicy.FAIL_FAST:
+        row.update(
+            status=models.JobStatus.CANCELLED,
+            completed_at=now,
+            last_error=f"Cancelled because dependency {failed_dependency} had already failed or been cancelled",
+        )
+    return row
+
+def _idempotency_cutoff() -> datetime.datetime:
+    """Jobs created before this no longer deduplicate submissions with their key."""
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=settings.idempotency_key_ttl_seconds)
 
+async def _release_expired_keys(db: AsyncSession, keys: List[str]):
+    """Frees idempotency keys whose window has passed, so they can be used again."""
+    await db.execute(
+        update(models.Job)
+        .where(models.Job.idempotency_key.in_(keys), models.Job.created_at < _idempotency_cutoff())
+        .values(idempotency_key=None),
+        execution_options={"synchronize_session": False},
+    )
+
+async def _job_with_key(db: AsyncSession, key: str) -> Optional[models.Job]:
+    return (await db.execute(
+        select(models.Job).where(models.Job.idempotency_key == key)
+    )).scalars().first()
+
+async def create_job(db: AsyncSession, job_in: schemas.JobCreate) -> models.Job:
+    """
+    Creates a new job in the database, handling idempotency.
+
+    The job is written with INSERT ... ON CONFLICT DO NOTHING RETURNING. When
+    its key is taken, the job that holds the key is returned instead, unless
+    it was created before the key's window, in which case the key is freed
+    and the insert retried. A concurrent submission that takes the freed key
+    first wins, and its job is returned.
+    """
+    depends_on_ids = job_in.depends_on or []
+    dependencies = []
     if depends_on_ids:
-        dependencies = db.query(models.Job).filter(models.Job.job_id.in_(depends_on_ids)).all()
-        if len(dependencies) != len(depends_on_ids):
+        dependencies = (await db.execute(_lock_dependencies(
+            db, select(models.Job.id, models.Job.status, models.Job.job_id)
+            .where(models.Job.job_id.in_(set(depends_on_ids)))
+        ))).all()
+        if len(dependencies) != len(set(depends_on_ids)):
             raise HTTPException(status_code=400, detail="One or more dependencies not found")
-        db_job.dependencies.extend(dependencies)
 
-    db.add(db_job)
-    db.commit()
-    db.refresh(db_job)
-    return db_job
+    unmet_deps = sum(1 for _, status, _ in dependencies if status != models.JobStatus.SUCCESS)
+    failed = [job_id for _, status, job_id in dependencies if status in UNSUCCESSFUL_STATUSES]
+    now = datetime.datetime.utcnow()
+    row = new_job_row(job_in, now, unmet_deps, failed_dependency=failed[0] if failed else None)
 
-def get_job(db: Session, job_id: str) -> Optional[models.Job]:
-    return db.query(models.Job).filter(models.Job.job_id == job_id).first()
+    job_pk = (await db.execute(_insert_jobs(db).values(row).returning(models.Job.id))).scalar()
+    if job_pk is None:
+        existing_job = await _job_with_key(db, job_in.idempotency_key)
+        if existing_job is not None and existing_job.created_at >= _idempotency_cutoff():
+            print(f"SERVICE: Idempotency key '{job_in.idempotency_key}' already used. Returning existing job {existing_job.job_id}.")
+            await db.commit()
+            return existing_job
+        # The key's window has passed (or its job was deleted meanwhile)
+        await _release_expired_keys(db, [job_in.idempotency_key])
+        job_pk = (await db.execute(_insert_jobs(db).values(row).returning(models.Job.id))).scalar()
+        if job_pk is None:
+            # A concurrent submission took the freed key first; its job is the answer
+            existing_job = await _job_with_key(db, job_in.idempotency_key)
+            if existing_job is None:
+                raise HTTPException(status_code=409, detail="This idempotency key is being used concurrently")
+            await db.commit()
+            return existing_job
+
+    if dependencies:
+        await db.execute(
+            insert(models.JobDependency),
+            [{"job_id": job_pk, "depends_on_id": dep_pk} for dep_pk, _, _ in dependencies],
+        )
+    await notify_status_changes(db, [(row["job_id"], row["status"], row["run_at"])])
+    await db.commit()
+    return await db.get(models.Job, job_pk)
+
+# The largest batch accepted in one request; producers chunk bigger fan-outs
+MAX_BATCH_SIZE = 10000
+
+def _result_fields(job) -> dict:
+    """The JobResponse fields of an ORM job or of a row dict about to be inserted."""
+    if isinstance(job, dict):
+        return {field: job[field] for field in ("job_id", "type", "status", "created_at", "priority", "run_at")}
+    return dict(
+        job_id=job.job_id, type=job.type, status=job.status,
+        created_at=job.created_at, priority=job.priority, run_at=job.run_at,
+    )
+
+async def create_jobs_bulk(
+    db: AsyncSession, items: List[schemas.JobBatchItem], retry_on_conflict: bool = True
+) -> List[schemas.JobBatchResult]:
+    """
+    Creates many jobs in one transaction with set-based queries.
+
+    Idempotency keys and external dependencies are each resolved with a
+    single SELECT, the new jobs are written with one multi-row INSERT and
+    their dependency edges with another. An item's depends_on may name
+    existing job ids or the `ref` of an earlier item in the same batch.
+
+    If a concurrent submission takes one of the batch's idempotency keys
+    between the SELECT and the INSERT, the batch is rolled back and resolved
+    once more, now finding that job.
+    """
+    # 1. Resolve every idempotency key in the batch at once
+    keys = {item.idempotency_key for item in items if item.idempotency_key}
+    existing_by_key: Dict[str, models.Job] = {}
+    if keys:
+        existing_by_key = {
+            job.idempotency_key: job
+            for job in (await db.execute(
+                select(models.Job).where(models.Job.idempotency_key.in_(keys))
+            )).scalars()
+        }
+        cutoff = _idempotency_cutoff()
+        expired = [key for key, job in existing_by_key.items() if job.created_at < cutoff]
+        if expired:
+            await _release_expired_keys(db, expired)
+            for key in expired:
+                del existing_by_key[key]
+
+    # 2. Resolve every dependency that is not a reference inside the batch
+    refs = set()
+    for index, item in enumerate(items):
+        if item.ref in refs:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Item {index} reuses the ref '{item.ref}' of an earlier item",
+            )
+        if item.ref:
+            refs.add(item.ref)
+    external_ids = {
+        dep for item in items for dep in (item.depends_on or []) if dep not in refs
+    }
+    external_pks: Dict[str, int] = {}
+    done_job_ids = {job.job_id for job in existing_by_key.values() if job.status == models.JobStatus.SUCCESS}
+    failed_job_ids = {job.job_id for job in existing_by_key.values() if job.status in UNSUCCESSFUL_STATUSES}
+    if external_ids:
+        external = (await db.execute(_lock_dependencies(
+            db, select(models.Job.job_id, models.Job.id, models.Job.status).where(models.Job.job_id.in_(external_ids))
+        ))).all()
+        if len(external) != len(external_ids):
+            raise HTTPException(status_code=400, detail="One or more dependencies not found")
+        external_pks = {job_id: pk for job_id, pk, _ in external}
+        done_job_ids.update(job_id for job_id, _, status in external if status == models.JobStatus.SUCCESS)
+        failed_job_ids.update(job_id for job_id, _, status in external if status in UNSUCCESSFUL_STATUSES)
 
-def get_candidate_jobs(db: Session, limit: int = 10) -> List[models.Job]:
-    return db.query(models.Job).filter(
-        models.Job.status == models.JobStatus.PENDING
+    # 3. Build the rows to insert, skipping items answered by an idempotency key
+    now = datetime.datetime.utcnow()
+    rows = []
+    results: List[Optional[dict]] = [None] * len(items)
+    job_id_by_ref: Dict[str, str] = {}
+    row_for_key: Dict[str, dict] = {}
+    for index, item in enumerate(items):
+        existing = existing_by_key.get(item.idempotency_key) if item.idempotency_key else None
+        duplicate = row_for_key.get(item.idempotency_key) if item.idempotency_key else None
+        if existing is not None or duplicate is not None:
+            source = _result_fields(existing) if existing is not None else _result_fields(duplicate)
+            results[index] = dict(source, created=False)
+            if item.ref:
+                job_id_by_ref[item.ref] = source["job_id"]
+            continue
+
+        for dep in item.depends_on or []:
+            if dep in refs and dep not in job_id_by_ref:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Item {index} depends on '{dep}', which is not the ref of an earlier item",
+                )
+
+        dep_job_ids = {job_id_by_ref.get(dep, dep) for dep in item.depends_on or []}
+        unmet_deps = len(dep_job_ids - done_job_ids)
+        failed = sorted(dep_job_ids & failed_job_ids)
+        row = new_job_row(item, now, unmet_deps, exclude={"ref"}, failed_dependency=failed[0] if failed else None)
+        rows.append(row)
+        if row["status"] == models.JobStatus.CANCELLED:
+            # Later items of the batch that depend on this one are handled the same way
+            failed_job_ids.add(row["job_id"])
+        results[index] = dict(_result_fields(row), created=True)
+        if item.ref:
+            job_id_by_ref[item.ref] = row["job_id"]
+        if item.idempotency_key:
+            row_for_key[item.idempotency_key] = row
+
+    # 4. One multi-row INSERT for the jobs, one for their dependency edges
+    pk_by_job_id = dict(external_pks)
+    pk_by_job_id.update({job.job_id: job.id for job in existing_by_key.values()})
+    if rows:
+        inserted = (await db.execute(_insert_jobs(db).returning(models.Job.job_id, models.Job.id), rows)).all()
+        if len(inserted) < len(rows):
+            await db.rollback()
+            if not retry_on_conflict:
+                raise HTTPException(status_code=409, detail="Idempotency keys of this batch are being used concurrently")
+            return await create_jobs_bulk(db, items, retry_on_conflict=False)
+        pk_by_job_id.update(dict(inserted))
+
+        edges = []
+        for index, item in enumerate(items):
+            if not results[index]["created"]:
+                continue
+            job_pk = pk_by_job_id[results[index]["job_id"]]
+            for dep in set(item.depends_on or []):
+                dep_job_id = job_id_by_ref.get(dep, dep)
+                edges.append({"job_id": job_pk, "depends_on_id": pk_by_job_id[dep_job_id]})
+        if edges:
+            await db.execute(insert(models.JobDependency), edges)
+
+        await notify_status_changes(db, [(row["job_id"], row["status"], row["run_at"]) for row in rows])
+    await db.commit()
+
+    response = [
+        schemas.JobBatchResult(index=index, ref=item.ref, **results[index])
+        for index, item in enumerate(items)
+    ]
+    print(f"SERVICE: Bulk submission created {len(rows)} of {len(items)} job(s).")
+    return response
+
+async def get_job(db: AsyncSession, job_id: str) -> Optional[models.Job]:
+    return (await db.execute(
+        select(models.Job).where(models.Job.job_id == job_id)
+    )).scalars().first()
+
+# --- JOB LISTING ---
+# Only the columns a JobResponse renders, plus the id that breaks ties
+# between jobs created in the same instant. The payload is never loaded.
+JOB_LIST_COLUMNS = (
+    models.Job.id,
+    models.Job.job_id,
+    models.Job.type,
+    models.Job.status,
+    models.Job.created_at,
+    models.Job.priority,
+    models.Job.run_at,
+)
+
+def encode_cursor(created_at: datetime.datetime, pk: int) -> str:
+    """An opaque cursor pointing just past the given row."""
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime.datetime, int]:
+    """Reverses encode_cursor. Raises ValueError for a cursor we did not issue."""
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.datetime.fromisoformat(created_at), int(pk)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def list_jobs_query(
+    status: Optional[models.JobStatus] = None,
+    job_type: Optional[str] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    The job listing, newest first, as a keyset query.
+
+    Rows are ordered by (created_at, id) and a cursor resumes strictly after
+    the last row of the previous page, so every page is an index range scan
+    on ix_jobs_created_at_id or its status/type variant instead of an OFFSET.
+    """
+    query = select(*JOB_LIST_COLUMNS)
+    if status:
+        query = query.where(models.Job.status == status)
+    if job_type:
+        query = query.where(models.Job.type == job_type)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        query = query.where(tuple_(models.Job.created_at, models.Job.id) < tuple_(created_at, pk))
+    return query.order_by(models.Job.created_at.desc(), models.Job.id.desc())
+
+async def list_jobs(
+    db: AsyncSession,
+    status: Optional[models.JobStatus] = None,
+    job_type: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Returns one page of the job listing and the cursor of the next page, if there is one."""
+    query = list_jobs_query(status=status, job_type=job_type, cursor=cursor)
+    # One extra row tells whether another page follows
+    rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
+
+# --- JOB LOGS ---
+# Statuses after which a job writes no more log lines
+FINISHED_STATUSES = (models.JobStatus.SUCCESS, models.JobStatus.FAILED, models.JobStatus.CANCELLED)
+
+def job_logs_query(
+    job_pk: int,
+    since: Optional[datetime.datetime] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    A job's log lines in the order they were written, as a keyset query on
+    ix_job_logs_job_id_timestamp. `since` skips lines older than a time and
+    `cursor` resumes strictly after a line returned earlier.
+    """
+    query = select(models.JobLog.id, models.JobLog.timestamp, models.JobLog.message).where(
+        models.JobLog.job_id == job_pk
+    )
+    if since:
+        query = query.where(models.JobLog.timestamp >= since)
+    if cursor:
+        timestamp, pk = decode_cursor(cursor)
+        query = query.where(tuple_(models.JobLog.timestamp, models.JobLog.id) > tuple_(timestamp, pk))
+    return query.order_by(models.JobLog.timestamp, models.JobLog.id)
+
+async def list_job_logs(
+    db: AsyncSession,
+    job_pk: int,
+    since: Optional[datetime.datetime] = None,
+    limit: int = 1000,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Returns one page of a job's log and the cursor of the next page, if there is one."""
+    query = job_logs_query(job_pk, since=since, cursor=cursor)
+    rows = (await db.execute(query.limit(limit + 1))).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return rows, next_cursor
+
+def _ready_jobs_query():
+    """
+    The dequeue query shared by the candidate listing and the claim path.
+
+    Filters and orders exactly on the columns of the partial ix_jobs_dequeue
+    index, so it is an index range scan over pending rows only: highest
+    priority first, then the job that became due earliest.
+    """
+    now = datetime.datetime.utcnow()
+    return select(models.Job).where(
+        models.Job.status == models.JobStatus.PENDING,
+        models.Job.unmet_deps == 0,
+        models.Job.run_at <= now,
     ).order_by(
-        models.Job.priority.desc(), models.Job.created_at.asc()
-    ).limit(limit).all()
-
-def are_dependencies_met(job: models.Job) -> bool:
-    """Check if all dependencies for a job are met."""
-    for dep in job.dependencies:
-        if dep.status != models.JobStatus.SUCCESS:
-            print(f"WORKER: Job {job.job_id} is waiting for dependency {dep.job_id} (status: {dep.status.value})")
-            return False
-    return True
\ No newline at end of file
+        models.Job.priority_rank.asc(), models.Job.run_at.asc(), models.Job.created_at.asc()
+    )
+
+async def get_candidate_jobs(db: AsyncSession, limit: int = 10) -> List[models.Job]:
+    return (await db.execute(_ready_jobs_query().limit(limit))).scalars().all()
+
+async def next_due_times(db: AsyncSession, limit: int) -> List[datetime.datetime]:
+    """
+    When the next delayed jobs become due, earliest first: pending jobs whose
+    run_at is still ahead, e.g. scheduled submissions and retries waiting
+    out their backoff. Served by the run_at index from `now` onwards.
+    """
+    now = datetime.datetime.utcnow()
+    return (await db.execute(
+        select(models.Job.run_at)
+        .where(
+            models.Job.status == models.JobStatus.PENDING,
+            models.Job.unmet_deps == 0,
+            models.Job.run_at > now,
+        )
+        .order_by(models.Job.run_at.asc())
+        .limit(limit)
+    )).scalars().all()
+
+def get_resource_requirements(job: models.Job) -> Tuple[int, int]:
+    """Returns the (cpu_units, memory_mb) a job asks for, defaulting to zero."""
+    if not job.resource_requirements:
+        return 0, 0
+    return (job.resource_requirements.get("cpu_units", 0),
+            job.resource_requirements.get("memory_mb", 0))
+
+def _runtime(job: models.Job) -> float:
+    return job.timeout_seconds or DEFAULT_RUNTIME_SECONDS
+
+
+async def _running_on_worker(db: AsyncSession, worker_id: str) -> List[Running]:
+    """The jobs a worker is running, with when each ends at the latest (found via ix_jobs_running_worker)."""
+    now = datetime.datetime.utcnow()
+    rows = (await db.execute(
+        select(
+            models.Job.started_at,
+            models.Job.timeout_seconds,
+            models.Job.allocated_cpu,
+            models.Job.allocated_memory_mb,
+        ).where(models.Job.status == models.JobStatus.RUNNING, models.Job.worker_id == worker_id)
+    )).all()
+    running = []
+    for row in rows:
+        elapsed = (now - row.started_at).total_seconds() if row.started_at else 0
+        ends_in = max(0.0, (row.timeout_seconds or DEFAULT_RUNTIME_SECONDS) - elapsed)
+        running.append(Running(row.allocated_cpu, row.allocated_memory_mb, ends_in))
+    return running
+
+
+async def claim_jobs(
+    db: AsyncSession,
+    worker_id: str,
+    cpu_available: int,
+    memory_available: int,
+    limit: int = 10,
+    window: int = 200,
+    lease_seconds: int = settings.lease_seconds,
+    cpu_total: Optional[int] = None,
+    memory_total: Optional[int] = None,
+    policy: Optional[SchedulingPolicy] = None,
+    limiter: Optional[JobLimiter] = None,
+) -> List[models.Job]:
+    """
+    Atomically leases ready jobs for one worker.
+
+    Loads up to `window` ready jobs (locked FOR UPDATE SKIP LOCKED where the
+    database supports it), lets `policy` choose which to start within the
+    budget, capped by the worker's resource pools and by `limiter`, and flips
+    the chosen jobs to RUNNING with this worker's id and lease in the same
+    transaction. `cpu_total`/`memory_total` default to the budget.
+    ARCHITECTURE.md describes the policies, pools and limits involved.
+
+    The returned jobs are read after the commit, so the session must not
+    expire them on commit (SessionLocal is configured that way).
+    """
+    dialect = db.get_bind().dialect.name
+    policy = policy or get_policy(settings.scheduling_policy)
+    total = (
+        cpu_available if cpu_total is None else cpu_total,
+        memory_available if memory_total is None else memory_total,
+    )
+    # The node pool is only shared with this worker's own claims
+    node_budget = await pool_budget(db, [worker_id])
+    if node_budget is not None:
+        cpu_available = min(cpu_available, node_budget[0])
+        memory_available = min(memory_available, node_budget[1])
+
+    stmt = _ready_jobs_query()
+    if limiter is not None:
+        if limiter.needs_reconcile():
+            await limiter.reconcile(db, worker_id)
+        stmt = limiter.exclude_throttled(stmt)
+    if policy.window_per_priority:
+        # One index range scan per priority, each filling its share of the window
+        ranks = sorted(set(models.PRIORITY_RANKS.values()))
+        windows = [
+            stmt.where(models.Job.priority_rank == rank).limit(max(1, window // len(ranks))) for rank in ranks
+        ]
+    else:
+        windows = [stmt.limit(window)]
+    now = datetime.datetime.utcnow()
+    candidates = []
+    for window_stmt in windows:
+        if dialect == "postgresql":
+            window_stmt = window_stmt.with_for_update(skip_locked=True)
+        candidates.extend(
+            Candidate(
+                job, job.priority_rank, *get_resource_requirements(job), runtime=_runtime(job),
+                waited=(now - job.run_at).total_seconds(), job_type=job.type,
+            )
+            for job in (await db.execute(window_stmt)).scalars().all()
+        )
+    if limiter is not None:
+        candidates = limiter.admit(candidates)
+    if any(candidate.cpu or candidate.memory for candidate in candidates):
+        # Only claims that take resources queue up on the cluster pool's lock
+        cluster_budget = await pool_budget(db, [models.CLUSTER_POOL])
+        if cluster_budget is not None:
+            cpu_available = min(cpu_available, cluster_budget[0])
+            memory_available = min(memory_available, cluster_budget[1])
+    running = await _running_on_worker(db, worker_id) if candidates else []
+
+    selected = policy.select(candidates, (cpu_available, memory_available), total, limit, running)
+    chosen = [candidate.job for candidate in selected]
+    allocations: Dict[int, Tuple[int, int]] = {
+        candidate.job.id: (candidate.cpu, candidate.memory) for candidate in selected
+    }
+
+    if not chosen:
+        # Ends the transaction, releasing any row locks we took
+        await db.rollback()
+        return []
+
+    now = datetime.datetime.utcnow()
+    lease = dict(
+        status=models.JobStatus.RUNNING,
+        worker_id=worker_id,
+        lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+        started_at=now,
+        current_attempt=models.Job.current_attempt + 1,
+    )
+
+    if dialect == "postgresql":
+        await db.execute(
+            update(models.Job)
+            .where(models.Job.id.in_([job.id for job in chosen]))
+            .values(
+                allocated_cpu=case({pk: cpu for pk, (cpu, _) in allocations.items()}, value=models.Job.id),
+                allocated_memory_mb=case({pk: mem for pk, (_, mem) in allocations.items()}, value=models.Job.id),
+                **lease,
+            )
+        )
+        claimed = chosen
+    else:
+        # --- SQLITE FALLBACK: per-row compare-and-set on the status ---
+        claimed = []
+        for job in chosen:
+            result = await db.execute(
+                update(models.Job)
+                .where(models.Job.id == job.id, models.Job.status == models.JobStatus.PENDING)
+                .values(allocated_cpu=allocations[job.id][0], allocated_memory_mb=allocations[job.id][1], **lease)
+            )
+            if result.rowcount == 1:
+                claimed.append(job)
+
+    await notify_job_changes(db, claimed)
+    await db.commit()
+    if limiter is not None:
+        for job in claimed:
+            limiter.acquire(limiter.keys(job.type, job.payload))
+    print(f"SERVICE: Worker {worker_id} claimed {len(claimed)} job(s).")
+    return claimed
+
+async def release_dependents(db: AsyncSession, job: models.Job) -> List[Tuple[str, str]]:
+    """
+    Counts a job's SUCCESS against all of its direct dependents.
+
+    Runs in the caller's transaction, next to the status change: every
+    dependent's unmet_deps is decremented and those left with none are moved
+    from BLOCKED to PENDING. Returns the (job_id, type) of each job that was
+    unblocked.
+    """
+    dependent_ids = select(models.JobDependency.job_id).where(
+        models.JobDependency.depends_on_id == job.id
+    )
+    await db.execute(
+        update(models.Job)
+        .where(models.Job.id.in_(dependent_ids))
+        .values(unmet_deps=models.Job.unmet_deps - 1),
+        execution_options={"synchronize_session": False},
+    )
+    unblocked = (await db.execute(
+        update(models.Job)
+        .where(
+            models.Job.id.in_(dependent_ids),
+            models.Job.unmet_deps <= 0,
+            models.Job.status == models.JobStatus.BLOCKED,
+        )
+        .values(status=models.JobStatus.PENDING)
+        .returning(models.Job.job_id, models.Job.type, models.Job.run_at),
+        execution_options={"synchronize_session": False},
+    )).all()
+
+    if unblocked:
+        print(f"SERVICE: Job {job.job_id} succeeded, unblocking {len(unblocked)} dependent job(s).")
+        await notify_status_changes(db, [(job_id, models.JobStatus.PENDING, run_at) for job_id, _, run_at in unblocked])
+    return [(job_id, job_type) for job_id, job_type, _ in unblocked]
+
+async def propagate_failure(db: AsyncSession, job: models.Job) -> List[Tuple[str, str]]:
+    """
+    Cancels the dependent subtree of a job that ended FAILED or CANCELLED.
+
+    A single UPDATE driven by a recursive CTE walks job_dependencies from the
+    failed job and cancels every waiting dependent whose policy is FAIL_FAST,
+    descending further only through the jobs it cancels. Dependents with the
+    WAIT policy (and everything below them) stay BLOCKED. Runs in the
+    caller's transaction and returns the (job_id, type) of each job that was
+    cancelled.
+    """
+    jobs = models.Job.__table__
+    deps = models.JobDependency.__table__
+    cancellable = and_(
+        jobs.c.status.in_([models.JobStatus.PENDING, models.JobStatus.BLOCKED]),
+        jobs.c.on_dependency_failure == models.DependencyFailurePolicy.FAIL_FAST,
+    )
+
+    doomed = (
+        select(deps.c.job_id.label("id"))
+        .select_from(deps.join(jobs, jobs.c.id == deps.c.job_id))
+        .where(deps.c.depends_on_id == job.id, cancellable)
+        .cte("doomed", recursive=True)
+    )
+    doomed = doomed.union(
+        select(deps.c.job_id)
+        .select_from(
+            deps.join(doomed, deps.c.depends_on_id == doomed.c.id)
+            .join(jobs, jobs.c.id == deps.c.job_id)
+        )
+        .where(cancellable)
+    )
+
+    cancelled = (await db.execute(
+        update(models.Job)
+        .where(models.Job.id.in_(select(doomed.c.id)))
+        .values(
+            status=models.JobStatus.CANCELLED,
+            completed_at=datetime.datetime.utcnow(),
+            last_error=f"Cancelled because dependency {job.job_id} ended {job.status.value}",
+        )
+        .returning(models.Job.job_id, models.Job.type),
+        execution_options={"synchronize_session": False},
+    )).all()
+
+    if cancelled:
+        print(f"SERVICE: Job {job.job_id} ended {job.status.value}, cancelling {len(cancelled)} dependent job(s).")
+        await notify_status_changes(db, [(job_id, models.JobStatus.CANCELLED) for job_id, _ in cancelled])
+    return [(job_id, job_type) for job_id, job_type in cancelled]
+
+def failed_attempt_values(job: models.Job) -> dict:
+    """
+    What a failed attempt changes on a job.
+
+    The attempt was counted when the job was claimed, so while
+    current_attempt is below retry_config's max_attempts the job goes back
+    to PENDING after an exponential backoff; otherwise it is FAILED.
+
+    The backoff is jittered: a random delay between half and all of the
+    exponential one, so jobs that failed together (e.g. on the same outage)
+    don't all retry at the same moment. The new run_at reaches the workers'
+    timers through the job's notification.
+    """
+    max_attempts = job.retry_config.get("max_attempts", 1) if job.retry_config else 1
+
+    if job.current_attempt < max_attempts:
+        backoff_multiplier = job.retry_config.get("backoff_multiplier", 2) if job.retry_config else 2
+        # Calculate delay in seconds, e.g. 10s, 20s, 40s, then jitter it
+        backoff_seconds = 5 * (backoff_multiplier ** (job.current_attempt))
+        delay_seconds = round(random.uniform(backoff_seconds / 2, backoff_seconds), 1)
+        print(f"SERVICE: Job {job.job_id} failed on attempt {job.current_attempt}. Rescheduling to run in {delay_seconds} seconds.")
+        # Set back to pending for the next attempt
+        return dict(
+            status=models.JobStatus.PENDING,
+            run_at=datetime.datetime.utcnow() + datetime.timedelta(seconds=delay_seconds),
+        )
+
+    # Max attempts reached, fail permanently
+    print(f"SERVICE: Job {job.job_id} has failed permanently after {max_attempts} attempts.")
+    return dict(status=models.JobStatus.FAILED, completed_at=datetime.datetime.utcnow())
+
+async def retry_or_fail(db: AsyncSession, job: models.Job) -> List[Tuple[str, str]]:
+    """
+    Requeues or fails a job after a failed attempt (see
+    `failed_attempt_values`) in the caller's transaction, cancelling the
+    dependents of a job that failed. Returns the (job_id, type) of each job
+    that was cancelled.
+    """
+    for field, value in failed_attempt_values(job).items():
+        setattr(job, field, value)
+    if job.status == models.JobStatus.FAILED:
+        return await propagate_failure(db, job)
+    return []
+
+
+async def finish_attempt(db: AsyncSession, job: models.Job, worker_id: str, attempt: int, values: dict) -> bool:
+    """
+    Records the end of a worker's attempt at a job, in the caller's
+    transaction.
+
+    Like renew_leases, the UPDATE only matches while the job is still
+    RUNNING under this worker and on this `attempt`, so a worker whose lease
+    was reaped never overwrites what the reaper recorded, nor the outcome of
+    a later attempt, even one it claimed again itself. The in-session job is
+    updated with the written values. Returns False, having written nothing,
+    when the attempt is no longer this worker's.
+    """
+    finished = (await db.execute(
+        update(models.Job)
+        .where(
+            models.Job.id == job.id,
+            models.Job.current_attempt == attempt,
+            models.Job.status == models.JobStatus.RUNNING,
+            models.Job.worker_id == worker_id,
+        )
+        .values(**values)
+        .returning(models.Job.id),
+        execution_options={"synchronize_session": "fetch"},
+    )).first()
+    return finished is not None
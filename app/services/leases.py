@@ -0,0 +1,147 @@
+# In app/services/leases.py
+
+import asyncio
+import datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+from sqlalchemy import insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from ..config import settings
+from .event_bus import EventBus, job_event, status_event
+from .job_service import retry_or_fail
+from .notifier import notify_job_changes
+from .resource_manager import delete_stale_pools
+
+
+async def renew_leases(
+    db: AsyncSession,
+    worker_id: str,
+    leases: Iterable[Tuple[int, int]],
+    lease_seconds: int,
+    now: Optional[datetime.datetime] = None,
+) -> List[Tuple[int, int]]:
+    """
+    Extends the leases of a worker's running jobs, given as (job pk,
+    attempt) pairs, with one UPDATE and commits. Returns the leases that
+    were renewed; a lease missing from the result is no longer this
+    worker's (e.g. the job was reaped, and maybe claimed again since).
+    """
+    leases = list(leases)
+    if not leases:
+        return []
+    now = now or datetime.datetime.utcnow()
+    renewed = (await db.execute(
+        update(models.Job)
+        .where(
+            tuple_(models.Job.id, models.Job.current_attempt).in_(leases),
+            models.Job.status == models.JobStatus.RUNNING,
+            models.Job.worker_id == worker_id,
+        )
+        .values(lease_expires_at=now + datetime.timedelta(seconds=lease_seconds))
+        .returning(models.Job.id, models.Job.current_attempt),
+        execution_options={"synchronize_session": False},
+    )).all()
+    await db.commit()
+    return [tuple(lease) for lease in renewed]
+
+
+async def reap_expired_leases(
+    db: AsyncSession,
+    limit: int = 100,
+    now: Optional[datetime.datetime] = None,
+) -> List[Tuple[models.Job, List[Tuple[str, str]]]]:
+    """
+    Recovers up to `limit` RUNNING jobs whose lease has expired, meaning
+    the worker running them stopped heartbeating, e.g. because it crashed
+    or was redeployed.
+
+    The lost run counts as an attempt: the job is requeued if retry_config
+    allows another one and FAILED otherwise, with its dependents cancelled.
+    Commits, and returns each reaped job with the dependents it cancelled.
+    The lookup uses the partial index ix_jobs_running_worker.
+    """
+    now = now or datetime.datetime.utcnow()
+    query = (
+        select(models.Job)
+        .where(models.Job.status == models.JobStatus.RUNNING, models.Job.lease_expires_at < now)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Reapers in other worker replicas take different jobs
+        query = query.with_for_update(skip_locked=True)
+    jobs = (await db.execute(query)).scalars().all()
+    if not jobs:
+        await db.rollback()
+        return []
+
+    reaped = []
+    for job in jobs:
+        message = f"Lease expired at {job.lease_expires_at:%Y-%m-%d %H:%M:%S} on worker {job.worker_id}"
+        job.last_error = message
+        await db.execute(insert(models.JobLog).values(job_id=job.id, timestamp=now, message=message))
+        reaped.append((job, await retry_or_fail(db, job)))
+        print(f"REAPER: {message}; job {job.job_id} is now {job.status.value}.")
+    await notify_job_changes(db, jobs)
+    await db.commit()
+    return reaped
+
+
+class LeaseReaper:
+    """
+    Periodically recovers the jobs of workers that stopped heartbeating.
+
+    Every worker runs one; on Postgres, concurrent reapers lock different
+    jobs. The reaped jobs' new statuses are published to the event bus.
+    The node pools of those workers are removed once they have not been
+    registered again for `pool_ttl_seconds`.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        events: Optional[EventBus] = None,
+        interval_seconds: float = settings.reaper_interval_seconds,
+        batch_size: int = 100,
+        pool_ttl_seconds: float = settings.lease_seconds,
+    ):
+        self.session_factory = session_factory
+        self.events = events
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.pool_ttl_seconds = pool_ttl_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        async with self.session_factory() as db:
+            stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=self.pool_ttl_seconds)
+            removed = await delete_stale_pools(db, stale_before)
+        if removed:
+            print(f"REAPER: Removed the node pools of {removed} worker(s) that stopped heartbeating.")
+        reaped = 0
+        while True:
+            async with self.session_factory() as db:
+                jobs = await reap_expired_leases(db, limit=self.batch_size)
+            reaped += len(jobs)
+            if self.events is not None:
+                for job, cancelled in jobs:
+                    self.events.publish(job_event(job))
+                    for dependent_id, dependent_type in cancelled:
+                        self.events.publish(status_event(dependent_id, models.JobStatus.CANCELLED, job_type=dependent_type))
+            if len(jobs) < self.batch_size:
+                return reaped
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"REAPER: Reaping expired leases failed: {e!r}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,257 @@
+# In app/services/limits.py
+
+import datetime
+import math
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import Select, String, cast, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from ..config import settings
+from .scheduling import Candidate
+
+KEY_KINDS = ("type", "tenant")
+
+
+@dataclass(frozen=True)
+class LimitRule:
+    """
+    What the jobs sharing one key (a job type or a tenant) may do together,
+    across all workers: run at most `concurrency` at once, and start at
+    `rate_per_second` on average with bursts of up to `burst`.
+    """
+    concurrency: Optional[int] = None
+    rate_per_second: Optional[float] = None
+    burst: Optional[int] = None
+
+    @property
+    def bucket_size(self) -> int:
+        return self.burst or max(1, math.ceil(self.rate_per_second))
+
+
+def parse_limits(raw: Dict[str, Dict[str, Any]]) -> Dict[str, LimitRule]:
+    """
+    Reads the JOB_LIMITS configuration: rules keyed by `type:<job type>` or
+    `tenant:<tenant>`. `type:*` and `tenant:*` apply to every type or
+    tenant without a rule of its own, each one limited separately.
+    """
+    rules = {}
+    for key, spec in raw.items():
+        kind, _, name = key.partition(":")
+        if kind not in KEY_KINDS or not name:
+            raise ValueError(f"Limit keys look like 'type:<name>' or 'tenant:<name>', got '{key}'")
+        try:
+            rule = LimitRule(**spec)
+        except TypeError:
+            raise ValueError(f"Invalid limit for '{key}': {spec}")
+        if rule.concurrency is None and rule.rate_per_second is None:
+            raise ValueError(f"The limit for '{key}' sets neither concurrency nor rate_per_second")
+        if (rule.concurrency or 0) < 0 or (rule.rate_per_second or 0) < 0 or (rule.burst or 0) < 0:
+            raise ValueError(f"The limit for '{key}' must not be negative")
+        rules[key] = rule
+    return rules
+
+
+class TokenBucket:
+    """Holds up to `size` tokens and gains `rate` per second. Each job start takes one."""
+
+    def __init__(self, rate: float, size: int, now: float):
+        self.rate = rate
+        self.size = size
+        self.tokens = float(size)
+        self.updated = now
+
+    def available(self, now: float) -> float:
+        self.tokens = min(self.size, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def take(self, count: int, now: float):
+        """Takes tokens, going into debt if other workers already spent them."""
+        self.tokens = self.available(now) - count
+
+    def seconds_until_available(self, now: float) -> float:
+        missing = 1 - self.available(now)
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate else math.inf
+
+
+class JobLimiter:
+    """
+    Enforces the concurrency caps and rate limits of job types and tenants
+    when a worker claims jobs.
+
+    The counters live in memory: how many jobs of each key run across the
+    cluster, and a token bucket per rate-limited key. The worker updates
+    them with its own claims and finishes, and every `reconcile_seconds`
+    reconciles them with the database, where the other workers' jobs are:
+    the running counts are replaced by a count of the RUNNING jobs, and the
+    starts other workers made since the last reconciliation are taken from
+    the buckets. Limits are therefore shared by all workers, though for up
+    to `reconcile_seconds` a worker does not see what the others started.
+    """
+
+    def __init__(
+        self,
+        rules: Dict[str, LimitRule],
+        tenant_key: str = settings.limits_tenant_key,
+        reconcile_seconds: float = settings.limits_reconcile_seconds,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rules = rules
+        self.tenant_key = tenant_key
+        self.reconcile_seconds = reconcile_seconds
+        self.clock = clock
+        self.running: Counter = Counter()
+        self.buckets: Dict[str, TokenBucket] = {}
+        # Keys that were full in the last claim
+        self.throttled: set = set()
+        self._reconciled_at: Optional[float] = None
+        self._reconciled_since: Optional[datetime.datetime] = None
+
+    @classmethod
+    def from_settings(cls) -> Optional["JobLimiter"]:
+        """The limiter configured by JOB_LIMITS, or None when nothing is limited."""
+        rules = parse_limits(settings.job_limits)
+        return cls(rules) if rules else None
+
+    def rule(self, key: str) -> Optional[LimitRule]:
+        return self.rules.get(key) or self.rules.get(key.partition(":")[0] + ":*")
+
+    def keys(self, job_type: str, payload: Optional[dict]) -> List[str]:
+        """The limited keys a job counts against."""
+        keys = [f"type:{job_type}"]
+        tenant = (payload or {}).get(self.tenant_key)
+        if tenant is not None:
+            keys.append(f"tenant:{tenant}")
+        return [key for key in keys if self.rule(key) is not None]
+
+    def _bucket(self, key: str) -> Optional[TokenBucket]:
+        rule = self.rule(key)
+        if rule is None or rule.rate_per_second is None:
+            return None
+        if key not in self.buckets:
+            self.buckets[key] = TokenBucket(rule.rate_per_second, rule.bucket_size, self.clock())
+        return self.buckets[key]
+
+    def _room(self, key: str, now: float) -> float:
+        """How many more jobs of a key may start right now."""
+        rule = self.rule(key)
+        room = math.inf
+        if rule.concurrency is not None:
+            room = rule.concurrency - self.running[key]
+        bucket = self._bucket(key)
+        if bucket is not None:
+            room = min(room, math.floor(bucket.available(now)))
+        return room
+
+    def _tenant_column(self):
+        """
+        The job's tenant as text, matching the keys built in Python: SQLite's
+        JSON extraction keeps a numeric tenant a number, which never equals
+        its key.
+        """
+        return cast(models.Job.payload[self.tenant_key].as_string(), String)
+
+    def exclude_throttled(self, query: Select) -> Select:
+        """
+        Leaves the keys known to have no room out of the ready-jobs query, so
+        the claim window is filled with jobs that can actually start.
+        """
+        now = self.clock()
+        full = [key for key in self.running.keys() | self.buckets.keys() if self._room(key, now) <= 0]
+        self.throttled = set(full)
+        types = [key.partition(":")[2] for key in full if key.startswith("type:")]
+        tenants = [key.partition(":")[2] for key in full if key.startswith("tenant:")]
+        if types:
+            query = query.where(models.Job.type.notin_(types))
+        if tenants:
+            tenant = self._tenant_column()
+            query = query.where(or_(tenant.is_(None), tenant.notin_(tenants)))
+        return query
+
+    def admit(self, candidates: Sequence[Candidate]) -> List[Candidate]:
+        """The candidates, in order, that fit the room left under every limit they count against."""
+        now = self.clock()
+        room: Dict[str, float] = {}
+        admitted = []
+        for candidate in candidates:
+            keys = self.keys(candidate.job.type, candidate.job.payload)
+            for key in keys:
+                if key not in room:
+                    room[key] = self._room(key, now)
+            blocked = [key for key in keys if room[key] < 1]
+            if blocked:
+                self.throttled.update(blocked)
+                continue
+            for key in keys:
+                room[key] -= 1
+            admitted.append(candidate)
+        return admitted
+
+    def acquire(self, keys: Iterable[str]):
+        """Counts a job this worker started."""
+        now = self.clock()
+        for key in keys:
+            self.running[key] += 1
+            bucket = self._bucket(key)
+            if bucket is not None:
+                bucket.take(1, now)
+
+    def release(self, keys: Iterable[str]):
+        """Counts a job this worker finished."""
+        for key in keys:
+            if self.running[key] > 0:
+                self.running[key] -= 1
+
+    def seconds_until_refill(self) -> Optional[float]:
+        """How long until a rate-limited key that held back jobs may start one again."""
+        now = self.clock()
+        waits = [self.buckets[key].seconds_until_available(now) for key in self.throttled if key in self.buckets]
+        return min(waits) if waits else None
+
+    def needs_reconcile(self) -> bool:
+        return self._reconciled_at is None or self.clock() - self._reconciled_at >= self.reconcile_seconds
+
+    async def reconcile(self, db: AsyncSession, worker_id: str):
+        """
+        Re-reads the cluster's running jobs, and debits the buckets with the
+        jobs other workers started since the last reconciliation, in the
+        caller's transaction. The running jobs are read through
+        ix_jobs_running_worker and the recent starts through
+        ix_jobs_started_at. A start counts whatever the job's status is now,
+        so a job that was since requeued is debited too.
+        """
+        now = datetime.datetime.utcnow()
+        tenant = self._tenant_column()
+        running = (await db.execute(
+            select(models.Job.type, tenant, func.count())
+            .where(models.Job.status == models.JobStatus.RUNNING, models.Job.lease_expires_at > now)
+            .group_by(models.Job.type, tenant)
+        )).all()
+        self.running = self._count(running)
+
+        if self._reconciled_since is not None:
+            started = (await db.execute(
+                select(models.Job.type, tenant, func.count())
+                .where(models.Job.started_at > self._reconciled_since, models.Job.worker_id != worker_id)
+                .group_by(models.Job.type, tenant)
+            )).all()
+            clock = self.clock()
+            for key, count in self._count(started).items():
+                bucket = self._bucket(key)
+                if bucket is not None:
+                    bucket.take(count, clock)
+
+        self._reconciled_since = now
+        self._reconciled_at = self.clock()
+
+    def _count(self, rows) -> Counter:
+        counts: Counter = Counter()
+        for job_type, tenant, count in rows:
+            for key in self.keys(job_type, {self.tenant_key: tenant} if tenant is not None else None):
+                counts[key] += count
+        return counts
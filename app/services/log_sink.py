@@ -0,0 +1,118 @@
+# In app/services/log_sink.py
+
+import asyncio
+import datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+
+
+class JobLogger:
+    """The handle job code writes its log lines through."""
+
+    def __init__(self, sink: "LogSink", job: models.Job):
+        self.sink = sink
+        self.job_pk = job.id
+
+    async def log(self, message: str):
+        await self.sink.write(self.job_pk, message)
+
+
+class LogSink:
+    """
+    Buffers job log lines in memory and writes them in batches.
+
+    Lines are stamped when they are written and inserted with one multi-row
+    INSERT per flush, in their own short transaction. A flush happens when
+    `batch_size` lines are waiting, every `flush_interval` seconds while the
+    sink is running, and whenever the worker calls `flush` (e.g. for a job's
+    lines, in the transaction that records its final status). If the
+    database falls behind and `max_buffered` lines pile up, writers wait for
+    a flush to finish before adding more. A failed write is logged and its
+    lines kept; it never fails the job that was logging.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        max_buffered: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._buffer: List[Dict] = []
+        self._flush_lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    def logger(self, job: models.Job) -> JobLogger:
+        return JobLogger(self, job)
+
+    async def write(self, job_pk: int, message: str):
+        """Buffers one log line."""
+        self._buffer.append({"job_id": job_pk, "timestamp": datetime.datetime.utcnow(), "message": message})
+        if len(self._buffer) >= self.max_buffered:
+            # Backpressure: the writer waits for the database to catch up,
+            # but a failed write never fails the job that is logging
+            await self._flush_quietly()
+        elif len(self._buffer) >= self.batch_size and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_quietly())
+
+    async def flush(self, db: Optional[AsyncSession] = None, job_pk: Optional[int] = None) -> List[Dict]:
+        """
+        Writes every buffered line, or only the lines of `job_pk`. Lines that
+        fail to be written are kept for the next flush.
+
+        Given a session, the lines are added to its transaction and committed
+        by the caller, e.g. together with the status of a finishing job. Pass
+        that job's `job_pk` then, so a rollback can't lose other jobs' lines,
+        and hand the returned lines to `restore` if the commit fails.
+        """
+        async with self._flush_lock:
+            if job_pk is None:
+                records, self._buffer = self._buffer, []
+            else:
+                records = [record for record in self._buffer if record["job_id"] == job_pk]
+                self._buffer = [record for record in self._buffer if record["job_id"] != job_pk]
+            if not records:
+                return []
+            try:
+                if db is not None:
+                    await db.execute(insert(models.JobLog), records)
+                    return records
+                async with self.session_factory() as session:
+                    await session.execute(insert(models.JobLog), records)
+                    await session.commit()
+                return records
+            except Exception:
+                self._buffer[:0] = records
+                raise
+
+    def restore(self, records: List[Dict]):
+        """Buffers again lines that a flush added to a transaction which then failed to commit."""
+        self._buffer[:0] = records
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"LOG_SINK: Failed to write {len(self._buffer)} buffered log line(s): {e!r}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_quietly()
+
+    def start(self):
+        self._timer = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self):
+        """Stops the periodic flush and writes whatever is still buffered."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush()
@@ -0,0 +1,130 @@
+# In app/services/notifier.py
+
+import datetime
+import json
+from typing import Callable, List, Optional
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from .. import models
+
+# Postgres channel every job status change is announced on
+JOBS_CHANNEL = "jobs_changed"
+
+
+class LocalNotifier:
+    """
+    An in-process stand-in for Postgres LISTEN/NOTIFY.
+
+    Used when the database is SQLite (tests, local runs), where the API and
+    the worker share a process and can simply call each other's callbacks.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[str], None]] = []
+
+    def subscribe(self, callback: Callable[[str], None]):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[str], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def notify(self, payload: str):
+        for callback in list(self._subscribers):
+            callback(payload)
+
+# A single, global instance shared by the API and an in-process worker
+local_notifier = LocalNotifier()
+
+# Session.info key under which local notifications wait for their commit
+_PENDING_LOCAL_NOTIFICATIONS = "pending_local_notifications"
+
+@event.listens_for(Session, "after_commit")
+def _deliver_local_notifications(session: Session):
+    for payload in session.info.pop(_PENDING_LOCAL_NOTIFICATIONS, []):
+        local_notifier.notify(payload)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_local_notifications(session: Session):
+    session.info.pop(_PENDING_LOCAL_NOTIFICATIONS, None)
+
+
+def _payload(job_id: str, status: models.JobStatus, run_at: Optional[datetime.datetime] = None) -> str:
+    message = {"job_id": job_id, "status": status.value}
+    if status == models.JobStatus.PENDING and run_at is not None and run_at > datetime.datetime.utcnow():
+        # Lets workers arm a timer for a job that only becomes due later
+        message["run_at"] = run_at.isoformat()
+    return json.dumps(message)
+
+
+async def notify_status_changes(db: AsyncSession, changes: List[tuple]):
+    """
+    Announces that jobs changed status so idle workers wake up immediately.
+
+    Each change is `(job_id, status)` or `(job_id, status, run_at)`; a
+    PENDING job due in the future carries its run_at in the payload. On
+    Postgres the NOTIFYs are part of the caller's transaction and are only
+    delivered once it commits, so listeners never see uncommitted rows. All
+    payloads go out in a single statement however many jobs changed.
+    """
+    payloads = [_payload(*change) for change in changes]
+    if not payloads:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": JOBS_CHANNEL, "payloads": payloads},
+        )
+    else:
+        # Held until the session commits, like a Postgres NOTIFY
+        db.sync_session.info.setdefault(_PENDING_LOCAL_NOTIFICATIONS, []).extend(payloads)
+
+async def notify_job_changes(db: AsyncSession, jobs: List[models.Job]):
+    """Announces the current status of several jobs, see `notify_status_changes`."""
+    await notify_status_changes(db, [(job.job_id, job.status, job.run_at) for job in jobs])
+
+async def notify_job_change(db: AsyncSession, job: models.Job):
+    """Announces a single job's status change, see `notify_status_changes`."""
+    await notify_job_changes(db, [job])
+
+
+class JobsListener:
+    """
+    Listens for job change notifications and calls `on_notify` for each one.
+
+    On Postgres a dedicated connection LISTENs on the channel and asyncpg
+    delivers notifications straight into the event loop as they arrive,
+    without any polling query.
+    """
+
+    def __init__(self, engine: AsyncEngine, on_notify: Callable[[str], None], channel: str = JOBS_CHANNEL):
+        self.engine = engine
+        self.on_notify = on_notify
+        self.channel = channel
+        self._connection = None
+        self._driver_connection = None
+
+    async def start(self):
+        if self.engine.dialect.name != "postgresql":
+            local_notifier.subscribe(self.on_notify)
+            return
+
+        # The LISTEN connection is held for the whole life of the listener
+        self._connection = await self.engine.connect()
+        raw = await self._connection.get_raw_connection()
+        self._driver_connection = raw.driver_connection
+        await self._driver_connection.add_listener(self.channel, self._on_notification)
+        print(f"NOTIFIER: Listening on channel '{self.channel}'.")
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self.on_notify(payload)
+
+    async def stop(self):
+        if self._connection is None:
+            local_notifier.unsubscribe(self.on_notify)
+            return
+        await self._driver_connection.remove_listener(self.channel, self._on_notification)
+        await self._connection.close()
+        self._connection = None
+        self._driver_connection = None
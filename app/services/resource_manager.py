@@ -1,8 +1,22 @@
 # In app/services/resource_manager.py
 
+import datetime
 import threading
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models
+from ..config import settings
 
 class ResourceManager:
+    """
+    The resources of the jobs running in this worker process.
+
+    The database is the source of truth across workers (see `pool_budget`);
+    this is the worker's local view of its own slots.
+    """
+
     def __init__(self, total_cpu: int, total_memory_mb: int):
         self.total_cpu = total_cpu
         self.total_memory = total_memory_mb
@@ -33,6 +47,74 @@ class ResourceManager:
             self.used_memory -= mem_req
             print(f"RESOURCE_MANAGER: Released {cpu_req} CPU, {mem_req}MB. Usage is now {self.used_cpu}/{self.total_cpu} CPU, {self.used_memory}/{self.total_memory}MB.")
 
-# Create a single instance based on the Test Scenario 4 constraints [cite: 224]
-# System has 8 CPU units and 4096 MB memory total
-resource_manager = ResourceManager(total_cpu=8, total_memory_mb=4096)
\ No newline at end of file
+
+# --- SHARED POOLS IN THE DATABASE ---
+
+async def register_pool(db: AsyncSession, name: str, total_cpu: int, total_memory_mb: int):
+    """Creates or resizes a resource pool, in the caller's transaction."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    values = dict(name=name, total_cpu=total_cpu, total_memory_mb=total_memory_mb, updated_at=datetime.datetime.utcnow())
+    await db.execute(
+        dialect.insert(models.ResourcePool)
+        .values(**values)
+        .on_conflict_do_update(index_elements=[models.ResourcePool.name], set_=values)
+    )
+
+async def delete_pool(db: AsyncSession, name: str):
+    """Removes a worker's node pool when it shuts down, in the caller's transaction."""
+    await db.execute(delete(models.ResourcePool).where(models.ResourcePool.name == name))
+
+async def delete_stale_pools(db: AsyncSession, older_than: datetime.datetime) -> int:
+    """
+    Removes the node pools of workers that stopped re-registering them
+    (see WorkerEngine.heartbeat), e.g. because they crashed. The cluster
+    pool is configured rather than owned by a worker and is kept. Commits,
+    and returns how many pools were removed.
+    """
+    result = await db.execute(
+        delete(models.ResourcePool).where(
+            models.ResourcePool.name != models.CLUSTER_POOL,
+            models.ResourcePool.updated_at < older_than,
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+async def pool_budget(
+    db: AsyncSession, names: Sequence[str], now: Optional[datetime.datetime] = None
+) -> Optional[Tuple[int, int]]:
+    """
+    The (cpu, memory) still free in every one of the named pools (a
+    worker's node pool, or the cluster pool), or None when none of them
+    exists.
+
+    On Postgres the pool rows are locked until the caller's transaction
+    ends, so the claims of workers sharing a pool are serialized and two
+    of them can never hand out the same free capacity.
+    """
+    now = now or datetime.datetime.utcnow()
+    query = select(models.ResourcePool).where(models.ResourcePool.name.in_(names))
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.order_by(models.ResourcePool.name).with_for_update()
+    pools = (await db.execute(query)).scalars().all()
+    if not pools:
+        return None
+
+    free_cpu = free_memory = None
+    for pool in pools:
+        in_use = select(
+            func.coalesce(func.sum(models.Job.allocated_cpu), 0),
+            func.coalesce(func.sum(models.Job.allocated_memory_mb), 0),
+        ).where(models.Job.status == models.JobStatus.RUNNING, models.Job.lease_expires_at > now)
+        if pool.name != models.CLUSTER_POOL:
+            in_use = in_use.where(models.Job.worker_id == pool.name)
+        used_cpu, used_memory = (await db.execute(in_use)).one()
+        pool_cpu, pool_memory = pool.total_cpu - used_cpu, pool.total_memory_mb - used_memory
+        free_cpu = pool_cpu if free_cpu is None else min(free_cpu, pool_cpu)
+        free_memory = pool_memory if free_memory is None else min(free_memory, pool_memory)
+    return max(free_cpu, 0), max(free_memory, 0)
+
+
+# The node capacity of this worker process; override it with WORKER_CPU_UNITS
+# and WORKER_MEMORY_MB
+resource_manager = ResourceManager(total_cpu=settings.worker_cpu_units, total_memory_mb=settings.worker_memory_mb)
@@ -0,0 +1,265 @@
+# In app/services/retention.py
+
+import asyncio
+import datetime
+import re
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import and_, delete, exists, or_, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from .. import models
+from ..config import RetentionSettings, settings
+from .job_service import FINISHED_STATUSES
+
+# Jobs that may still be waiting on a dependency; their dependencies are kept
+UNFINISHED_STATUSES = (
+    models.JobStatus.PENDING,
+    models.JobStatus.BLOCKED,
+    models.JobStatus.RUNNING,
+)
+
+# Monthly partitions of a partitioned job_logs table, e.g. job_logs_2026_10
+LOG_PARTITION_NAME = re.compile(r"^job_logs_(\d{4})_(\d{2})$")
+
+
+def retention_ttls(retention: RetentionSettings) -> Dict[models.JobStatus, datetime.timedelta]:
+    return {models.JobStatus(status): datetime.timedelta(days=days) for status, days in retention.ttl_days().items()}
+
+
+async def expired_job_ids(
+    db: AsyncSession,
+    ttls: Dict[models.JobStatus, datetime.timedelta],
+    limit: int,
+    now: Optional[datetime.datetime] = None,
+) -> List[int]:
+    """
+    Up to `limit` finished jobs whose retention has run out.
+
+    A job is kept while one of its dependents has not finished, so a job
+    waiting on a failed dependency can still be released by hand. The
+    lookup uses ix_jobs_status_completed_at for each status.
+    """
+    if not ttls:
+        return []
+    now = now or datetime.datetime.utcnow()
+    dependent = aliased(models.Job)
+    has_unfinished_dependent = exists(
+        select(models.JobDependency.job_id)
+        .join(dependent, dependent.id == models.JobDependency.job_id)
+        .where(
+            models.JobDependency.depends_on_id == models.Job.id,
+            dependent.status.in_(UNFINISHED_STATUSES),
+        )
+    )
+    query = (
+        select(models.Job.id)
+        .where(
+            or_(*[
+                and_(models.Job.status == status, models.Job.completed_at < now - ttl)
+                for status, ttl in ttls.items()
+            ]),
+            ~has_unfinished_dependent,
+        )
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        # Concurrent sweepers in other worker replicas take different batches
+        query = query.with_for_update(of=models.Job, skip_locked=True)
+    return (await db.execute(query)).scalars().all()
+
+
+async def purge_jobs(db: AsyncSession, job_pks: List[int]):
+    """Deletes jobs with their logs and dependency edges, in the caller's transaction."""
+    await db.execute(delete(models.JobLog).where(models.JobLog.job_id.in_(job_pks)))
+    await db.execute(
+        delete(models.JobDependency).where(
+            or_(models.JobDependency.job_id.in_(job_pks), models.JobDependency.depends_on_id.in_(job_pks))
+        )
+    )
+    await db.execute(delete(models.Job).where(models.Job.id.in_(job_pks)))
+
+
+async def sweep_expired_jobs(
+    session_factory: Callable[..., AsyncSession],
+    ttls: Dict[models.JobStatus, datetime.timedelta],
+    batch_size: int = 1000,
+    max_batches: Optional[int] = None,
+    now: Optional[datetime.datetime] = None,
+) -> int:
+    """
+    Deletes expired jobs in batches of `batch_size`, each in its own short
+    transaction, so the sweep never holds locks on a large set of rows.
+    Returns how many jobs were deleted.
+    """
+    deleted = batches = 0
+    while max_batches is None or batches < max_batches:
+        async with session_factory() as db:
+            job_pks = await expired_job_ids(db, ttls, limit=batch_size, now=now)
+            if not job_pks:
+                break
+            await purge_jobs(db, job_pks)
+            await db.commit()
+        deleted += len(job_pks)
+        batches += 1
+        if len(job_pks) < batch_size:
+            break
+    return deleted
+
+
+async def release_expired_idempotency_keys(
+    session_factory: Callable[..., AsyncSession],
+    window: datetime.timedelta,
+    batch_size: int = 1000,
+    now: Optional[datetime.datetime] = None,
+) -> int:
+    """
+    Clears the idempotency keys of jobs created more than `window` ago, in
+    batches found through ix_jobs_idempotency_key_created_at, so the unique
+    key index only holds keys that can still deduplicate a submission.
+    Returns how many keys were cleared.
+    """
+    cutoff = (now or datetime.datetime.utcnow()) - window
+    released = 0
+    while True:
+        async with session_factory() as db:
+            query = (
+                select(models.Job.id)
+                .where(models.Job.idempotency_key.is_not(None), models.Job.created_at < cutoff)
+                .limit(batch_size)
+            )
+            if db.get_bind().dialect.name == "postgresql":
+                query = query.with_for_update(skip_locked=True)
+            job_pks = (await db.execute(query)).scalars().all()
+            if not job_pks:
+                break
+            await db.execute(
+                update(models.Job).where(models.Job.id.in_(job_pks)).values(idempotency_key=None),
+                execution_options={"synchronize_session": False},
+            )
+            await db.commit()
+        released += len(job_pks)
+        if len(job_pks) < batch_size:
+            break
+    return released
+
+
+def _month_start(day: datetime.date, months_later: int = 0) -> datetime.date:
+    month = day.month - 1 + months_later
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+async def job_logs_partitioned(db: AsyncSession) -> bool:
+    """Whether job_logs was converted to a partitioned table (Postgres only)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return (await db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'job_logs')"
+    ))).scalar()
+
+
+async def maintain_log_partitions(
+    db: AsyncSession,
+    keep: Optional[datetime.timedelta],
+    months_ahead: int = 2,
+    now: Optional[datetime.datetime] = None,
+) -> List[str]:
+    """
+    Creates the monthly job_logs partitions of the coming months and drops
+    the ones that ended more than `keep` ago, if given, once they are empty.
+    Returns the names of the dropped partitions.
+
+    Every line belongs to a job that still exists (job_logs.job_id references
+    jobs), and purge_jobs deletes an expired job's lines with it. An old
+    month that still holds lines therefore holds those of a kept job, e.g.
+    one an unfinished dependent waits on, and is left alone.
+    """
+    today = (now or datetime.datetime.utcnow()).date()
+    for offset in range(months_ahead + 1):
+        start = _month_start(today, offset)
+        await db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS job_logs_{start:%Y_%m} PARTITION OF job_logs "
+            f"FOR VALUES FROM ('{start}') TO ('{_month_start(start, 1)}')"
+        ))
+
+    if keep is None:
+        return []
+    cutoff = (now or datetime.datetime.utcnow()) - keep
+    partitions = (await db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'job_logs'"
+    ))).scalars().all()
+    dropped = []
+    for name in partitions:
+        match = LOG_PARTITION_NAME.match(name)
+        if match is None:
+            continue
+        end = _month_start(datetime.date(int(match.group(1)), int(match.group(2)), 1), 1)
+        if datetime.datetime.combine(end, datetime.time()) > cutoff:
+            continue
+        if not (await db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})"))).scalar():
+            await db.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    return dropped
+
+
+class RetentionSweeper:
+    """
+    Periodically deletes finished jobs whose retention has run out and
+    releases idempotency keys whose window has passed.
+
+    Each status has its own retention (see RetentionSettings). When
+    job_logs is partitioned, the sweeper also keeps future partitions
+    ready and drops the emptied months older than the longest retention.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        retention: RetentionSettings = settings.retention,
+    ):
+        self.session_factory = session_factory
+        self.retention = retention
+        self.ttls = retention_ttls(retention)
+        # Only months older than every retention are dropped, and none while
+        # some status is kept forever.
+        self.log_retention = max(self.ttls.values()) if len(self.ttls) == len(FINISHED_STATUSES) else None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        deleted = await sweep_expired_jobs(self.session_factory, self.ttls, batch_size=self.retention.batch_size)
+        if deleted:
+            print(f"RETENTION: Deleted {deleted} expired job(s).")
+        released = await release_expired_idempotency_keys(
+            self.session_factory,
+            datetime.timedelta(seconds=settings.idempotency_key_ttl_seconds),
+            batch_size=self.retention.batch_size,
+        )
+        if released:
+            print(f"RETENTION: Released {released} expired idempotency key(s).")
+
+        async with self.session_factory() as db:
+            if await job_logs_partitioned(db):
+                dropped = await maintain_log_partitions(db, self.log_retention)
+                await db.commit()
+                if dropped:
+                    print(f"RETENTION: Dropped log partition(s) {', '.join(dropped)}.")
+        return deleted
+
+    async def _run_periodically(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"RETENTION: Sweep failed: {e!r}")
+            await asyncio.sleep(self.retention.interval_seconds)
+
+    def start(self):
+        if self.retention.enabled:
+            self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,201 @@
+# In app/services/schedule_service.py
+
+import asyncio
+import datetime
+from typing import Callable, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import models, schemas
+from ..config import settings
+from .cron import CronExpression
+from .event_bus import EventBus, status_event
+from .job_service import _insert_jobs, new_job_row
+from .notifier import notify_status_changes
+
+
+def _job_template(job: schemas.JobCreate) -> dict:
+    return job.model_dump(mode="json", exclude=set(schemas.SCHEDULE_MANAGED_FIELDS))
+
+
+def schedule_key(name: str, fire_at: datetime.datetime) -> str:
+    """The idempotency key of the job a schedule submits for one fire time."""
+    return f"schedule:{name}:{fire_at:%Y-%m-%dT%H:%M}"
+
+
+async def create_schedule(db: AsyncSession, schedule_in: schemas.JobScheduleCreate) -> models.JobSchedule:
+    now = datetime.datetime.utcnow()
+    schedule = models.JobSchedule(
+        name=schedule_in.name,
+        cron=schedule_in.cron,
+        job_template=_job_template(schedule_in.job),
+        enabled=schedule_in.enabled,
+        next_fire_at=CronExpression.parse(schedule_in.cron).next_after(now),
+        created_at=now,
+        updated_at=now,
+    )
+    db.add(schedule)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"Schedule '{schedule_in.name}' already exists")
+    print(f"SERVICE: Created schedule '{schedule.name}' ({schedule.cron}), first firing at {schedule.next_fire_at}.")
+    return schedule
+
+
+async def get_schedule(db: AsyncSession, name: str) -> Optional[models.JobSchedule]:
+    return (await db.execute(
+        select(models.JobSchedule).where(models.JobSchedule.name == name)
+    )).scalars().first()
+
+
+async def list_schedules(db: AsyncSession) -> List[models.JobSchedule]:
+    return (await db.execute(select(models.JobSchedule).order_by(models.JobSchedule.name))).scalars().all()
+
+
+async def update_schedule(
+    db: AsyncSession, schedule: models.JobSchedule, update: schemas.JobScheduleUpdate
+) -> models.JobSchedule:
+    """Changes a schedule. A new expression, or enabling it again, fires next from now on."""
+    now = datetime.datetime.utcnow()
+    if update.job is not None:
+        schedule.job_template = _job_template(update.job)
+    if update.cron is not None:
+        schedule.cron = update.cron
+    if update.cron is not None or (update.enabled and not schedule.enabled):
+        schedule.next_fire_at = CronExpression.parse(schedule.cron).next_after(now)
+    if update.enabled is not None:
+        schedule.enabled = update.enabled
+    schedule.updated_at = now
+    await db.commit()
+    return schedule
+
+
+async def delete_schedule(db: AsyncSession, schedule: models.JobSchedule):
+    """Deletes a schedule. Jobs it already submitted are kept."""
+    await db.delete(schedule)
+    await db.commit()
+
+
+async def materialize_due_schedules(
+    db: AsyncSession,
+    limit: int = 500,
+    now: Optional[datetime.datetime] = None,
+) -> List[dict]:
+    """
+    Submits the jobs of up to `limit` schedules that are due, and commits.
+
+    The due schedules are found through ix_job_schedules_due and locked
+    with SKIP LOCKED on Postgres, so each worker's scheduler takes
+    different ones. Their jobs are written with a single multi-row INSERT.
+    Each job's idempotency key is derived from its schedule and fire time,
+    so should two schedulers still fire the same time (e.g. on SQLite, which
+    has no row locks), ON CONFLICT DO NOTHING keeps only one job.
+
+    Fire times missed while no worker was running are coalesced: a schedule
+    fires once for the earliest missed time, then continues from `now`.
+    Returns the jobs that were created.
+    """
+    now = now or datetime.datetime.utcnow()
+    query = (
+        select(models.JobSchedule)
+        .where(models.JobSchedule.enabled.is_(True), models.JobSchedule.next_fire_at <= now)
+        .order_by(models.JobSchedule.next_fire_at)
+        .limit(limit)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    schedules = (await db.execute(query)).scalars().all()
+    if not schedules:
+        await db.rollback()
+        return []
+
+    rows = []
+    for schedule in schedules:
+        fire_at = schedule.next_fire_at
+        job_in = schemas.JobCreate(
+            **schedule.job_template, idempotency_key=schedule_key(schedule.name, fire_at), run_at=fire_at
+        )
+        rows.append(new_job_row(job_in, now))
+        schedule.last_fired_at = fire_at
+        schedule.next_fire_at = CronExpression.parse(schedule.cron).next_after(now)
+        schedule.updated_at = now
+
+    created = (await db.execute(
+        _insert_jobs(db).values(rows).returning(models.Job.job_id, models.Job.type, models.Job.status)
+    )).mappings().all()
+    await notify_status_changes(db, [(job["job_id"], job["status"]) for job in created])
+    await db.commit()
+    if created:
+        print(f"SERVICE: {len(schedules)} schedule(s) fired, submitting {len(created)} job(s).")
+    return [dict(job) for job in created]
+
+
+async def seconds_until_next_fire(db: AsyncSession, now: Optional[datetime.datetime] = None) -> Optional[float]:
+    """How long until the next enabled schedule is due, if there is one."""
+    next_fire_at = (await db.execute(
+        select(models.JobSchedule.next_fire_at)
+        .where(models.JobSchedule.enabled.is_(True))
+        .order_by(models.JobSchedule.next_fire_at)
+        .limit(1)
+    )).scalar()
+    if next_fire_at is None:
+        return None
+    return max(0.0, (next_fire_at - (now or datetime.datetime.utcnow())).total_seconds())
+
+
+class ScheduleMaterializer:
+    """
+    The scheduler loop every worker runs: submits the jobs of due schedules,
+    then sleeps until the next schedule is due, but never longer than
+    `max_sleep_seconds`, so schedules created or changed in the meantime
+    are picked up.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        events: Optional[EventBus] = None,
+        max_sleep_seconds: float = settings.scheduler_interval_seconds,
+        batch_size: int = 500,
+    ):
+        self.session_factory = session_factory
+        self.events = events
+        self.max_sleep_seconds = max_sleep_seconds
+        self.batch_size = batch_size
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        created = 0
+        while True:
+            async with self.session_factory() as db:
+                jobs = await materialize_due_schedules(db, limit=self.batch_size)
+            created += len(jobs)
+            if self.events is not None:
+                for job in jobs:
+                    self.events.publish(status_event(job["job_id"], job["status"], job_type=job["type"]))
+            if len(jobs) < self.batch_size:
+                return created
+
+    async def _run_periodically(self):
+        while True:
+            sleep = self.max_sleep_seconds
+            try:
+                await self.run_once()
+                async with self.session_factory() as db:
+                    until_next = await seconds_until_next_fire(db)
+                if until_next is not None:
+                    sleep = min(sleep, until_next)
+            except Exception as e:
+                print(f"SCHEDULER: Materializing due schedules failed: {e!r}")
+            await asyncio.sleep(sleep)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run_periodically())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
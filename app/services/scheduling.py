@@ -0,0 +1,305 @@
+# In app/services/scheduling.py
+
+import abc
+import copy
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from ..config import settings
+
+# (cpu_units, memory_mb)
+Resources = Tuple[int, int]
+
+# The runtime assumed for a job without a timeout; the worker's default timeout
+DEFAULT_RUNTIME_SECONDS = 300
+
+
+@dataclass(frozen=True)
+class Candidate:
+    """A ready job as the scheduling policies see it."""
+    job: Any
+    priority_rank: int
+    cpu: int
+    memory: int
+    # An upper bound on how long the job runs: it is killed at its timeout
+    runtime: float = DEFAULT_RUNTIME_SECONDS
+    # How long the job has been due
+    waited: float = 0.0
+    job_type: Optional[str] = None
+
+    def fits(self, free: Resources) -> bool:
+        return self.cpu <= free[0] and self.memory <= free[1]
+
+
+@dataclass(frozen=True)
+class Running:
+    """A job already running on the worker, and when it ends at the latest."""
+    cpu: int
+    memory: int
+    ends_in: float
+
+
+def _take(free: Resources, candidate: Candidate) -> Resources:
+    return free[0] - candidate.cpu, free[1] - candidate.memory
+
+
+class SchedulingPolicy(abc.ABC):
+    """
+    Decides which ready jobs a worker starts with the resources it has free.
+
+    `candidates` come in dequeue order: highest priority first, then the job
+    that became due earliest. `total` is the worker's full capacity, which
+    tells a job that merely has to wait from one that can never run here.
+    `running` are the jobs the worker is already running.
+    """
+
+    name = ""
+    # Whether the policy needs ready jobs of every priority in its window,
+    # rather than the first `window` in strict priority order
+    window_per_priority = False
+
+    @abc.abstractmethod
+    def select(
+        self,
+        candidates: Sequence[Candidate],
+        free: Resources,
+        total: Resources,
+        limit: int,
+        running: Sequence[Running] = (),
+    ) -> List[Candidate]:
+        """The candidates to start, in the order they should be started."""
+
+
+class FirstFitPolicy(SchedulingPolicy):
+    """
+    Starts every candidate that fits, in dequeue order.
+
+    Simple, but a large high-priority job can starve: smaller jobs behind it
+    keep taking the capacity it is waiting for.
+    """
+
+    name = "first_fit"
+
+    def select(self, candidates, free, total, limit, running=()):
+        chosen = []
+        for candidate in candidates:
+            if len(chosen) >= limit:
+                break
+            if candidate.fits(free):
+                free = _take(free, candidate)
+                chosen.append(candidate)
+        return chosen
+
+
+class ReservationPolicy(SchedulingPolicy):
+    """
+    Priority first, with a reservation for the job at the head of the queue
+    and backfilling around it.
+
+    The first candidate that does not fit right now (but would fit the
+    worker's total capacity) gets a reservation: from the runtimes of the
+    running jobs, the policy works out the moment enough of them will have
+    finished for it to start. Lower-priority jobs are then only started if
+    they end before that moment, or if they fit in what the reserved job
+    leaves over, so they never delay it. Runtimes are the jobs' timeouts,
+    which the worker enforces, so the reservation is never too early.
+    """
+
+    name = "reservation"
+
+    def select(self, candidates, free, total, limit, running=()):
+        chosen: List[Candidate] = []
+        # When the reserved job can start, and what it leaves over then
+        shadow: Optional[float] = None
+        extra: Resources = (0, 0)
+        for band in _priority_bands(candidates):
+            pending = list(band)
+            while pending and len(chosen) < limit:
+                head = pending[0]
+                if shadow is None and not head.fits(free) and head.fits(total):
+                    started = [Running(c.cpu, c.memory, c.runtime) for c in chosen]
+                    shadow, extra = _reserve(pending.pop(0), free, [*running, *started])
+                    continue
+                eligible = [
+                    c for c in pending
+                    if shadow is None or c.runtime <= shadow or c.fits(extra)
+                ]
+                candidate = self._pick(eligible, free)
+                if candidate is None:
+                    break
+                if shadow is not None and candidate.runtime > shadow:
+                    # Still running when the reserved job starts
+                    extra = _take(extra, candidate)
+                chosen.append(candidate)
+                free = _take(free, candidate)
+                pending.remove(candidate)
+        return chosen
+
+    def _pick(self, band: List[Candidate], free: Resources) -> Optional[Candidate]:
+        """The next job of a priority band to start, if any fits."""
+        return next((candidate for candidate in band if candidate.fits(free)), None)
+
+
+class BestFitPolicy(ReservationPolicy):
+    """
+    The reservation policy, packing each priority band best-fit.
+
+    Within a band, the job that leaves the least capacity unused is started
+    first, so large jobs are not fragmented away by small ones and small
+    jobs fill the gaps that remain.
+    """
+
+    name = "best_fit"
+
+    def _pick(self, band, free):
+        def leftover(candidate: Candidate) -> float:
+            # Unused share of each resource after starting the job
+            cpu_left = (free[0] - candidate.cpu) / free[0] if free[0] > 0 else 0
+            memory_left = (free[1] - candidate.memory) / free[1] if free[1] > 0 else 0
+            return cpu_left + memory_left
+        fitting = [candidate for candidate in band if candidate.fits(free)]
+        # min() keeps the first of equally good fits, i.e. the oldest
+        return min(fitting, key=leftover) if fitting else None
+
+
+# Aging raises a flow's weight up to high's, never to critical's: under
+# sustained overload, aged flows would otherwise crowd out critical jobs
+HIGHEST_AGED_RANK = 1
+
+
+class FairSharePolicy(SchedulingPolicy):
+    """
+    Weighted fair queuing across priorities.
+
+    Ready jobs are queued in flows, one per priority (and per job type
+    within a priority with `by_type`). Like start-time fair queuing, every
+    flow carries a virtual time tag that advances by the CPU units of each
+    job it starts, divided by its weight. The flow with the lowest tag
+    starts its oldest job that fits next, so under contention each priority gets a
+    share of the CPU proportional to its weight (8:4:2:1 by default):
+    critical and high jobs still get the most, but a stream of them can no
+    longer starve normal and low jobs. The types of a priority split its
+    weight evenly. A flow that was idle rejoins at the current virtual
+    time, so it cannot save up a burst.
+
+    When the oldest job of the flow next in line does not fit yet, it gets
+    a reservation, and other jobs are backfilled around it as in
+    ReservationPolicy, so large jobs are not starved by small ones.
+
+    With aging, a flow gets the weight of the next priority up for every
+    `aging_seconds` its oldest job has waited, up to high's. Jobs keep their
+    place in their own flow, so a backlogged low priority is served faster
+    the longer it waits, without its newer jobs jumping ahead of anyone.
+
+    The tags persist between claims, so each worker needs its own instance
+    (get_policy returns a fresh one).
+    """
+
+    name = "fair_share"
+    window_per_priority = True
+
+    def __init__(
+        self,
+        weights: Optional[Dict[int, float]] = None,
+        by_type: bool = settings.fair_share_by_type,
+        aging_seconds: Optional[float] = settings.fair_share_aging_seconds,
+    ):
+        self.weights = weights or dict(settings.fair_share_weights)
+        if any(weight <= 0 for weight in self.weights.values()):
+            raise ValueError(f"Fair share weights must be positive, got {self.weights}")
+        self.by_type = by_type
+        self.aging_seconds = aging_seconds or None
+        self._tags: Dict[Tuple[int, str], float] = {}
+        self._virtual_time = 0.0
+
+    def _weight(self, rank: int, queue: List[Candidate]) -> float:
+        """A flow's weight: its priority's, or a higher one's once its oldest job has aged."""
+        if self.aging_seconds is not None and rank > HIGHEST_AGED_RANK:
+            aged = int(max(candidate.waited for candidate in queue) // self.aging_seconds)
+            rank = max(HIGHEST_AGED_RANK, rank - aged)
+        return self.weights.get(rank, 1)
+
+    def _key(self, candidate: Candidate) -> Tuple[int, str]:
+        return candidate.priority_rank, (candidate.job_type or "") if self.by_type else ""
+
+    def select(self, candidates, free, total, limit, running=()):
+        flows: Dict[Tuple[int, str], List[Candidate]] = {}
+        for candidate in candidates:
+            flows.setdefault(self._key(candidate), []).append(candidate)
+        types_per_rank: Dict[int, int] = {}
+        for rank, _ in flows:
+            types_per_rank[rank] = types_per_rank.get(rank, 0) + 1
+        weights = {key: self._weight(key[0], queue) / types_per_rank[key[0]] for key, queue in flows.items()}
+        # Idle flows are forgotten; a flow that comes back starts at the current virtual time
+        self._tags = {key: max(self._tags.get(key, 0.0), self._virtual_time) for key in flows}
+
+        chosen: List[Candidate] = []
+        # As in the reservation policy: when the reserved job can start, and what it leaves over then
+        shadow: Optional[float] = None
+        extra: Resources = (0, 0)
+        while len(chosen) < limit:
+            started = None
+            # Lowest tag first; on a tie, the higher priority
+            for key in sorted(flows, key=lambda key: (self._tags[key], key)):
+                queue = flows[key]
+                if queue and shadow is None and not queue[0].fits(free) and queue[0].fits(total):
+                    # The oldest job of the flow next in line waits for capacity: hold it
+                    ran = [Running(c.cpu, c.memory, c.runtime) for c in chosen]
+                    shadow, extra = _reserve(queue.pop(0), free, [*running, *ran])
+                started = next((
+                    c for c in queue
+                    if c.fits(free) and (shadow is None or c.runtime <= shadow or c.fits(extra))
+                ), None)
+                if started is not None:
+                    break
+            if started is None:
+                break
+            if shadow is not None and started.runtime > shadow:
+                # Still running when the reserved job starts
+                extra = _take(extra, started)
+            self._virtual_time = self._tags[key]
+            self._tags[key] += _cost(started) / weights[key]
+            flows[key].remove(started)
+            chosen.append(started)
+            free = _take(free, started)
+        return chosen
+
+
+def _cost(candidate: Candidate) -> int:
+    """What a job's start costs its flow's share: the CPU units it holds."""
+    return max(1, candidate.cpu)
+
+
+def _reserve(job: Candidate, free: Resources, running: Sequence[Running]) -> Tuple[float, Resources]:
+    """
+    When `job` can start at the latest, as running jobs finish, and what it
+    leaves free at that moment. If it never fits (the budget is capped by a
+    shared pool), nothing can be reserved and backfilling is unrestricted.
+    """
+    available = free
+    for job_ending in sorted(running, key=lambda r: r.ends_in):
+        available = (available[0] + job_ending.cpu, available[1] + job_ending.memory)
+        if job.fits(available):
+            return job_ending.ends_in, _take(available, job)
+    return math.inf, (0, 0)
+
+
+def _priority_bands(candidates: Sequence[Candidate]) -> List[List[Candidate]]:
+    bands: Dict[int, List[Candidate]] = {}
+    for candidate in candidates:
+        bands.setdefault(candidate.priority_rank, []).append(candidate)
+    return [bands[rank] for rank in sorted(bands)]
+
+
+POLICIES: Dict[str, SchedulingPolicy] = {
+    policy.name: policy
+    for policy in (FirstFitPolicy(), ReservationPolicy(), BestFitPolicy(), FairSharePolicy())
+}
+
+
+def get_policy(name: Optional[str]) -> SchedulingPolicy:
+    """A new instance of a policy, by name, e.g. from the SCHEDULING_POLICY setting."""
+    try:
+        return copy.deepcopy(POLICIES[name or BestFitPolicy.name])
+    except KeyError:
+        raise ValueError(f"Unknown scheduling policy '{name}', expected one of {sorted(POLICIES)}")
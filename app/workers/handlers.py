@@ -0,0 +1,172 @@
+# In app/workers/handlers.py
+
+import asyncio
+import enum
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+class ExecutorKind(str, enum.Enum):
+    """Where a job handler runs."""
+    ASYNCIO = "asyncio"  # On the worker's event loop; for I/O-bound coroutines
+    THREAD = "thread"    # In a thread pool; for blocking calls
+    PROCESS = "process"  # In a pool of worker processes; for CPU-bound work
+
+
+@dataclass(frozen=True)
+class JobHandler:
+    func: Callable
+    executor: ExecutorKind
+
+
+class HandlerRegistry:
+    """
+    The code that runs each job type.
+
+    An asyncio handler is a coroutine function called as `func(payload, log)`.
+    Thread and process handlers are plain functions called as `func(payload)`.
+    Whatever a handler returns is written to the job's log. A process handler
+    must be a module-level function, and its payload and result picklable.
+    The worker imports the modules listed in JOB_HANDLER_MODULES at startup,
+    so their `@handler(...)` registrations take effect.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+
+    def register(self, job_type: str, executor: ExecutorKind = ExecutorKind.ASYNCIO):
+        """Decorator registering a function as the handler of `job_type`."""
+        def decorator(func: Callable) -> Callable:
+            if executor == ExecutorKind.ASYNCIO and not asyncio.iscoroutinefunction(func):
+                raise TypeError(f"The asyncio handler of '{job_type}' must be a coroutine function.")
+            self._handlers[job_type] = JobHandler(func, ExecutorKind(executor))
+            return func
+        return decorator
+
+    def get(self, job_type: str) -> Optional[JobHandler]:
+        return self._handlers.get(job_type)
+
+    def unregister(self, job_type: str):
+        self._handlers.pop(job_type, None)
+
+
+# The handlers the worker runs; job types without one are simulated
+handlers = HandlerRegistry()
+handler = handlers.register
+
+
+class HandlerError(Exception):
+    """A process handler raised; carries the original error's description."""
+
+
+def _serve(conn):
+    """The loop of a pool process: runs one handler call at a time."""
+    while True:
+        try:
+            func, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            conn.send((True, func(payload)))
+        except BaseException as e:
+            # The exception itself may not be picklable
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _PoolProcess:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ProcessPool:
+    """
+    A pool of up to `size` long-lived worker processes.
+
+    Unlike concurrent.futures.ProcessPoolExecutor, a call can be stopped:
+    if the awaiting task is cancelled (e.g. by the job's timeout), the
+    process running the call is killed and replaced by a fresh one on the
+    next call, without disturbing the calls running in other processes.
+    Processes are started on demand with the "spawn" method, so the pool
+    is safe to use from a process with a running event loop and threads.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._context = multiprocessing.get_context("spawn")
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[_PoolProcess] = []
+        self._busy: List[_PoolProcess] = []
+
+    async def run(self, func: Callable, payload: Any) -> Any:
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else _PoolProcess(self._context)
+            self._busy.append(worker)
+            try:
+                worker.conn.send((func, payload))
+                await self._readable(worker)
+                ok, result = worker.conn.recv()
+            except BaseException:
+                # Cancelled, timed out, or the process died: it can't be reused
+                self._busy.remove(worker)
+                worker.kill()
+                raise
+            self._busy.remove(worker)
+            self._idle.append(worker)
+        if not ok:
+            raise HandlerError(result)
+        return result
+
+    async def _readable(self, worker: _PoolProcess):
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = worker.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            await ready
+        finally:
+            loop.remove_reader(fd)
+
+    def shutdown(self):
+        for worker in self._idle + self._busy:
+            worker.kill()
+        self._idle.clear()
+        self._busy.clear()
+
+
+class JobExecutors:
+    """
+    Runs handlers on the executor each one declares.
+
+    The process pool has one process per CPU unit of the worker's capacity,
+    so CPU-bound jobs never oversubscribe the node. Threads cannot be killed:
+    a thread handler that outlives its timeout fails the job, but its thread
+    stays busy until the call returns.
+    """
+
+    def __init__(self, process_workers: int, thread_workers: Optional[int] = None):
+        self.threads = ThreadPoolExecutor(
+            max_workers=thread_workers or process_workers + 4, thread_name_prefix="job-handler"
+        )
+        self.processes = ProcessPool(process_workers)
+
+    async def run(self, job_handler: JobHandler, payload: Any, log) -> Any:
+        if job_handler.executor == ExecutorKind.ASYNCIO:
+            return await job_handler.func(payload, log)
+        if job_handler.executor == ExecutorKind.THREAD:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.threads, job_handler.func, payload)
+        return await self.processes.run(job_handler.func, payload)
+
+    def shutdown(self):
+        self.processes.shutdown()
+        self.threads.shutdown(wait=False, cancel_futures=True)
@@ -2,57 +2,64 @@
 
 import asyncio
 import datetime
+import importlib
+import json
 import traceback
 import sys
 import os
+import socket
 
 # This is still needed to ensure the 'app' module is on the Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.config import settings
+from app.database import WorkerSessionLocal, pool_metrics, worker_engine
 from app.services import job_service
-from app.services.resource_manager import resource_manager
+from app.services.resource_manager import ResourceManager, delete_pool, register_pool, resource_manager
+from app.services.notifier import JobsListener, notify_job_change
+from app.services.event_bus import EventBus, create_event_bus, job_event, status_event
+from app.services.log_sink import JobLogger, LogSink
+from app.services.leases import LeaseReaper, renew_leases
+from app.services.limits import JobLimiter
+from app.services.retention import RetentionSweeper
+from app.services.schedule_service import ScheduleMaterializer
+from app.services.scheduling import SchedulingPolicy, get_policy
+from app.workers.handlers import JobExecutors, handlers
+from app.workers.timers import DueTimers
 from app import models
 
 # --- NEW: Function to handle job failures and retries ---
-def handle_job_failure(job: models.Job, db: Session, error: Exception):
-    """Handles the logic for when a job fails, including retries."""
+async def handle_job_failure(job: models.Job, error: Exception, log: JobLogger) -> dict:
+    """
+    Handles the logic for when a job fails, including retries. Returns the
+    changes to record on the job.
+    """
     
     # --- ADD LOGGING ---
-    error_message = f"Job failed with error: {error}"
-    db.add(models.JobLog(job_id=job.id, message=error_message))
+    await log.log(f"Job failed with error: {error}")
     
-    job.last_error = str(error)
-    job.current_attempt += 1
-    
-    max_attempts = job.retry_config.get("max_attempts", 1) if job.retry_config else 1
-
-    if job.current_attempt < max_attempts:
-        backoff_multiplier = job.retry_config.get("backoff_multiplier", 2) if job.retry_config else 2
-        # Calculate delay in seconds. e.g., 5s, 10s, 20s
-        delay_seconds = 5 * (backoff_multiplier ** (job.current_attempt))
-        
-        job.run_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=delay_seconds)
-        job.status = models.JobStatus.PENDING # Set back to pending for the next attempt
-        print(f"WORKER: Job {job.job_id} failed on attempt {job.current_attempt}. Rescheduling to run in {delay_seconds} seconds.")
-    else:
-        # Max attempts reached, fail permanently
-        job.status = models.JobStatus.FAILED
-        job.completed_at = datetime.datetime.utcnow()
-        print(f"WORKER: Job {job.job_id} has failed permanently after {max_attempts} attempts.")
-    
-    db.commit()
+    return dict(job_service.failed_attempt_values(job), last_error=str(error))
 
 
-async def execute_job(job: models.Job, db: Session):
-    """Simulates the actual execution of a job."""
+async def execute_job(job: models.Job, log: JobLogger, executors: Optional[JobExecutors] = None):
+    """
+    Runs the handler registered for the job's type on its executor. Job
+    types without a handler only simulate work.
+    """
 
     # --- ADD LOGGING ---
     log_message = f"Executing job {job.job_id} (Type: {job.type})..."
     print(log_message)
-    db.add(models.JobLog(job_id=job.id, message=log_message))
-    db.commit()
+    await log.log(log_message)
+
+    job_handler = handlers.get(job.type)
+    if job_handler is not None and executors is not None:
+        result = await executors.run(job_handler, job.payload or {}, log)
+        if result is not None:
+            await log.log(f"Result: {result}")
+        return
 
     # Simulate different job behaviors based on payload for testing
     if job.payload and job.payload.get("should_fail"):
@@ -62,69 +69,303 @@ async def execute_job(job: models.Job, db: Session):
     await asyncio.sleep(duration)
 
 
-async def process_jobs():
-    """Finds and runs a ready job, with full error, timeout, and retry handling."""
-    db = SessionLocal()
-    try:
-        candidate_jobs = job_service.get_candidate_jobs(db)
-        if not candidate_jobs:
-            print("WORKER: No pending jobs found.")
-            return
+def default_worker_id() -> str:
+    """Identifies this worker process in job leases, e.g. 'worker-1-42'."""
+    return os.environ.get("WORKER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkerEngine:
+    """
+    Runs many jobs concurrently inside one worker process.
+
+    Ready jobs are launched as asyncio tasks for as long as the resource
+    manager can fit them. Every finished task releases its resources and
+    wakes the engine up so the freed slot is refilled immediately, instead
+    of waiting for the next poll. Job change notifications (new, retried or
+    finished jobs) wake it up the same way, so the poll interval is only a
+    safety net for missed notifications. Delayed jobs (scheduled submissions
+    and retries in backoff) are kept as timers, and the engine wakes up
+    exactly when the next one becomes due.
+
+    Every status change the worker makes is published to the event bus, so
+    the API can forward it to WebSocket subscribers.
+
+    Jobs are claimed with a short lease that the engine renews for all its
+    in-flight jobs every heartbeat interval. If the worker dies, its leases
+    run out and the lease reaper of any worker requeues or fails its jobs.
+    """
+
+    # Statuses that can make new work ready; RUNNING transitions never do
+    WAKEUP_STATUSES = {"pending", "success", "failed", "cancelled"}
+
+    def __init__(
+        self,
+        resources: ResourceManager = resource_manager,
+        session_factory: Callable[..., AsyncSession] = WorkerSessionLocal,
+        db_engine: AsyncEngine = worker_engine,
+        poll_interval: float = 5,
+        lease_seconds: int = settings.lease_seconds,
+        heartbeat_interval: float = settings.heartbeat_interval_seconds,
+        timer_window: int = 1000,
+        candidate_limit: int = 50,
+        candidate_window: int = settings.scheduling_window,
+        policy: Optional[SchedulingPolicy] = None,
+        limiter: Optional[JobLimiter] = None,
+        worker_id: Optional[str] = None,
+        events: Optional[EventBus] = None,
+    ):
+        self.worker_id = worker_id or default_worker_id()
+        self.events = events or create_event_bus(db_engine)
+        self.logs = LogSink(session_factory)
+        self.retention = RetentionSweeper(session_factory)
+        self.reaper = LeaseReaper(session_factory, self.events)
+        self.scheduler = ScheduleMaterializer(session_factory, self.events)
+        self.resources = resources
+        # One handler process per CPU unit of this node
+        self.executors = JobExecutors(process_workers=resources.total_cpu)
+        self.session_factory = session_factory
+        self.db_engine = db_engine
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = heartbeat_interval
+        self.candidate_limit = candidate_limit
+        self.candidate_window = candidate_window
+        self.policy = policy or get_policy(settings.scheduling_policy)
+        # Per-type and per-tenant limits, if JOB_LIMITS configures any
+        self.limiter = limiter or JobLimiter.from_settings()
+        # In-flight tasks keyed by the job's primary key and attempt, so the
+        # task of a reaped attempt never stands for a later one
+        self.in_flight: Dict[Tuple[int, int], asyncio.Task] = {}
+        self.timers = DueTimers(window=timer_window)
+        self._wakeup = asyncio.Event()
+
+    async def fill_slots(self) -> int:
+        """Claims ready jobs that fit the free resources and launches them. Returns how many were started."""
+        async with self.session_factory() as db:
+            claimed_jobs = await job_service.claim_jobs(
+                db,
+                worker_id=self.worker_id,
+                cpu_available=self.resources.total_cpu - self.resources.used_cpu,
+                memory_available=self.resources.total_memory - self.resources.used_memory,
+                window=self.candidate_window,
+                limit=self.candidate_limit,
+                cpu_total=self.resources.total_cpu,
+                memory_total=self.resources.total_memory,
+                policy=self.policy,
+                limiter=self.limiter,
+                lease_seconds=self.lease_seconds,
+            )
+
+        if not claimed_jobs:
+            if not self.in_flight:
+                print("WORKER: No jobs are ready to run or fit available resources.")
+            return 0
+
+        for job in claimed_jobs:
+            cpu_req, mem_req = job_service.get_resource_requirements(job)
+            # The claim already fitted the job into the free budget
+            self.resources.allocate(cpu_req, mem_req)
+            print(f"WORKER: Starting job {job.job_id}. Status is now RUNNING.")
+            self.events.publish(job_event(job))
+            limit_keys = self.limiter.keys(job.type, job.payload) if self.limiter else []
+            lease = (job.id, job.current_attempt)
+            self.in_flight[lease] = asyncio.create_task(self._run_job(lease, cpu_req, mem_req, limit_keys))
+
+        print(f"WORKER: Launched {len(claimed_jobs)} job(s). {len(self.in_flight)} in flight.")
+        return len(claimed_jobs)
 
-        job_to_run = None
-        for job in candidate_jobs:
-            if not job_service.are_dependencies_met(job):
-                continue
-
-            cpu_req = job.resource_requirements.get("cpu_units", 0) if job.resource_requirements else 0
-            mem_req = job.resource_requirements.get("memory_mb", 0) if job.resource_requirements else 0
-            
-            if resource_manager.allocate(cpu_req, mem_req):
-                job_to_run = job
-                break 
-            else:
-                print(f"WORKER: Not enough resources for job {job.job_id}. Skipping.")
-        
-        if not job_to_run:
-            print("WORKER: No jobs are ready to run or fit available resources.")
+    async def _run_job(self, lease: Tuple[int, int], cpu_req: int, mem_req: int, limit_keys: List[str] = ()):
+        """Executes one claimed (job pk, attempt) in its own session, with timeout and retry handling."""
+        job_pk, attempt = lease
+        try:
+            async with self.session_factory() as db:
+                job = await db.get(models.Job, job_pk)
+                # Don't hold a pooled connection while the job runs
+                await db.commit()
+                log = self.logs.logger(job)
+                unblocked: List[Tuple[str, str]] = []
+                cancelled: List[Tuple[str, str]] = []
+                try:
+                    timeout = job.timeout_seconds or 300 # Default 5-min timeout
+                    await asyncio.wait_for(execute_job(job, log, self.executors), timeout=timeout)
+
+                    outcome = dict(status=models.JobStatus.SUCCESS)
+                    print(f"WORKER: Job {job.job_id} completed successfully.")
+
+                except asyncio.CancelledError:
+                    # The lease was lost or the worker is stopping. Nothing is
+                    # written: the lease reaper counts the attempt once it expires.
+                    print(f"WORKER: Job {job.job_id} was stopped before it finished.")
+                    raise
+                except Exception as e:
+                    print(f"WORKER: An error occurred while running job {job.job_id}: {e}")
+                    traceback.print_exc()
+                    outcome = await handle_job_failure(job, e, log)
+
+                outcome["completed_at"] = datetime.datetime.utcnow()
+                if not await job_service.finish_attempt(db, job, self.worker_id, attempt, outcome):
+                    # Reaped before the heartbeat noticed; the job is someone else's now
+                    await db.rollback()
+                    print(f"WORKER: Lost the lease of job {job.job_id}, dropping its result.")
+                    return
+                if outcome["status"] == models.JobStatus.SUCCESS:
+                    unblocked = await job_service.release_dependents(db, job)
+                elif outcome["status"] == models.JobStatus.FAILED:
+                    cancelled = await job_service.propagate_failure(db, job)
+                await notify_job_change(db, job)
+                # The job's log is committed together with its final status
+                log_lines = await self.logs.flush(db, job_pk=job.id)
+                try:
+                    await db.commit()
+                except Exception:
+                    # Keep the lines for the next flush rather than losing them
+                    self.logs.restore(log_lines)
+                    raise
+
+                self.events.publish(job_event(job))
+                for dependent_id, dependent_type in unblocked:
+                    self.events.publish(status_event(dependent_id, models.JobStatus.PENDING, job_type=dependent_type))
+                for dependent_id, dependent_type in cancelled:
+                    self.events.publish(status_event(dependent_id, models.JobStatus.CANCELLED, job_type=dependent_type))
+        finally:
+            self.resources.release(cpu_req, mem_req)
+            if self.limiter is not None:
+                self.limiter.release(limit_keys)
+            self.in_flight.pop(lease, None)
+            self._wakeup.set()
+
+    async def heartbeat(self) -> List[int]:
+        """
+        Renews the leases of every in-flight job with one UPDATE. A job whose
+        lease could not be renewed was reaped and may already run elsewhere,
+        so it is stopped here. Returns the jobs that were stopped.
+
+        The node pool is registered again too, which keeps the lease reaper
+        from removing it as a dead worker's.
+        """
+        leases = list(self.in_flight)
+        async with self.session_factory() as db:
+            await register_pool(db, self.worker_id, self.resources.total_cpu, self.resources.total_memory)
+            await db.commit()
+            if not leases:
+                return []
+            renewed = set(await renew_leases(db, self.worker_id, leases, self.lease_seconds))
+        lost = [lease for lease in leases if lease not in renewed and lease in self.in_flight]
+        for job_pk, attempt in lost:
+            print(f"WORKER: Lost the lease of job {job_pk} (attempt {attempt}), stopping it.")
+            self.in_flight[(job_pk, attempt)].cancel()
+        return [job_pk for job_pk, _ in lost]
+
+    async def _heartbeat_periodically(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self.heartbeat()
+            except Exception as e:
+                print(f"WORKER: Heartbeat failed: {e!r}")
+
+    async def register_pools(self):
+        """Publishes this node's capacity, and the cluster's if configured, to the shared pools."""
+        async with self.session_factory() as db:
+            await register_pool(db, self.worker_id, self.resources.total_cpu, self.resources.total_memory)
+            if settings.cluster_cpu_units and settings.cluster_memory_mb:
+                await register_pool(db, models.CLUSTER_POOL, settings.cluster_cpu_units, settings.cluster_memory_mb)
+            await db.commit()
+        print(f"WORKER: Registered node {self.worker_id} with {self.resources.total_cpu} CPU, {self.resources.total_memory}MB.")
+
+    async def unregister_pool(self):
+        """Removes this node's pool as the worker shuts down."""
+        async with self.session_factory() as db:
+            await delete_pool(db, self.worker_id)
+            await db.commit()
+        print(f"WORKER: Unregistered node {self.worker_id}.")
+
+    def _on_notify(self, payload: str):
+        """
+        Wakes the main loop when a notification means new work may be ready.
+        A job that only becomes due later gets a timer instead, and wakes the
+        loop only to re-arm its sleep if it is now the earliest one.
+        """
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            message = {}
+        if message.get("run_at") is not None:
+            if self.timers.add(datetime.datetime.fromisoformat(message["run_at"])):
+                self._wakeup.set()
             return
+        status = message.get("status")
+        if status is None or status in self.WAKEUP_STATUSES:
+            self._wakeup.set()
+
+    async def load_due_times(self):
+        """Reads the next window of delayed jobs' due times into the timers."""
+        async with self.session_factory() as db:
+            self.timers.load(await job_service.next_due_times(db, self.timers.window))
 
-        # We found a job, now execute it with failure handling
-        cpu_req = job_to_run.resource_requirements.get("cpu_units", 0) if job_to_run.resource_requirements else 0
-        mem_req = job_to_run.resource_requirements.get("memory_mb", 0) if job_to_run.resource_requirements else 0
-        
+    async def run_forever(self):
+        """
+        Fills free slots, then sleeps until a job finishes, a notification
+        arrives, the next delayed job becomes due or the poll interval elapses.
+        """
+        await self.register_pools()
+        listener = JobsListener(self.db_engine, self._on_notify)
+        await listener.start()
+        self.logs.start()
+        self.retention.start()
+        self.reaper.start()
+        self.scheduler.start()
+        heartbeats = asyncio.create_task(self._heartbeat_periodically())
         try:
-            print(f"WORKER: Starting job {job_to_run.job_id}. Changing status to RUNNING.")
-            job_to_run.status = models.JobStatus.RUNNING
-            job_to_run.started_at = datetime.datetime.utcnow()
-            job_to_run.current_attempt += 1
-            db.commit()
-
-            timeout = job_to_run.timeout_seconds or 300 # Default 5-min timeout
-            await asyncio.wait_for(execute_job(job_to_run, db), timeout=timeout)
-
-            job_to_run.status = models.JobStatus.SUCCESS
-            print(f"WORKER: Job {job_to_run.job_id} completed successfully.")
-
-        except Exception as e:
-            print(f"WORKER: An error occurred while running job {job_to_run.job_id}: {e}")
-            traceback.print_exc()
-            handle_job_failure(job_to_run, db, e)
+            await self.load_due_times()
+            while True:
+                self._wakeup.clear()
+                self.timers.pop_due()
+                await self.fill_slots()
+                if self.timers.needs_reload():
+                    await self.load_due_times()
+                next_due = self.timers.seconds_until_next()
+                sleep = self.poll_interval if next_due is None else min(self.poll_interval, next_due)
+                refill = self.limiter.seconds_until_refill() if self.limiter else None
+                if refill is not None:
+                    # A rate-limited job can start once its bucket has a token again
+                    sleep = min(sleep, refill)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=sleep)
+                except asyncio.TimeoutError:
+                    if sleep >= self.poll_interval:
+                        print(f"WORKER: DB pool {pool_metrics(self.db_engine, settings.worker_pool)}")
+                        # The poll is the safety net for missed notifications
+                        await self.load_due_times()
         finally:
-            job_to_run.completed_at = datetime.datetime.utcnow()
-            db.commit()
-            resource_manager.release(cpu_req, mem_req)
+            heartbeats.cancel()
+            try:
+                await self.unregister_pool()
+            except Exception as e:
+                # The lease reaper removes the pool once it goes stale
+                print(f"WORKER: Unregistering node {self.worker_id} failed: {e!r}")
+            await listener.stop()
+            await self.scheduler.stop()
+            await self.reaper.stop()
+            await self.retention.stop()
+            await self.logs.stop()
+            await self.events.stop()
+            self.executors.shutdown()
 
-    finally:
-        db.close()
+    async def drain(self):
+        """Waits for every in-flight job to finish."""
+        while self.in_flight:
+            await asyncio.gather(*list(self.in_flight.values()), return_exceptions=True)
 
 
 async def main():
-    """The main loop that runs the worker process periodically."""
+    """The main loop that runs the worker process."""
     print("--- Worker Process Started ---")
-    while True:
-        await process_jobs()
-        await asyncio.sleep(5)
+    for module in settings.job_handler_modules:
+        importlib.import_module(module)
+        print(f"WORKER: Loaded job handlers from {module}.")
+    engine = WorkerEngine()
+    await engine.run_forever()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
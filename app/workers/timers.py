@@ -0,0 +1,60 @@
+# In app/workers/timers.py
+
+import datetime
+import heapq
+from typing import Iterable, List, Optional
+
+
+class DueTimers:
+    """
+    The times at which delayed jobs become due, earliest first.
+
+    The worker loads the next `window` due times from the database and is
+    told about new ones (scheduled submissions, retries) by notifications,
+    so it can sleep exactly until the next job is due instead of re-querying
+    on every poll. When more jobs are delayed than the window holds, the
+    latest loaded time is the horizon: times beyond it are ignored until the
+    timers run dry and the next window is loaded.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._heap: List[datetime.datetime] = []
+        self._horizon: Optional[datetime.datetime] = None
+        self._loaded = False
+
+    def load(self, due_times: Iterable[datetime.datetime]):
+        """Replaces the timers with a window freshly read from the database."""
+        self._heap = sorted(set(due_times))
+        self._horizon = self._heap[-1] if len(self._heap) >= self.window else None
+        self._loaded = True
+
+    def add(self, due_at: datetime.datetime) -> bool:
+        """Adds a due time. Returns True if it is now the earliest one."""
+        if self._horizon is not None and due_at > self._horizon:
+            return False
+        earliest = self.next_due()
+        heapq.heappush(self._heap, due_at)
+        return earliest is None or due_at < earliest
+
+    def next_due(self) -> Optional[datetime.datetime]:
+        return self._heap[0] if self._heap else None
+
+    def pop_due(self, now: Optional[datetime.datetime] = None) -> int:
+        """Drops the timers that have fired. Returns how many did."""
+        now = now or datetime.datetime.utcnow()
+        fired = 0
+        while self._heap and self._heap[0] <= now:
+            heapq.heappop(self._heap)
+            fired += 1
+        return fired
+
+    def seconds_until_next(self, now: Optional[datetime.datetime] = None) -> Optional[float]:
+        due_at = self.next_due()
+        if due_at is None:
+            return None
+        return max(0.0, (due_at - (now or datetime.datetime.utcnow())).total_seconds())
+
+    def needs_reload(self) -> bool:
+        """Whether the next window has to be read, i.e. the timers never were or ran past the horizon."""
+        return not self._loaded or (self._horizon is not None and not self._heap)
@@ -1,6 +1,7 @@
 from logging.config import fileConfig
 from sqlalchemy import create_engine
 from alembic import context
+from app.config import settings
 from app.database import Base
 from app.models import * 
 # This is the Alembic Config object, which provides
@@ -18,7 +19,7 @@ def run_migrations_online() -> None:
     """A new, simplified 'online' mode to force commit."""
     
     # Create a new, simple engine that points directly to our database
-    engine = create_engine("postgresql://user:password@db/task_queue")
+    engine = create_engine(settings.migration_database_url)
 
     # Use the engine to connect and automatically handle transactions
     with engine.connect() as connection:
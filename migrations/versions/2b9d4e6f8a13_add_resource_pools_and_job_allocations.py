@@ -0,0 +1,46 @@
+"""Add resource pools and job allocations
+
+Revision ID: 2b9d4e6f8a13
+Revises: f0b6d2c8e347
+Create Date: 2026-10-18 14:48:52.093617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b9d4e6f8a13'
+down_revision: Union[str, Sequence[str], None] = 'f0b6d2c8e347'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('resource_pools',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('total_cpu', sa.Integer(), nullable=False),
+    sa.Column('total_memory_mb', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.add_column('jobs', sa.Column('allocated_cpu', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('jobs', sa.Column('allocated_memory_mb', sa.Integer(), server_default='0', nullable=False))
+    op.create_index(
+        'ix_jobs_running_worker',
+        'jobs',
+        ['worker_id', 'lease_expires_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'RUNNING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_running_worker', table_name='jobs', postgresql_where=sa.text("status = 'RUNNING'"))
+    op.drop_column('jobs', 'allocated_memory_mb')
+    op.drop_column('jobs', 'allocated_cpu')
+    op.drop_table('resource_pools')
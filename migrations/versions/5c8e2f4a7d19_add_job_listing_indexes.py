@@ -0,0 +1,36 @@
+"""Add job listing indexes
+
+Revision ID: 5c8e2f4a7d19
+Revises: e6a0f4d2b913
+Create Date: 2026-10-18 11:42:10.285114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c8e2f4a7d19'
+down_revision: Union[str, Sequence[str], None] = 'e6a0f4d2b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_jobs_created_at_id', 'jobs', ['created_at', 'id'], unique=False)
+    op.create_index('ix_jobs_status_created_at_id', 'jobs', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_jobs_type_created_at_id', 'jobs', ['type', 'created_at', 'id'], unique=False)
+    # Both are prefixes of the composite indexes above
+    op.drop_index(op.f('ix_jobs_status'), table_name='jobs')
+    op.drop_index(op.f('ix_jobs_type'), table_name='jobs')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_jobs_type'), 'jobs', ['type'], unique=False)
+    op.create_index(op.f('ix_jobs_status'), 'jobs', ['status'], unique=False)
+    op.drop_index('ix_jobs_type_created_at_id', table_name='jobs')
+    op.drop_index('ix_jobs_status_created_at_id', table_name='jobs')
+    op.drop_index('ix_jobs_created_at_id', table_name='jobs')
@@ -0,0 +1,48 @@
+"""Add job schedules table
+
+Revision ID: 7e1c4b9a5d20
+Revises: 2b9d4e6f8a13
+Create Date: 2026-10-18 16:02:37.418255
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e1c4b9a5d20'
+down_revision: Union[str, Sequence[str], None] = '2b9d4e6f8a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('job_schedules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('cron', sa.String(), nullable=False),
+    sa.Column('job_template', sa.JSON(), nullable=False),
+    sa.Column('enabled', sa.Boolean(), server_default=sa.text('true'), nullable=False),
+    sa.Column('next_fire_at', sa.DateTime(), nullable=False),
+    sa.Column('last_fired_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_index(
+        'ix_job_schedules_due',
+        'job_schedules',
+        ['next_fire_at'],
+        unique=False,
+        postgresql_where=sa.text('enabled'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_schedules_due', table_name='job_schedules', postgresql_where=sa.text('enabled'))
+    op.drop_table('job_schedules')
@@ -0,0 +1,49 @@
+"""Add priority rank and dequeue index
+
+Revision ID: 8d41b6c0e2f7
+Revises: 3f9c1e7a2b4d
+Create Date: 2026-10-18 10:03:57.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d41b6c0e2f7'
+down_revision: Union[str, Sequence[str], None] = '3f9c1e7a2b4d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('priority_rank', sa.Integer(), server_default='2', nullable=False))
+
+    # Backfill the rank from the enum and give every job a due time, so the
+    # dequeue query can filter on run_at with a plain range condition.
+    op.execute("""
+        UPDATE jobs SET priority_rank = CASE priority
+            WHEN 'CRITICAL' THEN 0
+            WHEN 'HIGH' THEN 1
+            WHEN 'NORMAL' THEN 2
+            WHEN 'LOW' THEN 3
+        END
+    """)
+    op.execute("UPDATE jobs SET run_at = created_at WHERE run_at IS NULL")
+
+    op.create_index(
+        'ix_jobs_dequeue',
+        'jobs',
+        ['status', 'priority_rank', 'run_at', 'created_at'],
+        unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_dequeue', table_name='jobs', postgresql_where=sa.text("status = 'PENDING'"))
+    op.drop_column('jobs', 'priority_rank')
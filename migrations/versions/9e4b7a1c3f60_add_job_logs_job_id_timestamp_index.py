@@ -0,0 +1,27 @@
+"""Add job_logs (job_id, timestamp) index
+
+Revision ID: 9e4b7a1c3f60
+Revises: 5c8e2f4a7d19
+Create Date: 2026-10-18 12:20:31.640172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7a1c3f60'
+down_revision: Union[str, Sequence[str], None] = '5c8e2f4a7d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_job_logs_job_id_timestamp', 'job_logs', ['job_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_job_logs_job_id_timestamp', table_name='job_logs')
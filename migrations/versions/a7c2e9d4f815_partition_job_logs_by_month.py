@@ -0,0 +1,111 @@
+"""Partition job_logs by month
+
+Revision ID: a7c2e9d4f815
+Revises: d3a5f8e1b274
+Create Date: 2026-10-18 13:25:09.804266
+
+Optional: the table is only converted on Postgres, and only when asked for
+with `alembic -x partition_job_logs=true upgrade head`. Otherwise this
+revision does nothing. The retention sweeper then creates the coming months'
+partitions and drops expired months once their lines are deleted.
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c2e9d4f815'
+down_revision: Union[str, Sequence[str], None] = 'd3a5f8e1b274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month_start(day: datetime.date, months_later: int = 0) -> datetime.date:
+    month = day.month - 1 + months_later
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'job_logs')"
+    )).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    requested = context.get_x_argument(as_dictionary=True).get("partition_job_logs", "")
+    if bind.dialect.name != "postgresql" or requested.lower() not in ("1", "true", "yes"):
+        return
+    if _is_partitioned(bind):
+        return
+
+    # Move the old table aside, keeping its id sequence for the new one
+    op.execute("ALTER SEQUENCE job_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE job_logs RENAME TO job_logs_unpartitioned")
+    op.execute("ALTER TABLE job_logs_unpartitioned RENAME CONSTRAINT job_logs_pkey TO job_logs_unpartitioned_pkey")
+    op.drop_index('ix_job_logs_job_id_timestamp', table_name='job_logs_unpartitioned')
+    op.drop_index('ix_job_logs_id', table_name='job_logs_unpartitioned')
+
+    # The partition key has to be part of the primary key
+    op.execute("""
+        CREATE TABLE job_logs (
+            id INTEGER NOT NULL DEFAULT nextval('job_logs_id_seq'),
+            job_id INTEGER NOT NULL REFERENCES jobs (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            message VARCHAR NOT NULL,
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("ALTER SEQUENCE job_logs_id_seq OWNED BY job_logs.id")
+
+    # One partition per month from the oldest log line to a few months ahead.
+    # The default partition only catches lines if the sweeper stops creating them.
+    oldest = bind.execute(sa.text("SELECT min(timestamp) FROM job_logs_unpartitioned")).scalar()
+    today = datetime.datetime.utcnow().date()
+    month = _month_start(oldest.date() if oldest else today)
+    while month <= _month_start(today, MONTHS_AHEAD):
+        op.execute(
+            f"CREATE TABLE job_logs_{month:%Y_%m} PARTITION OF job_logs "
+            f"FOR VALUES FROM ('{month}') TO ('{_month_start(month, 1)}')"
+        )
+        month = _month_start(month, 1)
+    op.execute("CREATE TABLE job_logs_default PARTITION OF job_logs DEFAULT")
+
+    op.execute("INSERT INTO job_logs (id, job_id, timestamp, message) SELECT id, job_id, timestamp, message FROM job_logs_unpartitioned")
+    op.drop_table('job_logs_unpartitioned')
+    op.create_index('ix_job_logs_id', 'job_logs', ['id'], unique=False)
+    op.create_index('ix_job_logs_job_id_timestamp', 'job_logs', ['job_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql" or not _is_partitioned(bind):
+        return
+
+    op.execute("ALTER SEQUENCE job_logs_id_seq OWNED BY NONE")
+    op.execute("ALTER TABLE job_logs RENAME TO job_logs_partitioned")
+    op.drop_index('ix_job_logs_job_id_timestamp', table_name='job_logs_partitioned')
+    op.drop_index('ix_job_logs_id', table_name='job_logs_partitioned')
+    op.execute("ALTER TABLE job_logs_partitioned RENAME CONSTRAINT job_logs_pkey TO job_logs_partitioned_pkey")
+    op.execute("""
+        CREATE TABLE job_logs (
+            id INTEGER NOT NULL DEFAULT nextval('job_logs_id_seq') PRIMARY KEY,
+            job_id INTEGER NOT NULL REFERENCES jobs (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            message VARCHAR NOT NULL
+        )
+    """)
+    op.execute("ALTER SEQUENCE job_logs_id_seq OWNED BY job_logs.id")
+    op.execute("INSERT INTO job_logs (id, job_id, timestamp, message) SELECT id, job_id, timestamp, message FROM job_logs_partitioned")
+    op.drop_table('job_logs_partitioned')
+    op.create_index('ix_job_logs_id', 'job_logs', ['id'], unique=False)
+    op.create_index('ix_job_logs_job_id_timestamp', 'job_logs', ['job_id', 'timestamp', 'id'], unique=False)
@@ -0,0 +1,44 @@
+"""Add unmet_deps counter to jobs
+
+Revision ID: b27e5d93c1a8
+Revises: 8d41b6c0e2f7
+Create Date: 2026-10-18 10:41:22.670153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b27e5d93c1a8'
+down_revision: Union[str, Sequence[str], None] = '8d41b6c0e2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('jobs', sa.Column('unmet_deps', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill the counter for jobs still waiting to run, and park the ones
+    # with unfinished dependencies as BLOCKED.
+    op.execute("""
+        UPDATE jobs SET unmet_deps = waiting.unmet
+        FROM (
+            SELECT d.job_id, count(*) AS unmet
+            FROM job_dependencies d
+            JOIN jobs parent ON parent.id = d.depends_on_id
+            WHERE parent.status <> 'SUCCESS'
+            GROUP BY d.job_id
+        ) AS waiting
+        WHERE jobs.id = waiting.job_id AND jobs.status IN ('PENDING', 'BLOCKED')
+    """)
+    op.execute("UPDATE jobs SET status = 'BLOCKED' WHERE status = 'PENDING' AND unmet_deps > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE jobs SET status = 'PENDING' WHERE status = 'BLOCKED'")
+    op.drop_column('jobs', 'unmet_deps')
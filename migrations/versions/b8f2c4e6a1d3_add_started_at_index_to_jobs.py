@@ -0,0 +1,27 @@
+"""Add started_at index to jobs
+
+Revision ID: b8f2c4e6a1d3
+Revises: 7e1c4b9a5d20
+Create Date: 2026-10-18 18:42:16.308157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8f2c4e6a1d3'
+down_revision: Union[str, Sequence[str], None] = '7e1c4b9a5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_jobs_started_at', 'jobs', ['started_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_started_at', table_name='jobs')
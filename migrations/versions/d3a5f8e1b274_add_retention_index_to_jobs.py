@@ -0,0 +1,30 @@
+"""Add retention index to jobs
+
+Revision ID: d3a5f8e1b274
+Revises: 9e4b7a1c3f60
+Create Date: 2026-10-18 13:02:44.517390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a5f8e1b274'
+down_revision: Union[str, Sequence[str], None] = '9e4b7a1c3f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Jobs cancelled through the API never had completed_at set, which the
+    # retention sweeper needs to find them.
+    op.execute("UPDATE jobs SET completed_at = created_at WHERE status = 'CANCELLED' AND completed_at IS NULL")
+    op.create_index('ix_jobs_status_completed_at', 'jobs', ['status', 'completed_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_status_completed_at', table_name='jobs')
@@ -0,0 +1,32 @@
+"""Add dependency failure policy to jobs
+
+Revision ID: e6a0f4d2b913
+Revises: b27e5d93c1a8
+Create Date: 2026-10-18 11:05:48.913377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a0f4d2b913'
+down_revision: Union[str, Sequence[str], None] = 'b27e5d93c1a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+policy_enum = sa.Enum('FAIL_FAST', 'WAIT', name='dependencyfailurepolicy')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    policy_enum.create(op.get_bind(), checkfirst=True)
+    op.add_column('jobs', sa.Column('on_dependency_failure', policy_enum, server_default='FAIL_FAST', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('jobs', 'on_dependency_failure')
+    policy_enum.drop(op.get_bind(), checkfirst=True)
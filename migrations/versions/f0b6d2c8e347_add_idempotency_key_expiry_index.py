@@ -0,0 +1,38 @@
+"""Add idempotency key expiry index
+
+Revision ID: f0b6d2c8e347
+Revises: a7c2e9d4f815
+Create Date: 2026-10-18 14:10:37.221904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f0b6d2c8e347'
+down_revision: Union[str, Sequence[str], None] = 'a7c2e9d4f815'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_jobs_idempotency_key_created_at',
+        'jobs',
+        ['created_at'],
+        unique=False,
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_jobs_idempotency_key_created_at',
+        table_name='jobs',
+        postgresql_where=sa.text("idempotency_key IS NOT NULL"),
+    )
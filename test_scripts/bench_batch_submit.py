@@ -0,0 +1,38 @@
+import requests
+import time
+
+API_URL = "http://localhost:8000/jobs/"
+BATCH_URL = "http://localhost:8000/jobs/batch"
+
+SINGLE_JOBS = 500
+BATCH_JOBS = 10000
+BATCH_SIZE = 2000
+
+def job_payload(i):
+    return {"type": "bench_submit", "priority": "low", "payload": {"n": i, "duration_seconds": 0}}
+
+print("--- Starting Submission Benchmark ---")
+
+try:
+    # 1. One HTTP request and one transaction per job
+    start = time.perf_counter()
+    with requests.Session() as session:
+        for i in range(SINGLE_JOBS):
+            session.post(API_URL, json=job_payload(i)).raise_for_status()
+    single_rate = SINGLE_JOBS / (time.perf_counter() - start)
+    print(f"POST /jobs/      : {single_rate:,.0f} jobs/s ({SINGLE_JOBS} jobs)")
+
+    # 2. The same jobs submitted in batches
+    start = time.perf_counter()
+    with requests.Session() as session:
+        for offset in range(0, BATCH_JOBS, BATCH_SIZE):
+            batch = [job_payload(i) for i in range(offset, offset + BATCH_SIZE)]
+            session.post(BATCH_URL, json=batch).raise_for_status()
+    batch_rate = BATCH_JOBS / (time.perf_counter() - start)
+    print(f"POST /jobs/batch : {batch_rate:,.0f} jobs/s ({BATCH_JOBS} jobs, {BATCH_SIZE} per request)")
+except requests.exceptions.RequestException as e:
+    print(f"ERROR: Could not submit jobs. Is the server running? Details: {e}")
+    exit()
+
+print(f"\nSpeed-up: {batch_rate / single_rate:.1f}x")
+print("--- Benchmark Complete ---")
@@ -0,0 +1,92 @@
+import asyncio
+import datetime
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+from app import models
+from app.database import WorkerSessionLocal
+from app.services import job_service, retention
+
+# Finished jobs added before each measurement, cumulatively
+HISTORY_STEPS = [0, 100_000, 500_000, 1_000_000]
+INSERT_CHUNK = 10_000
+PENDING_JOBS = 200
+SAMPLES = 50
+
+# Runs against DATABASE_URL, e.g. the docker-compose Postgres. It writes to
+# that database, so don't point it at production.
+
+
+def _job_row(status: models.JobStatus, completed_days_ago: float = None) -> dict:
+    now = datetime.datetime.utcnow()
+    completed_at = now - datetime.timedelta(days=completed_days_ago) if completed_days_ago is not None else None
+    return {
+        "job_id": f"job_{uuid.uuid4().hex[:12]}",
+        "type": "bench_history",
+        "priority": models.PriorityLevel.NORMAL,
+        "priority_rank": models.PRIORITY_RANKS[models.PriorityLevel.NORMAL],
+        "status": status,
+        "current_attempt": 0,
+        "unmet_deps": 0,
+        "on_dependency_failure": models.DependencyFailurePolicy.FAIL_FAST,
+        "run_at": now,
+        "created_at": completed_at or now,
+        "completed_at": completed_at,
+    }
+
+
+async def add_history(count: int):
+    """Adds finished jobs, most of them older than the default retention."""
+    for offset in range(0, count, INSERT_CHUNK):
+        rows = [_job_row(models.JobStatus.SUCCESS, completed_days_ago=10 + (i % 20))
+                for i in range(min(INSERT_CHUNK, count - offset))]
+        async with WorkerSessionLocal() as db:
+            await db.execute(insert(models.Job), rows)
+            await db.commit()
+
+
+async def time_ms(query_fn) -> float:
+    """Median latency of a read-only query over SAMPLES runs."""
+    samples = []
+    for _ in range(SAMPLES):
+        async with WorkerSessionLocal() as db:
+            start = time.perf_counter()
+            await query_fn(db)
+            samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+async def measure(history: int):
+    dequeue = await time_ms(lambda db: job_service.get_candidate_jobs(db, limit=50))
+    listing = await time_ms(lambda db: job_service.list_jobs(db, status=models.JobStatus.PENDING, limit=100))
+    print(f"{history:>10,} finished jobs | dequeue {dequeue:6.2f} ms | pending listing {listing:6.2f} ms")
+
+
+async def main():
+    print("--- Starting Dequeue vs. History Benchmark ---")
+    async with WorkerSessionLocal() as db:
+        await db.execute(insert(models.Job), [_job_row(models.JobStatus.PENDING) for _ in range(PENDING_JOBS)])
+        await db.commit()
+
+    added = 0
+    for target in HISTORY_STEPS:
+        await add_history(target - added)
+        added = target
+        await measure(added)
+
+    start = time.perf_counter()
+    sweeper = retention.RetentionSweeper(WorkerSessionLocal)
+    deleted = await sweeper.run_once()
+    print(f"\nRetention sweep deleted {deleted:,} expired jobs in {time.perf_counter() - start:.1f}s")
+    await measure(added - deleted)
+    print("--- Benchmark Complete ---")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
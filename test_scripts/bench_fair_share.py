@@ -0,0 +1,136 @@
+import heapq
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models
+from app.services.scheduling import Candidate, FairSharePolicy, Running, get_policy
+
+# A simulated worker node; no database or API is involved. The runs are
+# seeded, so every policy sees the same arrivals and the numbers repeat.
+CAPACITY = (8, 4096)
+WINDOW = 200
+HORIZON_SECONDS = 6 * 3600
+SEED = 7
+
+# Each job takes 1 or 2 CPU for 5 to 60 seconds: about 49 CPU-seconds, so
+# the node completes about 0.16 jobs per second.
+NODE_JOBS_PER_SECOND = CAPACITY[0] / (1.5 * 32.5)
+
+PRIORITIES = [
+    models.PriorityLevel.CRITICAL,
+    models.PriorityLevel.HIGH,
+    models.PriorityLevel.NORMAL,
+    models.PriorityLevel.LOW,
+]
+
+# (name, offered load as a share of the node's capacity, share of the jobs per priority)
+MIXES = [
+    ("steady", 0.8, [0.05, 0.15, 0.50, 0.30]),
+    ("high flood", 1.3, [0.02, 0.80, 0.12, 0.06]),
+    ("overload", 1.5, [0.05, 0.25, 0.40, 0.30]),
+]
+
+POLICIES = [
+    ("best_fit", lambda: get_policy("best_fit")),
+    ("fair_share", lambda: FairSharePolicy(aging_seconds=None)),
+    ("fair+aging", lambda: FairSharePolicy(aging_seconds=600)),
+]
+
+
+def generate_jobs(rng: random.Random, load: float, shares):
+    """(arrival, priority, cpu, runtime, timeout) for every job arriving within the horizon."""
+    jobs, now = [], 0.0
+    rate = load * NODE_JOBS_PER_SECOND
+    while True:
+        now += rng.expovariate(rate)
+        if now > HORIZON_SECONDS:
+            return jobs
+        priority = rng.choices(PRIORITIES, shares)[0]
+        runtime = rng.uniform(5, 60)
+        jobs.append((now, priority, rng.choice([1, 2]), runtime, runtime * rng.uniform(1.0, 3.0)))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def simulate(policy, jobs):
+    """Runs the arrivals up to the horizon. Returns the waits of the started jobs and the jobs left waiting."""
+    pending = {models.PRIORITY_RANKS[priority]: [] for priority in PRIORITIES}  # rank -> indexes by arrival
+    running = {}  # index -> (cpu, estimated end)
+    completions = []  # heap of (end, index)
+    waits = {priority: [] for priority in PRIORITIES}
+    free = CAPACITY
+    next_arrival = 0
+    now = 0.0
+
+    while True:
+        arrival_at = jobs[next_arrival][0] if next_arrival < len(jobs) else float("inf")
+        completion_at = completions[0][0] if completions else float("inf")
+        if min(arrival_at, completion_at) > HORIZON_SECONDS:
+            break
+        if arrival_at <= completion_at:
+            now = arrival_at
+            pending[models.PRIORITY_RANKS[jobs[next_arrival][1]]].append(next_arrival)
+            next_arrival += 1
+        else:
+            now, index = heapq.heappop(completions)
+            cpu, _ = running.pop(index)
+            free = (free[0] + cpu, free[1])
+
+        if policy.window_per_priority:
+            window = [index for rank in sorted(pending) for index in pending[rank][:WINDOW // len(pending)]]
+        else:
+            window = [index for rank in sorted(pending) for index in pending[rank]][:WINDOW]
+        candidates = [
+            Candidate(index, models.PRIORITY_RANKS[jobs[index][1]], jobs[index][2], 0,
+                      runtime=jobs[index][4], waited=now - jobs[index][0])
+            for index in window
+        ]
+        running_now = [Running(cpu, 0, max(0.0, end - now)) for cpu, end in running.values()]
+        started = [c.job for c in policy.select(candidates, free, CAPACITY, len(candidates), running_now)]
+        for index in started:
+            arrival, priority, cpu, runtime, timeout = jobs[index]
+            pending[models.PRIORITY_RANKS[priority]].remove(index)
+            free = (free[0] - cpu, free[1])
+            running[index] = (cpu, now + timeout)
+            heapq.heappush(completions, (now + runtime, index))
+            waits[priority].append(now - arrival)
+
+    # Jobs still queued at the horizon have waited at least this long
+    left = {
+        priority: [HORIZON_SECONDS - jobs[index][0] for index in pending[models.PRIORITY_RANKS[priority]]]
+        for priority in PRIORITIES
+    }
+    return waits, left
+
+
+def main():
+    print("--- Starting Fair Share Simulation ---")
+    print(f"{HORIZON_SECONDS // 3600}h of arrivals on a {CAPACITY[0]} CPU node, window of {WINDOW}")
+    print("Per priority: jobs started per hour, p99 wait of started jobs, and the oldest job still waiting\n")
+    for mix, load, shares in MIXES:
+        jobs = generate_jobs(random.Random(SEED), load, shares)
+        print(f"{mix} ({load:.0%} load, {len(jobs):,} jobs)")
+        header = " | ".join(f"{priority.value:>24}" for priority in PRIORITIES)
+        print(f"  {'policy':<10} | {header}")
+        for name, make_policy in POLICIES:
+            waits, left = simulate(make_policy(), jobs)
+            cells = " | ".join(
+                f"{len(waits[p]) / (HORIZON_SECONDS / 3600):5.0f}/h "
+                f"{percentile(waits[p], 0.99):7.0f}s {max(left[p], default=0):7.0f}s"
+                for p in PRIORITIES
+            )
+            print(f"  {name:<10} | {cells}")
+        print()
+    print("--- Simulation Complete ---")
+
+
+if __name__ == "__main__":
+    main()
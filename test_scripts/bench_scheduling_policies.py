@@ -0,0 +1,115 @@
+import heapq
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import models
+from app.services.scheduling import POLICIES, Candidate, Running
+
+# A simulated worker node and workload; no database or API is involved.
+# Every policy sees the same arrivals, so the numbers are comparable.
+CAPACITY = (8, 4096)
+JOBS = 10_000
+MEAN_INTERARRIVAL_SECONDS = 12.0
+WINDOW = 200
+SEED = 42
+
+# (priority, share of the jobs, CPU choices, memory choices)
+WORKLOAD = [
+    (models.PriorityLevel.CRITICAL, 0.05, [6, 8], [2048, 3072]),
+    (models.PriorityLevel.HIGH, 0.15, [2, 4, 6], [512, 1024, 2048]),
+    (models.PriorityLevel.NORMAL, 0.50, [1, 2, 4], [256, 512, 1024]),
+    (models.PriorityLevel.LOW, 0.30, [1, 2], [128, 256]),
+]
+
+
+def generate_jobs(rng: random.Random):
+    """(arrival, priority, cpu, memory, runtime, timeout) for every job, by arrival."""
+    jobs, now = [], 0.0
+    weights = [share for _, share, _, _ in WORKLOAD]
+    for _ in range(JOBS):
+        now += rng.expovariate(1 / MEAN_INTERARRIVAL_SECONDS)
+        priority, _, cpus, memories = rng.choices(WORKLOAD, weights)[0]
+        runtime = rng.uniform(5, 60)
+        # Timeouts overestimate the real runtime, as they do in practice
+        timeout = runtime * rng.uniform(1.0, 3.0)
+        jobs.append((now, priority, rng.choice(cpus), rng.choice(memories), runtime, timeout))
+    return jobs
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def simulate(policy, jobs):
+    pending = []  # (rank, arrival, index)
+    running = {}  # index -> (cpu, memory, estimated end)
+    completions = []  # heap of (end, index)
+    waits = {priority: [] for priority, *_ in WORKLOAD}
+    free = CAPACITY
+    busy_cpu_seconds = 0.0
+    next_arrival = 0
+    now = 0.0
+
+    while next_arrival < len(jobs) or completions or pending:
+        # Advance to the next arrival or completion
+        arrival_at = jobs[next_arrival][0] if next_arrival < len(jobs) else float("inf")
+        completion_at = completions[0][0] if completions else float("inf")
+        if arrival_at == completion_at == float("inf"):
+            break  # Jobs left pending can never fit the node
+        if arrival_at <= completion_at:
+            now = arrival_at
+            arrival, priority = jobs[next_arrival][:2]
+            pending.append((models.PRIORITY_RANKS[priority], arrival, next_arrival))
+            next_arrival += 1
+        else:
+            now, index = heapq.heappop(completions)
+            cpu, memory, _ = running.pop(index)
+            free = (free[0] + cpu, free[1] + memory)
+
+        pending.sort()
+        candidates = [
+            Candidate(index, rank, jobs[index][2], jobs[index][3], runtime=jobs[index][5])
+            for rank, _, index in pending[:WINDOW]
+        ]
+        running_now = [Running(cpu, memory, max(0.0, end - now)) for cpu, memory, end in running.values()]
+        started = {c.job for c in policy.select(candidates, free, CAPACITY, len(candidates), running_now)}
+        if not started:
+            continue
+        pending = [entry for entry in pending if entry[2] not in started]
+        for index in started:
+            arrival, priority, cpu, memory, runtime, timeout = jobs[index]
+            free = (free[0] - cpu, free[1] - memory)
+            running[index] = (cpu, memory, now + timeout)
+            heapq.heappush(completions, (now + runtime, index))
+            waits[priority].append(now - arrival)
+            busy_cpu_seconds += cpu * runtime
+
+    utilization = busy_cpu_seconds / (CAPACITY[0] * now) if now else 0.0
+    return utilization, waits
+
+
+def main():
+    print("--- Starting Scheduling Policy Simulation ---")
+    print(f"{JOBS:,} jobs on a {CAPACITY[0]} CPU / {CAPACITY[1]}MB node, window of {WINDOW}\n")
+    jobs = generate_jobs(random.Random(SEED))
+    header = " | ".join(f"{priority.value:>17}" for priority, *_ in WORKLOAD)
+    print(f"{'policy':<11} | {'CPU util':>8} | {header}")
+    print(f"{'':<11} | {'':>8} | " + " | ".join(f"{'p50 / p99 wait':>17}" for _ in WORKLOAD))
+    for name, policy in POLICIES.items():
+        utilization, waits = simulate(policy, jobs)
+        cells = " | ".join(
+            f"{percentile(waits[priority], 0.5):7.1f}s/{percentile(waits[priority], 0.99):7.1f}s"
+            for priority, *_ in WORKLOAD
+        )
+        print(f"{name:<11} | {utilization:8.1%} | {cells}")
+    print("--- Simulation Complete ---")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# In tests/conftest.py
+
+import pytest
+
+@pytest.fixture
+def anyio_backend():
+    """
+    The worker and services rely on asyncio primitives (tasks, events),
+    so the async tests only run on the asyncio backend.
+    """
+    return "asyncio"
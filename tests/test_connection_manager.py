@@ -0,0 +1,154 @@
+# In tests/test_connection_manager.py
+
+import asyncio
+import json
+import pytest
+from app.services.connection_manager import ConnectionManager, Subscription
+
+
+class FakeWebSocket:
+    """Records what it is sent; can be made slow or broken."""
+
+    def __init__(self, delay: float = 0, broken: bool = False):
+        self.delay = delay
+        self.broken = broken
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+    async def send_text(self, message: str):
+        if self.broken:
+            raise RuntimeError("connection closed")
+        await asyncio.sleep(self.delay)
+        self.sent.append(message)
+
+
+@pytest.mark.anyio
+async def test_slow_client_does_not_delay_broadcast():
+    """
+    Tests that broadcasting returns immediately even when a client is slow,
+    and that fast clients still receive every message.
+    """
+    manager = ConnectionManager()
+    fast, slow = FakeWebSocket(), FakeWebSocket(delay=10)
+    await manager.connect(fast)
+    await manager.connect(slow)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for i in range(3):
+        await manager.broadcast(f"message {i}")
+    assert loop.time() - started < 0.1
+
+    await asyncio.sleep(0.01)
+    assert fast.sent == ["message 0", "message 1", "message 2"]
+    manager.disconnect(fast)
+    manager.disconnect(slow)
+
+
+@pytest.mark.anyio
+async def test_dead_client_is_pruned():
+    """
+    Tests that a connection whose send fails is removed automatically.
+    """
+    manager = ConnectionManager()
+    dead = FakeWebSocket(broken=True)
+    await manager.connect(dead)
+
+    await manager.broadcast("hello")
+    await asyncio.sleep(0.01)
+    assert dead not in manager.active_connections
+    assert dead.close_code == 1011
+
+
+@pytest.mark.anyio
+async def test_client_too_slow_to_send_to_is_closed():
+    """
+    Tests that a client whose send times out is closed, not just forgotten,
+    so it finds out it was dropped and can reconnect.
+    """
+    manager = ConnectionManager(send_timeout=0.01)
+    slow = FakeWebSocket(delay=10)
+    await manager.connect(slow)
+
+    await manager.broadcast("hello")
+    await asyncio.sleep(0.05)
+    assert slow not in manager.active_connections
+    assert slow.close_code == 1013
+
+
+@pytest.mark.anyio
+async def test_full_queue_coalesces_and_drops_oldest():
+    """
+    Tests the slow-consumer policy: keyed messages replace their queued
+    version and the oldest message is dropped once the queue is full.
+    """
+    manager = ConnectionManager(max_queue_size=2)
+    websocket = FakeWebSocket()
+    await manager.connect(websocket)
+    client = manager.active_connections[websocket]
+    client.stop()  # keep everything queued
+
+    manager.publish("job_1 pending", key="job_1")
+    manager.publish("job_1 running", key="job_1")
+    manager.publish("job_2 pending", key="job_2")
+    manager.publish("job_3 pending", key="job_3")
+
+    assert list(client._queue.values()) == ["job_2 pending", "job_3 pending"]
+    assert client.dropped == 1
+
+
+@pytest.mark.anyio
+async def test_job_events_only_reach_matching_subscribers():
+    """
+    Tests that job events are sent as JSON only to the clients whose
+    filters match, and that unfiltered clients still receive everything.
+    """
+    manager = ConnectionManager()
+    everything, exports, one_job = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(everything)
+    await manager.connect(exports, Subscription(types=["data_export"], statuses=["failed"]))
+    await manager.connect(one_job, Subscription(job_ids=["job_2"]))
+
+    manager.publish_job_events([
+        {"job_id": "job_1", "type": "data_export", "status": "running"},
+        {"job_id": "job_1", "type": "data_export", "status": "failed"},
+        {"job_id": "job_2", "type": "report", "status": "success"},
+    ])
+    await asyncio.sleep(0.01)
+
+    assert [json.loads(m)["status"] for m in everything.sent] == ["failed", "success"]  # job_1 coalesced
+    assert [json.loads(m)["job_id"] for m in exports.sent] == ["job_1"]
+    assert [json.loads(m)["job_id"] for m in one_job.sent] == ["job_2"]
+    for websocket in (everything, exports, one_job):
+        manager.disconnect(websocket)
+    assert manager._index == {} and manager._unfiltered == set()
+
+
+@pytest.mark.anyio
+async def test_subscribe_message_replaces_filters():
+    """
+    Tests that a subscribe message moves a client to its new filters and
+    that an invalid one is rejected.
+    """
+    manager = ConnectionManager()
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, Subscription(types=["report"]))
+
+    manager.subscribe(websocket, Subscription.from_message({"action": "subscribe", "statuses": ["failed"]}))
+    manager.publish_job_events([
+        {"job_id": "job_1", "type": "report", "status": "success"},
+        {"job_id": "job_2", "type": "data_export", "status": "failed"},
+    ])
+    await asyncio.sleep(0.01)
+
+    assert json.loads(websocket.sent[0]) == {"subscribed": {"job_ids": [], "types": [], "statuses": ["failed"]}}
+    assert [json.loads(m)["job_id"] for m in websocket.sent[1:]] == ["job_2"]
+    with pytest.raises(ValueError):
+        Subscription.from_message({"action": "subscribe", "statuses": ["exploded"]})
+    manager.disconnect(websocket)
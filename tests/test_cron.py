@@ -0,0 +1,38 @@
+# In tests/test_cron.py
+
+import datetime
+import pytest
+from app.services.cron import CronExpression
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 30)  # a Thursday
+
+
+def _next(expression: str, after: datetime.datetime = NOW) -> datetime.datetime:
+    return CronExpression.parse(expression).next_after(after)
+
+
+def test_next_fire_times():
+    assert _next("* * * * *") == datetime.datetime(2026, 1, 1, 12, 1)
+    assert _next("*/15 * * * *") == datetime.datetime(2026, 1, 1, 12, 15)
+    assert _next("0 2 * * *") == datetime.datetime(2026, 1, 2, 2, 0)
+    assert _next("30 9 * * mon-fri") == datetime.datetime(2026, 1, 2, 9, 30)
+    assert _next("0 0 1 jan,jul *") == datetime.datetime(2026, 7, 1, 0, 0)
+    assert _next("@weekly") == datetime.datetime(2026, 1, 4, 0, 0)
+    # Leap days only come every four years
+    assert _next("0 0 29 2 *") == datetime.datetime(2028, 2, 29, 0, 0)
+
+
+def test_fire_times_are_strictly_after():
+    assert _next("0 12 * * *", datetime.datetime(2026, 1, 1, 12, 0)) == datetime.datetime(2026, 1, 2, 12, 0)
+
+
+def test_restricted_day_of_month_and_week_fire_on_either():
+    # The 15th of the month, or any Sunday (7 is Sunday too)
+    assert _next("0 0 15 * 7") == datetime.datetime(2026, 1, 4, 0, 0)
+    assert _next("0 0 15 * 7", datetime.datetime(2026, 1, 12)) == datetime.datetime(2026, 1, 15, 0, 0)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* * * * mon-", "*/0 * * * *", "0 0 30 2 *"])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        _next(expression)
@@ -1,27 +1,34 @@
 # In tests/test_database.py
 
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from app.database import Base
 from app import models # <-- ADD THIS IMPORT to make sure tables are registered
 
-# Use an in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Use a SQLite database file for testing, through the aiosqlite driver
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Connections are not pooled, so none are left open (with their aiosqlite
+# threads) when the test run ends
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
-# Now, this command will see all your models and create the tables correctly
-Base.metadata.create_all(bind=engine)
+# Schema setup runs outside any event loop, so it uses a plain sync engine
+schema_engine = create_engine("sqlite:///./test.db")
 
-def override_get_db():
+# Start every test run from a clean schema so leftover jobs from a previous
+# run (or an older schema) never leak into the tests.
+def reset_database():
+    """Drops and recreates every table, giving a test an empty queue."""
+    Base.metadata.drop_all(bind=schema_engine)
+    Base.metadata.create_all(bind=schema_engine)
+
+reset_database()
+
+async def override_get_db():
     """
     A dependency override to use the test database instead of the real one.
     """
-    try:
-        db = TestingSessionLocal()
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,81 @@
+# In tests/test_handlers.py
+
+import asyncio
+import time
+import pytest
+from app.workers.handlers import ExecutorKind, HandlerError, HandlerRegistry, JobExecutors, ProcessPool
+
+
+# Process handlers run in spawned processes, so they live at module level
+def square(payload: dict) -> int:
+    return payload["n"] ** 2
+
+
+def fail(payload: dict):
+    raise ValueError("bad input")
+
+
+def spin(payload: dict):
+    while True:
+        pass
+
+
+@pytest.mark.anyio
+async def test_process_pool_kills_work_that_times_out():
+    """
+    Tests that cancelling a process handler call (e.g. by a timeout) kills
+    the process running it, and that the pool keeps working afterwards.
+    """
+    pool = ProcessPool(size=1)
+    try:
+        assert await pool.run(square, {"n": 7}) == 49
+        (busy_worker,) = pool._idle
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(pool.run(spin, {}), timeout=0.5)
+        assert not busy_worker.process.is_alive()
+
+        with pytest.raises(HandlerError, match="ValueError: bad input"):
+            await pool.run(fail, {})
+        assert await pool.run(square, {"n": 3}) == 9
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.anyio
+async def test_thread_handler_does_not_block_the_event_loop():
+    """
+    Tests that a blocking handler runs in the thread pool while the event
+    loop keeps serving other tasks.
+    """
+    registry = HandlerRegistry()
+
+    @registry.register("blocking", executor=ExecutorKind.THREAD)
+    def blocking(payload: dict) -> str:
+        time.sleep(0.3)
+        return "done"
+
+    executors = JobExecutors(process_workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        assert await executors.run(registry.get("blocking"), {}, log=None) == "done"
+    finally:
+        ticking.cancel()
+        executors.shutdown()
+    assert ticks >= 10
+
+
+def test_asyncio_handlers_must_be_coroutines():
+    registry = HandlerRegistry()
+    with pytest.raises(TypeError):
+        registry.register("sync_on_loop")(square)
+    registry.register("squares", executor=ExecutorKind.PROCESS)(square)
+    assert registry.get("squares").executor == ExecutorKind.PROCESS
@@ -0,0 +1,39 @@
+# In tests/test_idempotency_cache.py
+
+import datetime
+import time
+from app.services.idempotency import IdempotencyCache
+
+
+def _ago(seconds: float = 0) -> datetime.datetime:
+    return datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)
+
+
+def test_least_recently_used_key_is_evicted():
+    """
+    Tests that a full cache evicts the key that was used least recently.
+    """
+    cache = IdempotencyCache(max_size=2, ttl_seconds=60, key_ttl_seconds=3600)
+    cache.put("a", "job_a", _ago())
+    cache.put("b", "job_b", _ago())
+    assert cache.get("a") == "job_a"  # "b" is now the least recently used
+
+    cache.put("c", "job_c", _ago())
+    assert cache.get("b") is None
+    assert cache.get("a") == "job_a"
+    assert cache.get("c") == "job_c"
+
+
+def test_entries_expire():
+    """
+    Tests that entries expire after the cache TTL, and are never kept past
+    the key's own window.
+    """
+    cache = IdempotencyCache(max_size=10, ttl_seconds=0.01, key_ttl_seconds=3600)
+    cache.put("a", "job_a", _ago())
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+    cache = IdempotencyCache(max_size=10, ttl_seconds=60, key_ttl_seconds=3600)
+    cache.put("old", "job_old", _ago(3601))
+    assert cache.get("old") is None
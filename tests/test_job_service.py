@@ -0,0 +1,307 @@
+# In tests/test_job_service.py
+
+import datetime
+import pytest
+from app import models, schemas
+from app.services import job_service, resource_manager
+from .test_database import TestingSessionLocal, reset_database
+
+
+@pytest.fixture
+async def db():
+    """Gives each service test an empty database and its own session."""
+    reset_database()
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+async def _create(db, job_type="service_test", **fields) -> models.Job:
+    return await job_service.create_job(db=db, job_in=schemas.JobCreate(type=job_type, **fields))
+
+
+@pytest.mark.anyio
+async def test_claim_jobs_leases_each_job_once(db):
+    """
+    Tests that two workers claiming from the same queue never get the same job.
+    """
+    created = {(await _create(db)).job_id for _ in range(4)}
+
+    first = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096, limit=3)
+    second = await job_service.claim_jobs(db, "worker-b", cpu_available=8, memory_available=4096, limit=3)
+
+    first_ids = {job.job_id for job in first}
+    second_ids = {job.job_id for job in second}
+    assert len(first_ids) == 3 and len(second_ids) == 1
+    assert first_ids | second_ids == created
+    for job in first:
+        assert job.status == models.JobStatus.RUNNING
+        assert job.worker_id == "worker-a"
+        assert job.lease_expires_at is not None
+        assert job.current_attempt == 1
+
+
+@pytest.mark.anyio
+async def test_claim_jobs_respects_resource_budget(db):
+    """
+    Tests that a claim only takes jobs that fit the worker's free resources.
+    """
+    await _create(db, resource_requirements={"cpu_units": 6, "memory_mb": 512})
+    small = await _create(db, resource_requirements={"cpu_units": 2, "memory_mb": 256})
+
+    claimed = await job_service.claim_jobs(db, "worker-a", cpu_available=4, memory_available=4096)
+    assert [job.job_id for job in claimed] == [small.job_id]
+
+
+@pytest.mark.anyio
+async def test_claim_jobs_serves_highest_priority_first(db):
+    """
+    Tests that a critical job is claimed before an older low priority job.
+    """
+    await _create(db, priority="low")
+    critical = await _create(db, priority="critical")
+
+    claimed = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096, limit=1)
+    assert [job.job_id for job in claimed] == [critical.job_id]
+
+
+@pytest.mark.anyio
+async def test_fair_share_claims_see_every_priority(db):
+    """
+    Tests that with the fair share policy, a window full of high priority
+    jobs still leaves room for the low priority ones, which get their share.
+    """
+    one_cpu = {"cpu_units": 1, "memory_mb": 128}
+    for _ in range(8):
+        await _create(db, priority="high", resource_requirements=one_cpu)
+    low = await _create(db, priority="low", resource_requirements=one_cpu)
+
+    # In strict priority order, the window only holds high jobs
+    claimed = await job_service.claim_jobs(db, "worker-a", cpu_available=3, memory_available=4096, window=8)
+    assert {job.priority for job in claimed} == {models.PriorityLevel.HIGH}
+
+    # Fair share reads a quarter of the window per priority
+    claimed = await job_service.claim_jobs(
+        db, "worker-b", cpu_available=3, memory_available=4096, window=8,
+        policy=job_service.get_policy("fair_share"),
+    )
+    assert [job.priority for job in claimed].count(models.PriorityLevel.HIGH) == 2
+    assert low.job_id in [job.job_id for job in claimed]
+
+
+@pytest.mark.anyio
+async def test_claim_jobs_skips_jobs_not_yet_due(db):
+    """
+    Tests that a job whose run_at is in the future is not claimed.
+    """
+    job = await _create(db)
+    job.run_at = datetime.datetime.utcnow() + datetime.timedelta(minutes=5)
+    await db.commit()
+
+    assert await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096) == []
+
+
+@pytest.mark.anyio
+async def test_jobs_can_be_submitted_for_later(db):
+    """
+    Tests that run_at and delay_seconds set when a job becomes due, and that
+    only jobs already due are claimed while the others are next_due_times.
+    """
+    now = datetime.datetime.utcnow()
+    later = await _create(db, "later", delay_seconds=600)
+    aware = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=5)
+    scheduled = await _create(db, "scheduled", run_at=aware)
+    overdue = await _create(db, "overdue", run_at=now - datetime.timedelta(minutes=1))
+
+    assert later.run_at >= now + datetime.timedelta(seconds=600)
+    assert scheduled.run_at == aware.replace(tzinfo=None)
+    assert await job_service.next_due_times(db, limit=10) == [scheduled.run_at, later.run_at]
+    (claimed,) = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096)
+    assert claimed.job_id == overdue.job_id
+
+    with pytest.raises(ValueError):
+        schemas.JobCreate(type="both", run_at=now, delay_seconds=5)
+
+
+@pytest.mark.anyio
+async def test_retry_backoff_is_jittered(db):
+    """
+    Tests that a failed job is retried after a random delay between half
+    and all of its exponential backoff.
+    """
+    delays = set()
+    for _ in range(5):
+        job = await _create(db, retry_config={"max_attempts": 3, "backoff_multiplier": 2})
+        job.current_attempt = 1
+        before = datetime.datetime.utcnow()
+        assert await job_service.retry_or_fail(db, job) == []
+        assert job.status == models.JobStatus.PENDING
+        delay = (job.run_at - before).total_seconds()
+        assert 5 - 0.1 <= delay <= 10 + 0.1
+        delays.add(round(delay, 1))
+    assert len(delays) > 1
+
+
+@pytest.mark.anyio
+async def test_dependents_stay_blocked_until_dependency_succeeds(db):
+    """
+    Tests that a job waits as BLOCKED and is only claimable once its
+    dependency has succeeded.
+    """
+    parent = await _create(db, job_type="parent")
+    child = await _create(db, job_type="child", depends_on=[parent.job_id])
+    assert child.status == models.JobStatus.BLOCKED
+    assert child.unmet_deps == 1
+
+    claimed = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096)
+    assert [job.job_id for job in claimed] == [parent.job_id]
+
+    parent.status = models.JobStatus.SUCCESS
+    assert await job_service.release_dependents(db, parent) == [(child.job_id, "child")]
+    await db.commit()
+
+    await db.refresh(child)
+    assert child.status == models.JobStatus.PENDING
+    assert child.unmet_deps == 0
+    claimed = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096)
+    assert [job.job_id for job in claimed] == [child.job_id]
+
+
+@pytest.mark.anyio
+async def test_failure_cancels_fail_fast_subtree_only(db):
+    """
+    Tests that a failed job cancels its fail-fast dependents transitively,
+    while a dependent that chose to keep waiting stays blocked.
+    """
+    root = await _create(db, job_type="root")
+    child = await _create(db, job_type="child", depends_on=[root.job_id])
+    grandchild = await _create(db, job_type="grandchild", depends_on=[child.job_id])
+    patient = await _create(db, job_type="patient", depends_on=[root.job_id], on_dependency_failure="wait")
+
+    root.status = models.JobStatus.FAILED
+    cancelled = await job_service.propagate_failure(db, root)
+    await db.commit()
+
+    assert set(cancelled) == {(child.job_id, "child"), (grandchild.job_id, "grandchild")}
+    for job in (child, grandchild, patient):
+        await db.refresh(job)
+    assert child.status == models.JobStatus.CANCELLED
+    assert grandchild.status == models.JobStatus.CANCELLED
+    assert patient.status == models.JobStatus.BLOCKED
+
+
+@pytest.mark.anyio
+async def test_dependents_of_an_already_failed_job_apply_their_policy(db):
+    """
+    Tests that a job submitted on a dependency that already failed is
+    cancelled under fail_fast and stays blocked under wait, on its own and
+    in a batch, where an item depending on a cancelled item is cancelled too.
+    """
+    failed = await _create(db, job_type="failed")
+    failed.status = models.JobStatus.FAILED
+    await db.commit()
+
+    fail_fast = await _create(db, job_type="fail_fast", depends_on=[failed.job_id])
+    waiting = await _create(db, job_type="waiting", depends_on=[failed.job_id], on_dependency_failure="wait")
+    assert fail_fast.status == models.JobStatus.CANCELLED
+    assert failed.job_id in fail_fast.last_error
+    assert (waiting.status, waiting.unmet_deps) == (models.JobStatus.BLOCKED, 1)
+
+    results = await job_service.create_jobs_bulk(db, [
+        schemas.JobBatchItem(type="first", ref="first", depends_on=[failed.job_id]),
+        schemas.JobBatchItem(type="second", depends_on=["first"]),
+        schemas.JobBatchItem(type="waiting", depends_on=[failed.job_id], on_dependency_failure="wait"),
+        schemas.JobBatchItem(type="free"),
+    ])
+    assert [result.status for result in results] == [
+        models.JobStatus.CANCELLED, models.JobStatus.CANCELLED, models.JobStatus.BLOCKED, models.JobStatus.PENDING,
+    ]
+    cancelled = await job_service.get_job(db, results[1].job_id)
+    assert cancelled.completed_at is not None
+
+
+@pytest.mark.anyio
+async def test_create_job_returns_existing_job_for_repeated_key(db):
+    """
+    Tests that resubmitting with the same idempotency key returns the
+    original job instead of failing on the unique key.
+    """
+    first = await _create(db, idempotency_key="repeat-key")
+    second = await _create(db, idempotency_key="repeat-key")
+    assert second.job_id == first.job_id
+
+
+@pytest.mark.anyio
+async def test_create_job_reuses_key_after_its_window(db):
+    """
+    Tests that a key older than its deduplication window creates a new job
+    and is taken away from the old one.
+    """
+    old = await _create(db, idempotency_key="expiring-key")
+    old.created_at = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+    await db.commit()
+
+    new = await _create(db, idempotency_key="expiring-key")
+    assert new.job_id != old.job_id
+    await db.refresh(old)
+    assert old.idempotency_key is None
+
+
+@pytest.mark.anyio
+async def test_create_job_loses_a_freed_key_to_a_concurrent_submission(db, monkeypatch):
+    """
+    Tests that when another submission takes an expired key right after it
+    was freed, the job that took it is returned instead of failing.
+    """
+    old = await _create(db, idempotency_key="contested-key")
+    old.created_at = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+    await db.commit()
+
+    release = job_service._release_expired_keys
+    rival = {}
+
+    async def release_then_lose_the_race(session, keys):
+        await release(session, keys)
+        rival["job"] = await job_service.create_job(
+            db=session, job_in=schemas.JobCreate(type="rival", idempotency_key="contested-key")
+        )
+
+    monkeypatch.setattr(job_service, "_release_expired_keys", release_then_lose_the_race)
+    job = await _create(db, idempotency_key="contested-key")
+    assert job.job_id == rival["job"].job_id != old.job_id
+
+
+@pytest.mark.anyio
+async def test_claims_share_the_cluster_pool_until_leases_expire(db):
+    """
+    Tests that workers together never allocate more than the cluster pool,
+    and that the allocation of a job whose lease expired is reclaimed.
+    """
+    await resource_manager.register_pool(db, models.CLUSTER_POOL, total_cpu=4, total_memory_mb=4096)
+    await db.commit()
+    for _ in range(3):
+        await _create(db, resource_requirements={"cpu_units": 2, "memory_mb": 256})
+
+    first = await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096)
+    assert len(first) == 2 and first[0].allocated_cpu == 2
+    assert await job_service.claim_jobs(db, "worker-b", cpu_available=8, memory_available=4096) == []
+
+    # worker-a dies: once its leases run out, its share goes back to the pool
+    for job in first:
+        job.lease_expires_at = datetime.datetime.utcnow() - datetime.timedelta(seconds=1)
+    await db.commit()
+    assert len(await job_service.claim_jobs(db, "worker-b", cpu_available=8, memory_available=4096)) == 1
+
+
+@pytest.mark.anyio
+async def test_node_pool_caps_its_own_worker_only(db):
+    """
+    Tests that a worker's node pool limits that worker but not the others.
+    """
+    await resource_manager.register_pool(db, "worker-a", total_cpu=2, total_memory_mb=4096)
+    await db.commit()
+    for _ in range(3):
+        await _create(db, resource_requirements={"cpu_units": 2, "memory_mb": 256})
+
+    assert len(await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096)) == 1
+    assert await job_service.claim_jobs(db, "worker-a", cpu_available=8, memory_available=4096) == []
+    assert len(await job_service.claim_jobs(db, "worker-b", cpu_available=8, memory_available=4096)) == 2
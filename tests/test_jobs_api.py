@@ -1,13 +1,19 @@
 # In tests/test_jobs_api.py
 
+import json
 import pytest
 from httpx import AsyncClient
+from app import models
 from app.main import app
 from app.database import get_db
-from .test_database import override_get_db
+from app.services import job_service
+from app.services.event_bus import get_event_bus, local_event_bus
+from .test_database import TestingSessionLocal, override_get_db, reset_database
 
 # Tell our app to use the test database for this test file
 app.dependency_overrides[get_db] = override_get_db
+# ... and to publish job events in memory instead of through Postgres
+app.dependency_overrides[get_event_bus] = lambda: local_event_bus
 
 @pytest.mark.anyio
 async def test_submit_job_success():
@@ -71,4 +77,195 @@ async def test_cancel_job_success():
         # Immediately cancel the job
         cancel_response = await client.patch(f"/jobs/{job_id}/cancel")
         assert cancel_response.status_code == 200
-        assert cancel_response.json()["status"] == "cancelled"
\ No newline at end of file
+        assert cancel_response.json()["status"] == "cancelled"
+
+
+@pytest.mark.anyio
+async def test_retried_submission_returns_the_job_as_it_is_now():
+    """
+    Tests that a submission retried with the same idempotency key returns
+    the original job with its current status, not the one it was created with.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        job_payload = {"type": "retried_submission", "idempotency_key": "api-retry-key"}
+        job_id = (await client.post("/jobs/", json=job_payload)).json()["job_id"]
+        await client.patch(f"/jobs/{job_id}/cancel")
+
+        retry = await client.post("/jobs/", json=job_payload)
+        assert retry.json()["job_id"] == job_id
+        assert retry.json()["status"] == "cancelled"
+
+
+@pytest.mark.anyio
+async def test_submit_jobs_batch_with_intra_batch_dependencies():
+    """
+    Tests bulk submission, including a dependency on an earlier item and
+    an idempotency key repeated inside the batch.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        batch = [
+            {"type": "extract", "ref": "extract", "idempotency_key": "batch-test-extract"},
+            {"type": "transform", "depends_on": ["extract"]},
+            {"type": "extract", "idempotency_key": "batch-test-extract"},
+        ]
+        response = await client.post("/jobs/batch", json=batch)
+        assert response.status_code == 201
+        results = response.json()
+        assert [result["index"] for result in results] == [0, 1, 2]
+        assert [result["created"] for result in results] == [True, True, False]
+        assert results[2]["job_id"] == results[0]["job_id"]
+
+        # Resubmitting returns the existing job instead of creating another
+        retry = await client.post("/jobs/batch", json=batch[:1])
+        assert retry.json()[0]["created"] is False
+        assert retry.json()[0]["job_id"] == results[0]["job_id"]
+
+
+@pytest.mark.anyio
+async def test_submit_jobs_batch_rejects_unknown_dependency():
+    """
+    Tests that a batch referencing a job that does not exist is rejected as a whole.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        batch = [{"type": "orphan", "depends_on": ["job_missing"]}]
+        response = await client.post("/jobs/batch", json=batch)
+        assert response.status_code == 400
+
+
+@pytest.mark.anyio
+async def test_submit_jobs_batch_rejects_duplicate_refs():
+    """
+    Tests that a batch giving two items the same ref is rejected, instead of
+    later items silently depending on the last of them.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        batch = [
+            {"type": "extract", "ref": "extract"},
+            {"type": "extract", "ref": "extract"},
+            {"type": "transform", "depends_on": ["extract"]},
+        ]
+        response = await client.post("/jobs/batch", json=batch)
+        assert response.status_code == 400
+        assert "Item 1" in response.json()["detail"]
+
+@pytest.mark.anyio
+async def test_db_pool_metrics():
+    """
+    Tests that the API reports its connection pool utilization.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.get("/metrics/db-pool")
+        assert response.status_code == 200
+        metrics = response.json()
+        assert {"size", "checked_out", "capacity", "utilization"} <= metrics.keys()
+        assert metrics["checked_out"] <= metrics["capacity"]
+
+
+@pytest.mark.anyio
+async def test_list_jobs_pages_with_cursor():
+    """
+    Tests that the listing walks every job exactly once, newest first,
+    following the X-Next-Cursor header.
+    """
+    reset_database()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        created = [(await client.post("/jobs/", json={"type": "paging_test"})).json()["job_id"] for _ in range(5)]
+        await client.post("/jobs/", json={"type": "other_type"})
+
+        seen, cursor = [], None
+        while True:
+            params = {"job_type": "paging_test", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            response = await client.get("/jobs/", params=params)
+            assert response.status_code == 200
+            seen += [job["job_id"] for job in response.json()]
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+        assert seen == created[::-1]
+        assert (await client.get("/jobs/", params={"cursor": "not-a-cursor"})).status_code == 400
+
+
+@pytest.mark.anyio
+async def test_export_jobs_streams_ndjson():
+    """
+    Tests that the export returns one JSON document per line for every matching job.
+    """
+    reset_database()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        for _ in range(3):
+            await client.post("/jobs/", json={"type": "export_test"})
+        await client.post("/jobs/", json={"type": "other_type"})
+
+        response = await client.get("/jobs/export", params={"job_type": "export_test"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 3
+        assert all(job["type"] == "export_test" and job["status"] == "pending" for job in lines)
+
+
+@pytest.mark.anyio
+async def test_list_and_export_return_run_at():
+    """
+    Tests that the listing and the export report when a delayed job is due.
+    """
+    reset_database()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        created = (await client.post("/jobs/", json={"type": "delayed_test", "delay_seconds": 600})).json()
+        assert created["run_at"] is not None
+
+        listed = (await client.get("/jobs/", params={"job_type": "delayed_test"})).json()
+        exported = (await client.get("/jobs/export", params={"job_type": "delayed_test"})).text.splitlines()
+        assert [job["run_at"] for job in listed] == [created["run_at"]]
+        assert [json.loads(line)["run_at"] for line in exported] == [created["run_at"]]
+
+
+async def _add_logs(job_id: str, messages):
+    async with TestingSessionLocal() as db:
+        job = await job_service.get_job(db, job_id)
+        db.add_all([models.JobLog(job_id=job.id, message=message) for message in messages])
+        await db.commit()
+
+
+@pytest.mark.anyio
+async def test_get_job_logs_pages_in_order():
+    """
+    Tests that a job's log is returned oldest first, one page at a time.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        job_id = (await client.post("/jobs/", json={"type": "log_test"})).json()["job_id"]
+        await _add_logs(job_id, [f"line {i}" for i in range(5)])
+
+        first = await client.get(f"/jobs/{job_id}/logs", params={"limit": 3})
+        assert [log["message"] for log in first.json()] == ["line 0", "line 1", "line 2"]
+        rest = await client.get(
+            f"/jobs/{job_id}/logs", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]}
+        )
+        assert [log["message"] for log in rest.json()] == ["line 3", "line 4"]
+        assert "X-Next-Cursor" not in rest.headers
+
+
+@pytest.mark.anyio
+async def test_stream_job_logs_as_server_sent_events():
+    """
+    Tests that following the log of a finished job streams every line and
+    then ends, and that Last-Event-ID resumes after a given line.
+    """
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        job_id = (await client.post("/jobs/", json={"type": "log_stream_test"})).json()["job_id"]
+        await _add_logs(job_id, ["first", "second", "third"])
+        await client.patch(f"/jobs/{job_id}/cancel")
+
+        response = await client.get(f"/jobs/{job_id}/logs/stream", params={"follow": "true"})
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block.splitlines() for block in response.text.strip().split("\n\n")]
+        lines = [json.loads(event[1][len("data: "):])["message"] for event in events[:-1]]
+        assert lines == ["first", "second", "third"]
+        assert events[-1][0] == "event: end"
+
+        first_id = events[0][0][len("id: "):]
+        resumed = await client.get(f"/jobs/{job_id}/logs/stream", headers={"Last-Event-ID": first_id})
+        assert resumed.text.count("data: {\"timestamp\"") == 2
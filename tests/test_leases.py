@@ -0,0 +1,225 @@
+# In tests/test_leases.py
+
+import asyncio
+import contextlib
+import datetime
+import pytest
+from app import models, schemas
+from sqlalchemy import select
+from app.services import job_service, leases
+from app.services.resource_manager import ResourceManager, register_pool
+from app.workers.job_processor import WorkerEngine
+from .test_database import TestingSessionLocal, reset_database, engine as test_engine
+
+
+@pytest.fixture
+async def db():
+    reset_database()
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+def _later(seconds: float) -> datetime.datetime:
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=seconds)
+
+
+async def _claim(db, worker_id: str = "worker-a") -> models.Job:
+    (job,) = await job_service.claim_jobs(db, worker_id, cpu_available=8, memory_available=4096, limit=1)
+    return job
+
+
+@pytest.mark.anyio
+async def test_expired_leases_are_requeued_then_failed(db):
+    """
+    Tests that a job whose worker stopped heartbeating is requeued while it
+    has attempts left, and fails once the lost runs used them up, taking
+    its dependents with it.
+    """
+    parent = await job_service.create_job(
+        db=db, job_in=schemas.JobCreate(type="lease_test", retry_config={"max_attempts": 2})
+    )
+    child = await job_service.create_job(
+        db=db, job_in=schemas.JobCreate(type="lease_child", depends_on=[parent.job_id])
+    )
+    parent_pk, child_id = parent.id, child.job_id
+    await _claim(db)
+
+    # Still within its lease: nothing to reap
+    assert await leases.reap_expired_leases(db) == []
+
+    ((reaped, cancelled),) = await leases.reap_expired_leases(db, now=_later(3600))
+    assert reaped.status == models.JobStatus.PENDING
+    assert reaped.current_attempt == 1
+    assert "Lease expired" in reaped.last_error
+    assert cancelled == []
+
+    async with TestingSessionLocal() as other:
+        await other.execute(
+            models.Job.__table__.update().where(models.Job.id == parent_pk).values(run_at=datetime.datetime.utcnow())
+        )
+        await other.commit()
+    assert (await _claim(db)).current_attempt == 2
+
+    ((reaped, cancelled),) = await leases.reap_expired_leases(db, now=_later(3600))
+    assert reaped.status == models.JobStatus.FAILED
+    assert cancelled == [(child_id, "lease_child")]
+    logs, _ = await job_service.list_job_logs(db, parent_pk)
+    assert len([log for log in logs if log["message"].startswith("Lease expired")]) == 2
+
+
+@pytest.mark.anyio
+async def test_heartbeat_renews_leases_and_stops_reaped_jobs(db):
+    """
+    Tests that the worker renews the leases of its in-flight jobs in one
+    UPDATE, and stops a job whose lease was lost to the reaper without
+    overwriting what the reaper recorded.
+    """
+    running = dict(payload={"duration_seconds": 10}, resource_requirements={"cpu_units": 1, "memory_mb": 128})
+    kept = await job_service.create_job(db=db, job_in=schemas.JobCreate(type="kept", **running))
+    lost = await job_service.create_job(
+        db=db, job_in=schemas.JobCreate(type="lost", retry_config={"max_attempts": 2}, **running)
+    )
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        worker_id="worker-a",
+        lease_seconds=60,
+    )
+    assert await engine.fill_slots() == 2
+    lost_task = engine.in_flight[(lost.id, 1)]
+
+    # The reaper takes one job after its lease ran out on paper
+    async with TestingSessionLocal() as other:
+        await other.execute(
+            models.Job.__table__.update().where(models.Job.id == lost.id)
+            .values(lease_expires_at=_later(-1))
+        )
+        await other.commit()
+        await leases.reap_expired_leases(other)
+
+    assert await engine.heartbeat() == [lost.id]
+    await asyncio.gather(lost_task, return_exceptions=True)
+    assert (lost.id, 1) not in engine.in_flight
+    assert engine.resources.used_cpu == 1
+
+    async with TestingSessionLocal() as other:
+        kept_job = await other.get(models.Job, kept.id)
+        lost_job = await other.get(models.Job, lost.id)
+    assert kept_job.lease_expires_at > _later(50)
+    assert lost_job.status == models.JobStatus.PENDING
+    assert lost_job.completed_at is None
+
+    engine.in_flight[(kept.id, 1)].cancel()
+    await engine.drain()
+
+
+@pytest.mark.anyio
+async def test_reaped_job_finishing_late_keeps_the_reapers_status(db):
+    """
+    Tests that a job which finishes after it was reaped, before any heartbeat
+    stopped it, does not overwrite the status the reaper recorded.
+    """
+    job = await job_service.create_job(db=db, job_in=schemas.JobCreate(
+        type="late", payload={"duration_seconds": 0.2}, retry_config={"max_attempts": 2},
+    ))
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        worker_id="worker-a",
+    )
+    assert await engine.fill_slots() == 1
+
+    async with TestingSessionLocal() as other:
+        await other.execute(
+            models.Job.__table__.update().where(models.Job.id == job.id).values(lease_expires_at=_later(-1))
+        )
+        await other.commit()
+        await leases.reap_expired_leases(other)
+    await engine.drain()
+
+    async with TestingSessionLocal() as other:
+        late_job = await other.get(models.Job, job.id)
+    assert late_job.status == models.JobStatus.PENDING
+    assert late_job.completed_at is None
+    assert late_job.last_error.startswith("Lease expired")
+
+
+@pytest.mark.anyio
+async def test_stale_attempt_does_not_touch_the_next_one(db):
+    """
+    Tests that when a reaped job is claimed again by the same worker before
+    a heartbeat, the stale attempt neither records its outcome nor removes
+    the new attempt from the in-flight jobs, and the new attempt finishes.
+    """
+    job = await job_service.create_job(db=db, job_in=schemas.JobCreate(
+        type="reclaimed", payload={"duration_seconds": 0.2}, retry_config={"max_attempts": 3},
+    ))
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        worker_id="worker-a",
+    )
+    assert await engine.fill_slots() == 1
+    stale_task = engine.in_flight[(job.id, 1)]
+
+    async with TestingSessionLocal() as other:
+        await other.execute(
+            models.Job.__table__.update().where(models.Job.id == job.id).values(lease_expires_at=_later(-1))
+        )
+        await other.commit()
+        await leases.reap_expired_leases(other)
+        await other.execute(
+            models.Job.__table__.update().where(models.Job.id == job.id).values(run_at=_later(-1))
+        )
+        await other.commit()
+    assert await engine.fill_slots() == 1
+
+    await asyncio.gather(stale_task, return_exceptions=True)
+    assert list(engine.in_flight) == [(job.id, 2)]
+    async with TestingSessionLocal() as other:
+        assert (await other.get(models.Job, job.id)).status == models.JobStatus.RUNNING
+
+    await engine.drain()
+    async with TestingSessionLocal() as other:
+        finished = await other.get(models.Job, job.id)
+    assert (finished.status, finished.current_attempt) == (models.JobStatus.SUCCESS, 2)
+
+
+@pytest.mark.anyio
+async def test_node_pools_of_stopped_workers_are_removed(db):
+    """
+    Tests that a worker removes its node pool when it shuts down, and that
+    the reaper removes the pools of workers that stopped heartbeating while
+    the heartbeat keeps a live worker's pool and the cluster pool stays.
+    """
+    def engine_for(worker_id: str) -> WorkerEngine:
+        return WorkerEngine(
+            resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+            session_factory=TestingSessionLocal,
+            db_engine=test_engine,
+            worker_id=worker_id,
+            poll_interval=60,
+        )
+
+    for name in ("worker-dead", "worker-live", models.CLUSTER_POOL):
+        await register_pool(db, name, total_cpu=4, total_memory_mb=4096)
+    await db.execute(models.ResourcePool.__table__.update().values(updated_at=_later(-3600)))
+    await db.commit()
+
+    await engine_for("worker-live").heartbeat()
+    await leases.LeaseReaper(TestingSessionLocal).run_once()
+
+    stopping = engine_for("worker-stopping")
+    runner = asyncio.create_task(stopping.run_forever())
+    await asyncio.sleep(0.05)
+    async with TestingSessionLocal() as other:
+        assert await other.get(models.ResourcePool, "worker-stopping") is not None
+    runner.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await runner
+
+    names = set((await db.execute(select(models.ResourcePool.name))).scalars())
+    assert names == {"worker-live", models.CLUSTER_POOL}
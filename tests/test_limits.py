@@ -0,0 +1,146 @@
+# In tests/test_limits.py
+
+import pytest
+from app import models, schemas
+from app.services import job_service
+from app.services.limits import JobLimiter, LimitRule, parse_limits
+from .test_database import TestingSessionLocal, reset_database
+
+
+@pytest.fixture
+async def db():
+    reset_database()
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def _submit(db, job_type: str, count: int, tenant=None):
+    for _ in range(count):
+        payload = {"tenant_id": tenant} if tenant else None
+        await job_service.create_job(db=db, job_in=schemas.JobCreate(type=job_type, payload=payload))
+
+
+async def _claim(db, worker_id: str, limiter: JobLimiter):
+    claimed = await job_service.claim_jobs(
+        db, worker_id, cpu_available=64, memory_available=65536, limit=50, limiter=limiter
+    )
+    return sorted(job.type for job in claimed)
+
+
+def test_limits_configuration():
+    rules = parse_limits({"type:export": {"concurrency": 2}, "tenant:*": {"rate_per_second": 0.5}})
+    assert rules["type:export"] == LimitRule(concurrency=2)
+    assert rules["tenant:*"].bucket_size == 1
+
+    limiter = JobLimiter(rules)
+    assert limiter.keys("export", {"tenant_id": "acme"}) == ["type:export", "tenant:acme"]
+    assert limiter.keys("report", None) == []
+
+    for bad in ({"queue:x": {"concurrency": 1}}, {"type:x": {}}, {"type:x": {"concurrency": 1, "speed": 2}}):
+        with pytest.raises(ValueError):
+            parse_limits(bad)
+
+
+@pytest.mark.anyio
+async def test_concurrency_caps_are_shared_by_workers(db):
+    """
+    Tests that a type's cap holds across workers once they reconcile, that
+    the capped type does not hold back other jobs, and that finishing a job
+    frees its slot.
+    """
+    await _submit(db, "export", 5)
+    await _submit(db, "report", 2, tenant="acme")
+    rules = parse_limits({"type:export": {"concurrency": 2}, "tenant:acme": {"concurrency": 1}})
+    worker_a = JobLimiter(rules, reconcile_seconds=0)
+    worker_b = JobLimiter(rules, reconcile_seconds=0)
+
+    assert await _claim(db, "worker-a", worker_a) == ["export", "export", "report"]
+    assert worker_a.throttled == {"type:export", "tenant:acme"}
+    # Worker b reads what worker a runs before it claims anything
+    assert await _claim(db, "worker-b", worker_b) == []
+    assert worker_b.running["type:export"] == 2
+
+    worker_a.release(["type:export"])
+    worker_a.reconcile_seconds = 60
+    assert await _claim(db, "worker-a", worker_a) == ["export"]
+
+
+@pytest.mark.anyio
+async def test_rate_limits_refill_and_count_other_workers(db):
+    """
+    Tests that a type starts no faster than its token bucket allows, and
+    that a worker's bucket is debited with the starts of other workers.
+    """
+    await _submit(db, "api_call", 6)
+    rules = parse_limits({"type:api_call": {"rate_per_second": 1, "burst": 2}})
+    clock = FakeClock()
+    worker_a = JobLimiter(rules, reconcile_seconds=0, clock=clock)
+    worker_b = JobLimiter(rules, reconcile_seconds=0, clock=clock)
+
+    await worker_a.reconcile(db, "worker-a")
+
+    assert len(await _claim(db, "worker-b", worker_b)) == 2  # the burst
+    assert await _claim(db, "worker-b", worker_b) == []
+    assert worker_b.seconds_until_refill() == pytest.approx(1)
+
+    # Worker a learns of worker b's starts and goes into debt for them
+    clock.now = 0.5
+    assert await _claim(db, "worker-a", worker_a) == []
+    clock.now = 1.5
+    assert len(await _claim(db, "worker-a", worker_a)) == 1
+    # ... and worker b of worker a's
+    assert await _claim(db, "worker-b", worker_b) == []
+
+
+@pytest.mark.anyio
+async def test_rate_limits_count_starts_that_were_requeued(db):
+    """
+    Tests that a start by another worker is debited even when that job was
+    requeued before the reconciliation, e.g. after its lease expired.
+    """
+    await _submit(db, "api_call", 4)
+    rules = parse_limits({"type:api_call": {"rate_per_second": 1, "burst": 2}})
+    clock = FakeClock()
+    worker_a = JobLimiter(rules, reconcile_seconds=0, clock=clock)
+    worker_b = JobLimiter(rules, reconcile_seconds=0, clock=clock)
+
+    await worker_a.reconcile(db, "worker-a")
+    assert len(await _claim(db, "worker-b", worker_b)) == 2
+    await db.execute(
+        models.Job.__table__.update()
+        .where(models.Job.worker_id == "worker-b")
+        .values(status=models.JobStatus.PENDING)
+    )
+    await db.commit()
+
+    clock.now = 0.5
+    assert await _claim(db, "worker-a", worker_a) == []
+
+
+@pytest.mark.anyio
+async def test_numeric_tenants_are_left_out_of_the_window(db):
+    """
+    Tests that a full tenant whose id is a number in the payload is left out
+    of the claim window, so it does not crowd out other jobs.
+    """
+    await _submit(db, "report", 3, tenant=42)
+    await _submit(db, "export", 1)
+    limiter = JobLimiter(parse_limits({"tenant:42": {"concurrency": 1}}), reconcile_seconds=0)
+
+    async def claim():
+        claimed = await job_service.claim_jobs(
+            db, "worker-a", cpu_available=64, memory_available=65536, window=2, limiter=limiter
+        )
+        return [job.type for job in claimed]
+
+    assert await claim() == ["report"]
+    assert limiter.running["tenant:42"] == 1
+    assert await claim() == ["export"]
@@ -0,0 +1,118 @@
+# In tests/test_log_sink.py
+
+import asyncio
+import pytest
+from sqlalchemy import select
+from app import models, schemas
+from app.services import job_service
+from app.services.log_sink import LogSink
+from .test_database import TestingSessionLocal, reset_database
+
+
+@pytest.fixture
+async def job():
+    reset_database()
+    async with TestingSessionLocal() as db:
+        return await job_service.create_job(db=db, job_in=schemas.JobCreate(type="log_sink_test"))
+
+
+async def _messages(job: models.Job):
+    async with TestingSessionLocal() as db:
+        result = await db.execute(
+            select(models.JobLog.message).where(models.JobLog.job_id == job.id).order_by(models.JobLog.id)
+        )
+        return result.scalars().all()
+
+
+@pytest.mark.anyio
+async def test_lines_are_written_in_batches(job):
+    """
+    Tests that lines stay buffered until a batch is full, and that a full
+    batch is written in the background in the order the lines were logged.
+    """
+    sink = LogSink(TestingSessionLocal, batch_size=3)
+    log = sink.logger(job)
+
+    await log.log("one")
+    await log.log("two")
+    assert await _messages(job) == []
+
+    await log.log("three")
+    await asyncio.sleep(0.05)
+    assert await _messages(job) == ["one", "two", "three"]
+
+    await log.log("four")
+    await sink.stop()
+    assert await _messages(job) == ["one", "two", "three", "four"]
+
+
+@pytest.mark.anyio
+async def test_writer_waits_when_buffer_is_full(job):
+    """
+    Tests the backpressure: the write that fills the buffer flushes it
+    before returning.
+    """
+    sink = LogSink(TestingSessionLocal, batch_size=100, max_buffered=2)
+    log = sink.logger(job)
+
+    await log.log("one")
+    await log.log("two")
+    assert await _messages(job) == ["one", "two"]
+
+
+@pytest.mark.anyio
+async def test_job_flush_leaves_other_jobs_lines_buffered(job):
+    """
+    Tests that flushing one job's lines into a transaction that rolls back
+    loses only that job's lines, and others are still written later.
+    """
+    async with TestingSessionLocal() as db:
+        other = await job_service.create_job(db=db, job_in=schemas.JobCreate(type="log_sink_other"))
+    sink = LogSink(TestingSessionLocal, batch_size=100)
+    await sink.logger(job).log("finishing")
+    await sink.logger(other).log("still running")
+
+    async with TestingSessionLocal() as db:
+        await sink.flush(db, job_pk=job.id)
+        await db.rollback()
+
+    await sink.stop()
+    assert await _messages(job) == []
+    assert await _messages(other) == ["still running"]
+
+
+@pytest.mark.anyio
+async def test_lines_of_a_failed_commit_are_written_later(job):
+    """
+    Tests that lines flushed into a transaction whose commit fails are
+    buffered again and written by a later flush.
+    """
+    sink = LogSink(TestingSessionLocal, batch_size=100)
+    await sink.logger(job).log("finished")
+
+    async with TestingSessionLocal() as db:
+        records = await sink.flush(db, job_pk=job.id)
+        await db.rollback()
+    sink.restore(records)
+
+    await sink.stop()
+    assert await _messages(job) == ["finished"]
+
+
+@pytest.mark.anyio
+async def test_failed_backpressure_flush_does_not_fail_the_writer(job):
+    """
+    Tests that a writer at the buffer limit survives a failing database,
+    and that its lines are kept for the next flush.
+    """
+    def broken_session():
+        raise RuntimeError("database is down")
+
+    sink = LogSink(broken_session, batch_size=100, max_buffered=2)
+    logger = sink.logger(job)
+    await logger.log("one")
+    await logger.log("two")
+
+    sink.session_factory = TestingSessionLocal
+    await sink.stop()
+    assert await _messages(job) == ["one", "two"]
@@ -0,0 +1,87 @@
+# In tests/test_retention.py
+
+import datetime
+import pytest
+from sqlalchemy import func, select
+from app import models, schemas
+from app.services import job_service, retention
+from .test_database import TestingSessionLocal, reset_database
+
+TTLS = {
+    models.JobStatus.SUCCESS: datetime.timedelta(days=7),
+    models.JobStatus.FAILED: datetime.timedelta(days=30),
+}
+
+
+@pytest.fixture
+async def db():
+    reset_database()
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+async def _finished(db, status, days_ago, job_type="retention_test", **fields) -> models.Job:
+    job = await job_service.create_job(db=db, job_in=schemas.JobCreate(type=job_type, **fields))
+    job.status = status
+    job.completed_at = datetime.datetime.utcnow() - datetime.timedelta(days=days_ago)
+    db.add(models.JobLog(job_id=job.id, message="done"))
+    await db.commit()
+    return job
+
+
+async def _remaining(db):
+    return set((await db.execute(select(models.Job.type))).scalars().all())
+
+
+@pytest.mark.anyio
+async def test_sweep_deletes_expired_jobs_per_status(db):
+    """
+    Tests that each status expires after its own TTL, that statuses without
+    a TTL are kept, and that the logs of deleted jobs go with them.
+    """
+    await _finished(db, models.JobStatus.SUCCESS, days_ago=8, job_type="old_success")
+    await _finished(db, models.JobStatus.SUCCESS, days_ago=1, job_type="new_success")
+    await _finished(db, models.JobStatus.FAILED, days_ago=8, job_type="recent_failure")
+    await _finished(db, models.JobStatus.CANCELLED, days_ago=365, job_type="kept_cancelled")
+
+    deleted = await retention.sweep_expired_jobs(TestingSessionLocal, TTLS, batch_size=1)
+
+    assert deleted == 1
+    assert await _remaining(db) == {"new_success", "recent_failure", "kept_cancelled"}
+    assert (await db.execute(select(func.count()).select_from(models.JobLog))).scalar() == 3
+
+
+@pytest.mark.anyio
+async def test_sweep_keeps_dependencies_of_unfinished_jobs(db):
+    """
+    Tests that an expired job is kept while a dependent still waits on it,
+    and that the sweep works through several batches.
+    """
+    failed = await _finished(db, models.JobStatus.FAILED, days_ago=60, job_type="awaited")
+    await job_service.create_job(db=db, job_in=schemas.JobCreate(
+        type="waiting", depends_on=[failed.job_id], on_dependency_failure="wait"
+    ))
+    for _ in range(3):
+        await _finished(db, models.JobStatus.SUCCESS, days_ago=10, job_type="expired")
+
+    deleted = await retention.sweep_expired_jobs(TestingSessionLocal, TTLS, batch_size=2)
+
+    assert deleted == 3
+    assert await _remaining(db) == {"awaited", "waiting"}
+
+
+@pytest.mark.anyio
+async def test_release_expired_idempotency_keys(db):
+    """
+    Tests that keys older than the window are cleared and newer ones kept.
+    """
+    old = await job_service.create_job(db=db, job_in=schemas.JobCreate(type="old", idempotency_key="old-key"))
+    await job_service.create_job(db=db, job_in=schemas.JobCreate(type="new", idempotency_key="new-key"))
+    old.created_at = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+    await db.commit()
+
+    released = await retention.release_expired_idempotency_keys(TestingSessionLocal, datetime.timedelta(days=1))
+
+    assert released == 1
+    keys = (await db.execute(select(models.Job.idempotency_key).order_by(models.Job.id))).scalars().all()
+    assert keys == [None, "new-key"]
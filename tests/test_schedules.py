@@ -0,0 +1,92 @@
+# In tests/test_schedules.py
+
+import datetime
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from app import models, schemas
+from app.main import app
+from app.database import get_db
+from app.services import schedule_service
+from .test_database import TestingSessionLocal, override_get_db, reset_database
+
+app.dependency_overrides[get_db] = override_get_db
+
+
+@pytest.fixture
+async def db():
+    reset_database()
+    async with TestingSessionLocal() as session:
+        yield session
+
+
+def _later(minutes: float) -> datetime.datetime:
+    return datetime.datetime.utcnow() + datetime.timedelta(minutes=minutes)
+
+
+@pytest.mark.anyio
+async def test_due_schedules_submit_one_job_per_fire_time(db):
+    """
+    Tests that a due schedule submits its job once, due at the fire time,
+    coalescing the fire times it missed, and that firing the same time
+    twice still submits a single job.
+    """
+    await schedule_service.create_schedule(db, schemas.JobScheduleCreate(
+        name="report", cron="*/5 * * * *", job=schemas.JobCreate(type="report", priority="high"),
+    ))
+    await schedule_service.create_schedule(db, schemas.JobScheduleCreate(
+        name="paused", cron="* * * * *", job=schemas.JobCreate(type="paused"), enabled=False,
+    ))
+    schedule = await schedule_service.get_schedule(db, "report")
+    fire_at = schedule.next_fire_at
+
+    assert await schedule_service.materialize_due_schedules(db) == []
+
+    created = await schedule_service.materialize_due_schedules(db, now=_later(20))
+    assert [job["type"] for job in created] == ["report"]
+
+    # A second scheduler that read the schedule before it moved on fires
+    # the same time again; its job is dropped as a duplicate
+    async with TestingSessionLocal() as other:
+        await other.execute(
+            models.JobSchedule.__table__.update().where(models.JobSchedule.name == "report")
+            .values(next_fire_at=fire_at)
+        )
+        await other.commit()
+        assert await schedule_service.materialize_due_schedules(other, now=_later(20)) == []
+
+    jobs = (await db.execute(select(models.Job))).scalars().all()
+    assert len(jobs) == 1
+    assert jobs[0].run_at == fire_at
+    assert jobs[0].priority == models.PriorityLevel.HIGH
+    assert jobs[0].idempotency_key == schedule_service.schedule_key("report", fire_at)
+
+    async with TestingSessionLocal() as other:
+        schedule = await schedule_service.get_schedule(other, "report")
+    assert schedule.last_fired_at == fire_at
+    assert schedule.next_fire_at > _later(20)
+
+
+@pytest.mark.anyio
+async def test_schedules_api(db):
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        body = {"name": "nightly", "cron": "0 2 * * *", "job": {"type": "export", "payload": {"format": "csv"}}}
+        response = await client.post("/schedules/", json=body)
+        assert response.status_code == 201
+        assert response.json()["job"]["payload"] == {"format": "csv"}
+        assert response.json()["next_fire_at"].endswith("02:00:00")
+
+        assert (await client.post("/schedules/", json=body)).status_code == 409
+        assert (await client.post("/schedules/", json=dict(body, name="bad", cron="0 25 * * *"))).status_code == 422
+        assert (await client.post(
+            "/schedules/", json=dict(body, name="keyed", job={"type": "export", "idempotency_key": "k"})
+        )).status_code == 422
+
+        response = await client.patch("/schedules/nightly", json={"cron": "*/10 * * * *", "enabled": False})
+        assert response.status_code == 200
+        assert response.json()["cron"] == "*/10 * * * *"
+        assert response.json()["enabled"] is False
+
+        assert [s["name"] for s in (await client.get("/schedules/")).json()] == ["nightly"]
+        assert (await client.delete("/schedules/nightly")).status_code == 204
+        assert (await client.get("/schedules/nightly")).status_code == 404
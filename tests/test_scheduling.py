@@ -0,0 +1,145 @@
+# In tests/test_scheduling.py
+
+import pytest
+from app.services.scheduling import (
+    BestFitPolicy, Candidate, FairSharePolicy, FirstFitPolicy, ReservationPolicy, Running, get_policy,
+)
+
+TOTAL = (8, 4096)
+
+
+def _candidate(
+    name: str, rank: int, cpu: int, memory: int = 256, runtime: float = 300, waited: float = 0, job_type: str = None
+) -> Candidate:
+    return Candidate(
+        job=name, priority_rank=rank, cpu=cpu, memory=memory, runtime=runtime, waited=waited, job_type=job_type
+    )
+
+
+def _names(selected):
+    return [candidate.job for candidate in selected]
+
+
+def test_first_fit_lets_small_jobs_pass_a_large_one():
+    """
+    Tests that first fit starts whatever fits, even behind a blocked
+    higher-priority job.
+    """
+    candidates = [_candidate("big_high", 0, 6), _candidate("small_low", 2, 2)]
+    selected = FirstFitPolicy().select(candidates, free=(4, 4096), total=TOTAL, limit=10)
+    assert _names(selected) == ["small_low"]
+
+
+def test_reservation_only_backfills_jobs_that_do_not_delay_the_head():
+    """
+    Tests that the first job that has to wait gets a reservation: a
+    lower-priority job may start only if it ends before the reserved job
+    can start, or fits in what that job leaves over.
+    """
+    # 4 CPU free; a running 4-CPU job ends within 60s, then the big job fits
+    running = [Running(cpu=4, memory=1024, ends_in=60)]
+    candidates = [
+        _candidate("big_high", 0, 6),
+        _candidate("long_low", 2, 2, runtime=600),
+        _candidate("another_long_low", 2, 2, runtime=600),
+        _candidate("short_low", 2, 2, runtime=30),
+    ]
+    # Once the running job ends, the big job leaves 2 CPU over: enough for
+    # one long job. The short one is done before the big job can start.
+    selected = ReservationPolicy().select(candidates, free=(4, 4096), total=TOTAL, limit=10, running=running)
+    assert _names(selected) == ["long_low", "short_low"]
+
+    # First fit starts both long jobs, delaying the big one by ten minutes
+    selected = FirstFitPolicy().select(candidates, free=(4, 4096), total=TOTAL, limit=10)
+    assert _names(selected) == ["long_low", "another_long_low"]
+
+    # Nothing is reserved for a job that can never fit this worker
+    candidates = [_candidate("huge_high", 0, 16), _candidate("medium_low", 2, 2)]
+    selected = ReservationPolicy().select(candidates, free=(4, 4096), total=TOTAL, limit=10)
+    assert _names(selected) == ["medium_low"]
+
+
+def test_best_fit_packs_within_a_priority_band():
+    """
+    Tests that best fit starts the job that fills the free capacity best,
+    and still never takes capacity from a higher priority.
+    """
+    candidates = [
+        _candidate("two", 1, 2, memory=512),
+        _candidate("four", 1, 4, memory=1024),
+        _candidate("six", 1, 6, memory=1536),
+    ]
+    # First fit would start "two" and "four", leaving 2 CPU unused
+    assert _names(FirstFitPolicy().select(candidates, free=(8, 2048), total=TOTAL, limit=10)) == ["two", "four"]
+    assert _names(BestFitPolicy().select(candidates, free=(8, 2048), total=TOTAL, limit=10)) == ["six", "two"]
+
+    candidates = [_candidate("high", 0, 2), _candidate("low_exact", 1, 4)]
+    assert _names(BestFitPolicy().select(candidates, free=(4, 4096), total=TOTAL, limit=1)) == ["high"]
+
+
+def test_fair_share_splits_capacity_by_weight():
+    """
+    Tests that with a backlog at every priority, each one gets CPU in
+    proportion to its weight instead of high jobs taking everything, and
+    that the share holds across claims.
+    """
+    policy = FairSharePolicy(weights={0: 8, 1: 4, 2: 2, 3: 1}, aging_seconds=None)
+    backlog = [_candidate(f"{rank}-{i}", rank, 1) for rank in (1, 2, 3) for i in range(20)]
+    candidates = backlog
+    started = {1: 0, 2: 0, 3: 0}
+    for _ in range(4):
+        selected = policy.select(candidates, free=(7, 4096), total=TOTAL, limit=10)
+        for candidate in selected:
+            started[candidate.priority_rank] += 1
+        candidates = [c for c in candidates if c not in selected]
+    assert started == {1: 16, 2: 8, 3: 4}
+
+    # Strict priority starts nothing but high jobs
+    assert {c.priority_rank for c in BestFitPolicy().select(backlog, (7, 4096), TOTAL, 10)} == {1}
+
+
+def test_fair_share_ages_and_splits_types():
+    """
+    Tests that a low priority whose oldest job has waited long enough gets
+    high's share, and that the types of one priority share it evenly.
+    """
+    def low_share(aging_seconds, waited):
+        policy = FairSharePolicy(weights={0: 8, 1: 4, 2: 2, 3: 1}, aging_seconds=aging_seconds)
+        candidates = [_candidate(f"{rank}-{i}", rank, 1, waited=waited) for rank in (1, 3) for i in range(20)]
+        selected = policy.select(candidates, free=(10, 4096), total=TOTAL, limit=10)
+        return sum(1 for candidate in selected if candidate.priority_rank == 3)
+
+    assert low_share(aging_seconds=None, waited=200) == 2
+    assert low_share(aging_seconds=60, waited=30) == 2
+    assert low_share(aging_seconds=60, waited=200) == 5
+
+    policy = FairSharePolicy(weights={0: 8, 1: 4, 2: 2, 3: 1}, by_type=True, aging_seconds=None)
+    candidates = [_candidate(f"export-{i}", 2, 1, job_type="export") for i in range(10)]
+    candidates.append(_candidate("report", 2, 1, job_type="report"))
+    selected = _names(policy.select(candidates, free=(2, 4096), total=TOTAL, limit=10))
+    assert sorted(selected) == ["export-0", "report"]
+
+
+def test_fair_share_reserves_for_a_large_job():
+    """
+    Tests that the oldest job of the flow next in line holds its capacity
+    when it does not fit yet, so small jobs only backfill around it.
+    """
+    running = [Running(cpu=4, memory=1024, ends_in=60)]
+    candidates = [
+        _candidate("big_critical", 0, 6),
+        _candidate("long_low", 3, 2, runtime=600),
+        _candidate("another_long_low", 3, 2, runtime=600),
+        _candidate("short_low", 3, 2, runtime=30),
+    ]
+    policy = FairSharePolicy(aging_seconds=None)
+    selected = policy.select(candidates, free=(4, 4096), total=TOTAL, limit=10, running=running)
+    assert _names(selected) == ["long_low", "short_low"]
+
+
+def test_unknown_policy_is_rejected():
+    assert isinstance(get_policy(None), BestFitPolicy)
+    # Stateful policies are never shared between workers
+    assert get_policy("fair_share") is not get_policy("fair_share")
+    with pytest.raises(ValueError):
+        get_policy("round_robin")
@@ -0,0 +1,40 @@
+# In tests/test_timers.py
+
+import datetime
+from app.workers.timers import DueTimers
+
+NOW = datetime.datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _at(seconds: float) -> datetime.datetime:
+    return NOW + datetime.timedelta(seconds=seconds)
+
+
+def test_timers_fire_in_order():
+    timers = DueTimers(window=10)
+    assert timers.needs_reload()
+    timers.load([_at(30), _at(10)])
+    assert not timers.needs_reload()
+
+    assert timers.add(_at(5)) is True  # the new earliest timer
+    assert timers.add(_at(20)) is False
+    assert timers.seconds_until_next(NOW) == 5
+
+    assert timers.pop_due(_at(10)) == 2
+    assert timers.next_due() == _at(20)
+
+
+def test_timers_beyond_the_loaded_window_wait_for_the_next_load():
+    """
+    Tests that with more delayed jobs than the window holds, times past the
+    last loaded one are left to the next load, which happens once the
+    loaded timers have all fired.
+    """
+    timers = DueTimers(window=2)
+    timers.load([_at(10), _at(20)])
+    assert timers.add(_at(60)) is False
+    assert timers.add(_at(15)) is False
+
+    assert timers.pop_due(_at(30)) == 3
+    assert timers.next_due() is None
+    assert timers.needs_reload()
@@ -0,0 +1,216 @@
+# In tests/test_worker.py
+
+import asyncio
+import contextlib
+import pytest
+from app import models, schemas
+from app.services import job_service
+from app.services.connection_manager import Subscription
+from app.services.event_bus import InMemoryEventBus
+from app.services.resource_manager import ResourceManager
+from app.workers.handlers import ExecutorKind, handlers
+from app.workers.job_processor import WorkerEngine
+from .test_database import TestingSessionLocal, reset_database, engine as test_engine
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    """The worker tests look at the whole queue, so each one starts from an empty database."""
+    reset_database()
+
+
+async def _submit(job_type: str, cpu: int = 1, duration: float = 0.05, **extra) -> str:
+    async with TestingSessionLocal() as db:
+        job_in = schemas.JobCreate(
+            type=job_type,
+            payload={"duration_seconds": duration},
+            resource_requirements={"cpu_units": cpu, "memory_mb": 128},
+            **extra,
+        )
+        return (await job_service.create_job(db=db, job_in=job_in)).job_id
+
+
+async def _status(job_id: str) -> models.JobStatus:
+    async with TestingSessionLocal() as db:
+        return (await job_service.get_job(db, job_id)).status
+
+
+@pytest.mark.anyio
+async def test_engine_runs_jobs_concurrently_within_budget():
+    """
+    Tests that the engine launches as many jobs as the resources allow
+    and releases the resources once they finish.
+    """
+    resources = ResourceManager(total_cpu=4, total_memory_mb=4096)
+    engine = WorkerEngine(resources=resources, session_factory=TestingSessionLocal, db_engine=test_engine)
+    job_ids = [await _submit("concurrency_test", cpu=2) for _ in range(3)]
+
+    launched = await engine.fill_slots()
+    assert launched == 2
+    assert resources.used_cpu == 4
+
+    await engine.drain()
+    assert resources.used_cpu == 0
+
+    # The freed slot can now be refilled with the remaining job
+    assert await engine.fill_slots() == 1
+    await engine.drain()
+    assert all([await _status(job_id) == models.JobStatus.SUCCESS for job_id in job_ids])
+
+
+@pytest.mark.anyio
+async def test_engine_wakes_up_on_new_job_without_polling():
+    """
+    Tests that an idle worker starts a newly submitted job right away
+    instead of waiting for the next poll.
+    """
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        poll_interval=60,
+    )
+    runner = asyncio.create_task(engine.run_forever())
+    try:
+        await asyncio.sleep(0.05)  # let the engine go idle
+        job_id = await _submit("wakeup_test", duration=0)
+        for _ in range(20):
+            if await _status(job_id) == models.JobStatus.SUCCESS:
+                break
+            await asyncio.sleep(0.05)
+        assert await _status(job_id) == models.JobStatus.SUCCESS
+    finally:
+        runner.cancel()
+        # Let the engine's shutdown finish before the next test starts
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        await engine.drain()
+
+
+@pytest.mark.anyio
+async def test_engine_publishes_status_events():
+    """
+    Tests that the worker publishes the RUNNING and SUCCESS transitions of a
+    job to the event bus, batched per tick.
+    """
+    events = InMemoryEventBus(tick=0.01)
+    received = []
+    events.subscribe(received.append)
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        events=events,
+    )
+    job_id = await _submit("events_test", duration=0)
+
+    await engine.fill_slots()
+    await engine.drain()
+    await events.stop()
+
+    statuses = [event["status"] for batch in received for event in batch if event["job_id"] == job_id]
+    assert statuses == ["running", "success"]
+    assert all(event["type"] == "events_test" for batch in received for event in batch)
+
+
+@pytest.mark.anyio
+async def test_cascaded_events_reach_type_filtered_subscribers():
+    """
+    Tests that the dependents a failure cancels are published with their job
+    type, so a subscriber filtering on that type sees the cascade.
+    """
+    events = InMemoryEventBus(tick=0.01)
+    children = Subscription(types=["cascade_child"])
+    received = []
+    events.subscribe(lambda batch: received.extend(event for event in batch if children.matches(event)))
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        events=events,
+    )
+    async with TestingSessionLocal() as db:
+        parent = await job_service.create_job(db=db, job_in=schemas.JobCreate(
+            type="cascade_parent", payload={"should_fail": True},
+        ))
+    child_id = await _submit("cascade_child", depends_on=[parent.job_id])
+
+    await engine.fill_slots()
+    await engine.drain()
+    await events.stop()
+
+    assert [(event["job_id"], event["status"]) for event in received] == [(child_id, "cancelled")]
+
+
+@pytest.mark.anyio
+async def test_engine_runs_registered_handlers():
+    """
+    Tests that a job type with a registered handler runs that handler, with
+    its result logged, and that a handler exceeding the job's timeout
+    fails the job.
+    """
+    calls = []
+
+    @handlers.register("handled_test", executor=ExecutorKind.THREAD)
+    def handled(payload: dict) -> str:
+        calls.append(payload)
+        return "42 widgets"
+
+    @handlers.register("slow_handled_test")
+    async def slow_handled(payload: dict, log):
+        await asyncio.sleep(10)
+
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+    )
+    try:
+        job_id = await _submit("handled_test")
+        slow_job_id = await _submit("slow_handled_test", timeout_seconds=1)
+        await engine.fill_slots()
+        await engine.drain()
+    finally:
+        handlers.unregister("handled_test")
+        handlers.unregister("slow_handled_test")
+        engine.executors.shutdown()
+
+    assert calls == [{"duration_seconds": 0.05}]
+    assert await _status(job_id) == models.JobStatus.SUCCESS
+    assert await _status(slow_job_id) == models.JobStatus.FAILED
+    async with TestingSessionLocal() as db:
+        logs, _ = await job_service.list_job_logs(db, (await job_service.get_job(db, job_id)).id)
+    assert any(log["message"] == "Result: 42 widgets" for log in logs)
+
+
+@pytest.mark.anyio
+async def test_engine_wakes_up_when_a_delayed_job_becomes_due():
+    """
+    Tests that an idle worker runs a delayed job as soon as it becomes due,
+    from a timer armed by the job's notification rather than a poll.
+    """
+    engine = WorkerEngine(
+        resources=ResourceManager(total_cpu=8, total_memory_mb=4096),
+        session_factory=TestingSessionLocal,
+        db_engine=test_engine,
+        poll_interval=60,
+    )
+    runner = asyncio.create_task(engine.run_forever())
+    try:
+        await asyncio.sleep(0.05)  # let the engine go idle
+        job_id = await _submit("delayed_test", duration=0, delay_seconds=0.3)
+        await asyncio.sleep(0.1)
+        assert await _status(job_id) == models.JobStatus.PENDING
+        assert engine.timers.next_due() is not None
+
+        for _ in range(20):
+            if await _status(job_id) == models.JobStatus.SUCCESS:
+                break
+            await asyncio.sleep(0.05)
+        assert await _status(job_id) == models.JobStatus.SUCCESS
+    finally:
+        runner.cancel()
+        # Let the engine's shutdown finish before the next test starts
+        with contextlib.suppress(asyncio.CancelledError):
+            await runner
+        await engine.drain()